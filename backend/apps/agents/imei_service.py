@@ -0,0 +1,105 @@
+"""
+IMEI Resolution Service
+Resolves a device IMEI to its phone and agent for the device-facing endpoints
+
+Resolutions are cached in a TwoLevelCache (apps.platform.cache_service):
+a small in-process LRU in front of the shared cache. Entries are compact
+tuples tagged with their agent, so a device request costs no database
+query once the IMEI has been seen. Phone and PlatformPhoneRegistry saves
+invalidate the affected IMEIs and Agent saves invalidate the agent's tag,
+in the shared cache and in this process's LRU; other processes may serve
+a stale entry for up to DEVICE_IMEI_LOCAL_TTL seconds.
+"""
+import functools
+from typing import NamedTuple, Optional
+from django.conf import settings
+from django.db import transaction
+
+from apps.platform.cache_service import TwoLevelCache, agent_tag, invalidate_agent
+
+# Cached marker for IMEIs that matched no phone
+NOT_FOUND = ()
+
+
+class ResolvedDevice(NamedTuple):
+    """What device endpoints need to know about an IMEI"""
+    phone_id: int
+    agent_id: int
+    agent_status: str
+    registry_id: int
+    blacklisted: bool
+
+
+def _ttl(value):
+    # Unknown IMEIs are only remembered briefly
+    return settings.DEVICE_IMEI_CACHE_TTL if value else settings.DEVICE_IMEI_LOCAL_TTL
+
+
+def _tags(value):
+    return [agent_tag(value[1])] if value else []
+
+
+devices = TwoLevelCache(
+    'device:imei',
+    ttl=_ttl,
+    local_ttl=settings.DEVICE_IMEI_LOCAL_TTL,
+    local_size=settings.DEVICE_IMEI_LOCAL_SIZE
+)
+
+
+def _rows(imei):
+    from .models import Phone
+    return Phone.objects.filter(imei=imei).values_list(
+        'id',
+        'agent_id',
+        'agent__status',
+        'platform_registry_id',
+        'platform_registry__is_blacklisted'
+    )
+
+
+def _lookup(imei):
+    row = _rows(imei).first()
+    return tuple(row) if row else NOT_FOUND
+
+
+async def _alookup(imei):
+    row = await _rows(imei).afirst()
+    return tuple(row) if row else NOT_FOUND
+
+
+def resolve_imei(imei) -> Optional[ResolvedDevice]:
+    """
+    Resolve an IMEI to its phone, agent and registry entry
+
+    Args:
+        imei: Device IMEI
+
+    Returns:
+        ResolvedDevice, or None if no phone has this IMEI
+    """
+    value = devices.get_or_set(imei, lambda: _lookup(imei), tags=_tags)
+    return ResolvedDevice(*value) if value else None
+
+
+async def aresolve_imei(imei) -> Optional[ResolvedDevice]:
+    """Async version of resolve_imei, for the ASGI device views"""
+    value = await devices.aget_or_set(imei, functools.partial(_alookup, imei), tags=_tags)
+    return ResolvedDevice(*value) if value else None
+
+
+def invalidate_imeis(imeis):
+    """
+    Drop cached resolutions for these IMEIs once the current transaction commits
+
+    Invalidating after commit keeps a concurrent request from re-caching
+    the pre-commit row.
+    """
+    imeis = list(imeis)
+    if imeis:
+        transaction.on_commit(lambda: devices.delete_many(imeis))
+
+
+def invalidate_agent_devices(agent_id):
+    """Drop cached resolutions for every phone of an agent"""
+    transaction.on_commit(lambda: invalidate_agent(agent_id))
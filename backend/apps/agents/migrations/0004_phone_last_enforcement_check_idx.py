@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0003_remove_phone_phones_agent_i_36414f_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='phone',
+            index=models.Index(fields=['last_enforcement_check'], name='phones_last_en_42535e_idx'),
+        ),
+    ]
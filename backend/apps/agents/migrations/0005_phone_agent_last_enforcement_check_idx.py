@@ -0,0 +1,15 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0004_phone_last_enforcement_check_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='phone',
+            index=models.Index(fields=['agent', 'last_enforcement_check'], name='phones_agent_i_6a187c_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+# (index name, table, column): served by search_service
+TRIGRAM_INDEXES = [
+    ('customers_full_name_trgm_idx', 'customers', 'full_name'),
+    ('customers_phone_number_trgm_idx', 'customers', 'phone_number'),
+    ('phones_imei_trgm_idx', 'phones', 'imei'),
+    ('phones_model_trgm_idx', 'phones', 'model'),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm exists on PostgreSQL only; elsewhere search falls back to
+    # icontains and there is nothing to build
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+    schema_editor.execute('DROP EXTENSION IF EXISTS pg_trgm')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run in a transaction; building the
+    # indexes this way doesn't block writes to the tables
+    atomic = False
+
+    dependencies = [
+        ('agents', '0005_phone_agent_last_enforcement_check_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+from config.db.operations import AddIndexConcurrently, RemoveIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes for the filters IndexedFilterBackend accepts, built without
+    # blocking writes (CREATE INDEX CONCURRENTLY can't run in a transaction)
+    atomic = False
+
+    dependencies = [
+        ('agents', '0006_trigram_search_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='phone',
+            index=models.Index(fields=['agent', 'locking_app_installed', 'lifecycle_status'], name='phones_agent_i_a7cb14_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='sale',
+            index=models.Index(fields=['agent', 'status', 'created_at'], name='sales_agent_i_eefe61_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='sale',
+            index=models.Index(fields=['agent', 'created_at'], name='sales_agent_i_25f6bd_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='sale',
+            name='sales_agent_i_dd7531_idx',
+        ),
+    ]
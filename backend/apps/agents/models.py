@@ -1,6 +1,7 @@
 from django.db import models
 from django.core.exceptions import ValidationError
 from apps.platform.models import Agent, User, PlatformPhoneRegistry
+from .imei_service import invalidate_imeis
 
 
 # ========================================
@@ -13,6 +14,22 @@ class SaleStatus(models.TextChoices):
     DEFAULTED = "defaulted", "Defaulted"
 
 
+class PhoneLifecycle(models.TextChoices):
+    """Values of Phone.lifecycle_status set through the API"""
+    IN_STOCK = "in_stock", "In Stock"
+    SOLD = "sold", "Sold"
+    RETURNED = "returned", "Returned"
+    REPOSSESSED = "repossessed", "Repossessed"
+
+
+# Allowed lifecycle moves (bulk updates). Moves into or out of 'sold' go
+# with a Sale being created or closed, so they are never bulk moves.
+PHONE_LIFECYCLE_TRANSITIONS = {
+    PhoneLifecycle.RETURNED: {PhoneLifecycle.IN_STOCK},
+    PhoneLifecycle.REPOSSESSED: {PhoneLifecycle.IN_STOCK},
+}
+
+
 # ========================================
 # AGENT DOMAIN MODELS
 # ========================================
@@ -62,6 +79,7 @@ class Customer(models.Model):
     
     class Meta:
         db_table = 'customers'
+        # Trigram (GIN) indexes on full_name and phone_number: migration 0006
         indexes = [
             models.Index(fields=['agent', 'phone_number']),
             models.Index(fields=['phone_number']),
@@ -99,15 +117,26 @@ class Phone(models.Model):
     
     class Meta:
         db_table = 'phones'
+        # Trigram (GIN) indexes on imei and model: migration 0006
         indexes = [
             models.Index(fields=['agent', 'lifecycle_status']),
+            models.Index(fields=['agent', 'locking_app_installed', 'lifecycle_status']),
             models.Index(fields=['imei']),
             models.Index(fields=['platform_registry']),
+            models.Index(fields=['last_enforcement_check']),
+            models.Index(fields=['agent', 'last_enforcement_check']),
         ]
     
     def __str__(self):
         return f"{self.brand} {self.model} - {self.imei}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # IMEI as stored, so save() can drop the old IMEI's cached resolution
+        instance._stored_imei = instance.__dict__.get('imei')
+        return instance
+    
     def save(self, *args, **kwargs):
         # Auto-create/link PlatformPhoneRegistry
         if not self.platform_registry_id:
@@ -123,6 +152,13 @@ class Phone(models.Model):
                 registry.current_agent = self.agent
                 registry.save()
         super().save(*args, **kwargs)
+        stored_imei = getattr(self, '_stored_imei', None)
+        invalidate_imeis({self.imei, stored_imei} - {None})
+        self._stored_imei = self.imei
+    
+    def delete(self, *args, **kwargs):
+        invalidate_imeis([self.imei])
+        return super().delete(*args, **kwargs)
 
 
 class Sale(models.Model):
@@ -178,7 +214,8 @@ class Sale(models.Model):
             ),
         ]
         indexes = [
-            models.Index(fields=['agent', 'status']),
+            models.Index(fields=['agent', 'status', 'created_at']),
+            models.Index(fields=['agent', 'created_at']),
             models.Index(fields=['customer']),
             models.Index(fields=['phone']),
         ]
@@ -0,0 +1,118 @@
+"""
+Customer and Phone Search
+Ranked ?search= for the customer and phone lists
+
+On PostgreSQL the lookups are served by the pg_trgm GIN indexes of
+migration 0006 (customer name and phone number, phone IMEI and model):
+
+    - Names and phone models match by trigram word similarity, so a
+      fragment or a misspelling of any word finds the row, best match first.
+    - Digits are looked up as a phone number fragment (a leading 0 or 234
+      dropped, so '0803 123' finds '+234803123...') or an IMEI prefix (a full
+      IMEI is an exact lookup on the unique index).
+
+Other databases fall back to case-insensitive containment.
+"""
+import re
+from django.contrib.postgres.search import TrigramSimilarity, TrigramWordSimilarity
+from django.db import connections
+from django.db.models import Case, IntegerField, Value, When
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Customer, Phone
+
+SEARCH_PARAM = 'search'
+MIN_SEARCH_LENGTH = 3
+IMEI_LENGTH = 15
+
+_NUMBER = re.compile(r'^\+?[\d\s-]+$')
+
+
+def _trigrams_supported(queryset):
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def _digits(term):
+    """Digits of a number-like search term, or None for text"""
+    return re.sub(r'\D', '', term) if _NUMBER.match(term) else None
+
+
+def national_number(digits):
+    """Phone number digits without the country code or trunk prefix"""
+    if digits.startswith('234') and len(digits) > 10:
+        return digits[3:]
+    return digits.lstrip('0')
+
+
+def _ranked_by_similarity(queryset, field, term):
+    if not _trigrams_supported(queryset):
+        return queryset.filter(**{f'{field}__icontains': term}).order_by(field, 'id')
+    return (
+        queryset.filter(**{f'{field}__trigram_word_similar': term})
+        .annotate(rank=TrigramWordSimilarity(term, field))
+        .order_by('-rank', 'id')
+    )
+
+
+def search_customers(queryset, term):
+    """
+    Customers whose name or phone number matches the term, best first
+
+    Args:
+        queryset: Customers to search (the agent's)
+        term: Name fragment or phone number fragment
+    """
+    digits = _digits(term)
+    if digits is None:
+        return _ranked_by_similarity(queryset, 'full_name', term)
+
+    number = national_number(digits) or digits
+    queryset = queryset.filter(phone_number__contains=number)
+    if not _trigrams_supported(queryset):
+        return queryset.order_by('phone_number', 'id')
+    # The closer the fragment is to the whole number, the better
+    return queryset.annotate(
+        rank=TrigramSimilarity('phone_number', number)
+    ).order_by('-rank', 'id')
+
+
+def search_phones(queryset, term):
+    """
+    Phones whose IMEI starts with the digits or whose model matches the text
+
+    Args:
+        queryset: Phones to search (the agent's)
+        term: IMEI prefix, full IMEI or model fragment
+    """
+    digits = _digits(term)
+    if digits is None:
+        return _ranked_by_similarity(queryset, 'model', term)
+    if len(digits) == IMEI_LENGTH:
+        return queryset.filter(imei=digits)
+    # Case-sensitive LIKE 'digits%', which the trigram index serves
+    return queryset.filter(imei__startswith=digits).annotate(
+        rank=Case(When(imei=digits, then=Value(1)), default=Value(0), output_field=IntegerField())
+    ).order_by('-rank', 'imei')
+
+
+SEARCHES = {
+    Customer: search_customers,
+    Phone: search_phones,
+}
+
+
+class TrigramSearchFilter(BaseFilterBackend):
+    """
+    ?search= for the models in SEARCHES, ordered by relevance
+
+    Terms shorter than MIN_SEARCH_LENGTH characters (trigrams) are rejected.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        term = request.query_params.get(SEARCH_PARAM, '').strip()
+        if not term:
+            return queryset
+        if len(term) < MIN_SEARCH_LENGTH:
+            raise ValidationError({SEARCH_PARAM: f'Enter at least {MIN_SEARCH_LENGTH} characters'})
+        return SEARCHES[queryset.model](queryset, term)
@@ -1,15 +1,17 @@
 from rest_framework import serializers
-from .models import AgentStaff, Customer, Phone, Sale
+from apps.platform.bulk_service import BulkUpdateSerializer
+from apps.platform.fieldsets import SparseFieldsetMixin
+from .models import AgentStaff, Customer, Phone, PhoneLifecycle, Sale
 
 
-class AgentStaffSerializer(serializers.ModelSerializer):
+class AgentStaffSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = AgentStaff
         fields = ['id', 'full_name', 'role', 'status', 'created_at']
         read_only_fields = ['id', 'created_at']
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = ['id', 'full_name', 'phone_number', 'email', 'address', 
@@ -21,7 +23,7 @@ class CustomerSerializer(serializers.ModelSerializer):
         }
 
 
-class PhoneSerializer(serializers.ModelSerializer):
+class PhoneSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Phone
         fields = ['id', 'imei', 'model', 'platform_registry', 
@@ -30,7 +32,24 @@ class PhoneSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class SaleSerializer(serializers.ModelSerializer):
+class PhoneBulkUpdateSerializer(BulkUpdateSerializer):
+    """Bulk PATCH: one lifecycle move or one locking_app_installed toggle"""
+    lifecycle_status = serializers.ChoiceField(
+        choices=[choice for choice in PhoneLifecycle.choices if choice[0] != PhoneLifecycle.SOLD],
+        required=False
+    )
+    locking_app_installed = serializers.BooleanField(required=False)
+
+
+class PhonePresenceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Phone
+        fields = ['id', 'imei', 'model', 'lifecycle_status', 
+                  'is_locked', 'last_enforcement_check']
+        read_only_fields = fields
+
+
+class SaleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     customer_name = serializers.CharField(source='customer.full_name', read_only=True)
     phone_model = serializers.CharField(source='phone.model', read_only=True)
     staff_name = serializers.CharField(source='sold_by.full_name', read_only=True, allow_null=True)
@@ -41,6 +60,12 @@ class SaleSerializer(serializers.ModelSerializer):
                   'sold_by', 'staff_name', 'sale_price', 'down_payment',
                   'total_payable', 'balance_remaining', 'status', 'created_at']
         read_only_fields = ['id', 'created_at']
+        expandable_fields = {
+            'customer': (CustomerSerializer, {}),
+            'phone': (PhoneSerializer, {}),
+            'sold_by': (AgentStaffSerializer, {}),
+            'installments': ('apps.payments.serializers.InstallmentScheduleSerializer', {'many': True}),
+        }
     
     def validate(self, data):
         # Check for active sale on this phone
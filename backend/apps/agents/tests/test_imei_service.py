@@ -0,0 +1,126 @@
+"""
+Tests for the cached IMEI resolver
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.platform.models import User, Agent, AgentStatus
+from apps.agents.models import Phone
+from apps.agents.imei_service import resolve_imei, devices, ResolvedDevice
+from apps.platform.cache_service import LocalLRUCache
+
+
+@pytest.fixture
+def resolver_phone(db):
+    """Create an agent with one phone"""
+    user = User.objects.create_user(email='resolver@test.com', password='testpass123')
+    agent = Agent.objects.create(user=user, business_name='Resolver Agent', status=AgentStatus.ACTIVE)
+    return Phone.objects.create(
+        agent=agent,
+        imei='350000000000301',
+        model='Galaxy A14',
+        lifecycle_status='in_stock'
+    )
+
+
+@pytest.mark.django_db
+class TestResolveImei:
+    """Test resolve_imei"""
+    
+    def test_resolves_phone_agent_and_registry(self, resolver_phone):
+        device = resolve_imei(resolver_phone.imei)
+        
+        assert device == ResolvedDevice(
+            phone_id=resolver_phone.id,
+            agent_id=resolver_phone.agent_id,
+            agent_status=AgentStatus.ACTIVE,
+            registry_id=resolver_phone.platform_registry_id,
+            blacklisted=False
+        )
+    
+    def test_second_lookup_hits_no_database(self, resolver_phone):
+        resolve_imei(resolver_phone.imei)
+        
+        with CaptureQueriesContext(connection) as queries:
+            resolve_imei(resolver_phone.imei)
+            devices.local.clear()
+            resolve_imei(resolver_phone.imei)  # from the shared cache
+        
+        assert len(queries) == 0
+    
+    def test_unknown_imei_until_phone_is_created(self, resolver_phone, django_capture_on_commit_callbacks):
+        assert resolve_imei('000000000000000') is None
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            Phone.objects.create(
+                agent=resolver_phone.agent,
+                imei='000000000000000',
+                model='Galaxy A14',
+                lifecycle_status='in_stock'
+            )
+        
+        assert resolve_imei('000000000000000').agent_id == resolver_phone.agent_id
+    
+    def test_agent_save_invalidates(self, resolver_phone, django_capture_on_commit_callbacks):
+        resolve_imei(resolver_phone.imei)
+        agent = resolver_phone.agent
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            agent.status = AgentStatus.RESTRICTED
+            agent.save()
+        
+        assert resolve_imei(resolver_phone.imei).agent_status == AgentStatus.RESTRICTED
+    
+    def test_registry_save_invalidates(self, resolver_phone, django_capture_on_commit_callbacks):
+        resolve_imei(resolver_phone.imei)
+        registry = resolver_phone.platform_registry
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            registry.is_blacklisted = True
+            registry.save()
+        
+        assert resolve_imei(resolver_phone.imei).blacklisted is True
+        devices.local.clear()
+        assert devices.get(resolver_phone.imei)[4] is True  # shared cache entry
+    
+    def test_phone_delete_invalidates(self, resolver_phone, django_capture_on_commit_callbacks):
+        resolve_imei(resolver_phone.imei)
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            resolver_phone.delete()
+        
+        assert resolve_imei(resolver_phone.imei) is None
+    
+    def test_imei_change_invalidates_the_old_imei(self, resolver_phone, django_capture_on_commit_callbacks):
+        old_imei = resolver_phone.imei
+        resolve_imei(old_imei)
+        phone = Phone.objects.get(pk=resolver_phone.pk)
+        
+        phone.imei = '350000000000399'
+        with django_capture_on_commit_callbacks(execute=True):
+            phone.save()
+        
+        assert resolve_imei(old_imei) is None
+        assert resolve_imei('350000000000399').phone_id == phone.id
+
+
+class TestLocalLRUCache:
+    """Test the in-process LRU level"""
+    
+    def test_evicts_least_recently_used(self):
+        lru = LocalLRUCache(maxsize=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        
+        assert lru.get('a') == 1
+        assert lru.get('b') is None
+        assert lru.get('c') == 3
+    
+    def test_entries_expire(self):
+        lru = LocalLRUCache(maxsize=2, ttl=-1)
+        lru.set('a', 1)
+        
+        assert lru.get('a') is None
@@ -0,0 +1,138 @@
+"""
+Tests for customer and phone search
+"""
+import pytest
+from importlib import import_module
+from django.db import connection
+
+from apps.agents.models import Customer, Phone
+from apps.agents.search_service import national_number, search_customers, search_phones
+from apps.agents.views import CustomerViewSet, PhoneViewSet
+
+TRIGRAM_INDEXES = import_module('apps.agents.migrations.0006_trigram_search_indexes').TRIGRAM_INDEXES
+
+postgres_only = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Trigram search needs PostgreSQL'
+)
+
+customer_list = CustomerViewSet.as_view({'get': 'list'})
+phone_list = PhoneViewSet.as_view({'get': 'list'})
+
+
+@pytest.fixture
+def agent(agent):
+    if connection.vendor == 'postgresql':
+        # Created by migration 0006; test databases may be built without migrations
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+            if cursor.fetchone() is None:
+                pytest.skip('pg_trgm is not installed on this server')
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    return agent
+
+
+@pytest.fixture
+def customers(agent):
+    names = [
+        ('Adebayo Ogunleye', '+2348031234567'),
+        ('Chidinma Okafor', '08059876543'),
+        ('Adebola Adeyemi', '+2347011112222'),
+    ]
+    return [
+        Customer.objects.create(agent=agent, full_name=name, phone_number=number, address='Lagos')
+        for name, number in names
+    ]
+
+
+@pytest.fixture
+def phones(agent):
+    return [
+        Phone.objects.create(agent=agent, imei=imei, model=model, lifecycle_status='in_stock')
+        for imei, model in [
+            ('356938035643809', 'Galaxy A14'),
+            ('356938035643817', 'Redmi Note 12'),
+            ('861234567890123', 'Tecno Spark 10'),
+        ]
+    ]
+
+
+def _names(response):
+    return [row['full_name'] for row in response.data['results']]
+
+
+@pytest.mark.parametrize('digits,expected', [
+    ('08031234567', '8031234567'),
+    ('2348031234567', '8031234567'),
+    ('803123', '803123'),
+    ('234', '234'),
+])
+def test_national_number(digits, expected):
+    assert national_number(digits) == expected
+
+
+@pytest.mark.django_db
+class TestSearchEndpoints:
+    """?search= on the customer and phone lists"""
+
+    def test_customers_by_name_fragment(self, user, customers, api_request):
+        response = api_request(customer_list, user, data={'search': 'Okafor'})
+
+        assert _names(response) == ['Chidinma Okafor']
+
+    def test_customers_by_number_in_any_format(self, user, customers, api_request):
+        for term in ('0803 123 4567', '+234 803 123', '8059876'):
+            response = api_request(customer_list, user, data={'search': term})
+            assert len(response.data['results']) == 1
+
+        assert _names(api_request(customer_list, user, data={'search': '0803 123'}))[0] == 'Adebayo Ogunleye'
+
+    def test_phones_by_imei_prefix_and_model(self, user, phones, api_request):
+        response = api_request(phone_list, user, data={'search': '35693803564'})
+        assert [row['imei'] for row in response.data['results']] == ['356938035643809', '356938035643817']
+
+        response = api_request(phone_list, user, data={'search': '356938035643817'})
+        assert [row['model'] for row in response.data['results']] == ['Redmi Note 12']
+
+        response = api_request(phone_list, user, data={'search': 'Spark'})
+        assert [row['imei'] for row in response.data['results']] == ['861234567890123']
+
+    def test_other_agents_records_are_not_found(self, user2, agent2, customers, api_request):
+        assert _names(api_request(customer_list, user2, data={'search': 'Adebayo'})) == []
+
+    def test_short_terms_are_rejected(self, user, customers, api_request):
+        response = api_request(customer_list, user, data={'search': 'Ad'})
+
+        assert response.status_code == 400
+        assert 'search' in response.data
+
+
+@postgres_only
+@pytest.mark.django_db
+class TestTrigramSearch:
+    """Similarity matching and index use on PostgreSQL"""
+
+    def test_misspelt_names_match_best_first(self, agent, customers):
+        results = search_customers(Customer.objects.filter(agent=agent), 'Adebayu')
+
+        assert [c.full_name for c in results][0] == 'Adebayo Ogunleye'
+        assert results[0].rank > 0.3
+
+    @pytest.mark.parametrize('index,table,column', TRIGRAM_INDEXES)
+    def test_lookups_use_the_trigram_indexes(self, agent, index, table, column):
+        search, term = {
+            'full_name': (search_customers, 'Okafor'),
+            'phone_number': (search_customers, '0805987'),
+            'imei': (search_phones, '3569380'),
+            'model': (search_phones, 'Galaxy'),
+        }[column]
+        model = Customer if search is search_customers else Phone
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {index} ON {table} USING gin ({column} gin_trgm_ops)'
+            )
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+        plan = search(model.objects.all(), term).explain()
+
+        assert index in plan
@@ -0,0 +1,139 @@
+"""
+Tests for ?fields= / ?expand= and the planned viewset querysets
+"""
+import pytest
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.agents.models import AgentStaff, Customer, Phone, Sale, SaleStatus
+from apps.agents.views import SaleViewSet
+from apps.payments.models import InstallmentSchedule
+from apps.platform.fieldsets import Fieldset
+
+sale_list = SaleViewSet.as_view({'get': 'list'})
+sale_detail = SaleViewSet.as_view({'get': 'retrieve'})
+
+
+@pytest.fixture
+def sales(agent):
+    """Three active sales with a seller and two installments each"""
+    staff = AgentStaff.objects.create(agent=agent, full_name='Sales Rep', role='sales')
+    result = []
+    for i in range(3):
+        customer = Customer.objects.create(
+            agent=agent, full_name=f'Customer {i}', phone_number=f'+23480000000{i}',
+            address='Lagos'
+        )
+        phone = Phone.objects.create(
+            agent=agent, imei=f'35000000000000{i}', model='Galaxy A14', lifecycle_status='sold'
+        )
+        sale = Sale.objects.create(
+            agent=agent, customer=customer, phone=phone, sold_by=staff,
+            sale_price=Decimal('100000.00'), down_payment=Decimal('20000.00'),
+            total_payable=Decimal('120000.00'), balance_remaining=Decimal('100000.00'),
+            status=SaleStatus.ACTIVE
+        )
+        for week in (1, 2):
+            InstallmentSchedule.objects.create(
+                sale=sale, amount_due=Decimal('50000.00'),
+                due_date=timezone.now().date() + timedelta(weeks=week)
+            )
+        result.append(sale)
+    return result
+
+
+@pytest.fixture
+def get_sales(api_request):
+    """GET a sales view, rendered, with the queries it ran"""
+    def get(view, user, query='', **kwargs):
+        with CaptureQueriesContext(connection) as queries:
+            response = api_request(view, user, query, **kwargs)
+            response.render()
+        return response, queries
+    return get
+
+
+class TestFieldsetParsing:
+    """Test the ?fields= / ?expand= tree"""
+
+    def test_dotted_fields_expand_their_parent(self):
+        fieldset = Fieldset.parse('id, customer.full_name', 'phone')
+
+        assert fieldset.fields == {'id', 'customer'}
+        assert fieldset.expand['customer'].fields == {'full_name'}
+        assert fieldset.expand['phone'].fields is None
+
+    def test_empty_parameters_select_everything(self):
+        fieldset = Fieldset.parse(None, '')
+
+        assert fieldset.fields is None
+        assert fieldset.expand == {}
+
+
+@pytest.mark.django_db
+class TestSaleList:
+    """Sparse and expanded sale lists"""
+
+    def test_default_rows_join_related_names(self, user, sales, get_sales):
+        response, queries = get_sales(sale_list, user)
+
+        assert response.status_code == 200
+        row = response.data['results'][0]
+        assert row['customer_name'].startswith('Customer')
+        assert row['phone_model'] == 'Galaxy A14'
+        assert row['staff_name'] == 'Sales Rep'
+        # Page count + page, whatever the number of rows
+        assert len(queries) == 2
+
+    def test_sparse_fields_select_only_their_columns(self, user, sales, get_sales):
+        response, queries = get_sales(sale_list, user, '?fields=id,balance_remaining')
+
+        assert response.data['results'][0].keys() == {'id', 'balance_remaining'}
+        sql = queries[-1]['sql']
+        assert 'JOIN' not in sql
+        assert '"sales"."total_payable"' not in sql
+
+    def test_expanded_relations_are_joined_and_prefetched(self, user, sales, get_sales):
+        response, queries = get_sales(
+            sale_list, user, '?fields=id,customer.full_name,installments.amount_due'
+            '&expand=sold_by'
+        )
+
+        assert response.status_code == 200
+        row = response.data['results'][0]
+        assert row.keys() == {'id', 'customer', 'installments'}
+        assert row['customer'] == {'full_name': row['customer']['full_name']}
+        assert [inst['amount_due'] for inst in row['installments']] == ['50000.00'] * 2
+        # Count, sales joined to customers, one installments query
+        assert len(queries) == 3
+        assert '"customers"."address"' not in queries[1]['sql']
+
+    def test_query_count_does_not_grow_with_rows(self, user, agent, sales, get_sales):
+        _, few = get_sales(sale_list, user, '?expand=customer,phone,sold_by,installments')
+        Sale.objects.filter(id=sales[0].id).update(status=SaleStatus.COMPLETED)
+        phone = Phone.objects.create(agent=agent, imei='350000000000009', model='Redmi 12', lifecycle_status='sold')
+        Sale.objects.create(
+            agent=agent, customer=sales[0].customer, phone=phone,
+            sale_price=Decimal('100000.00'), total_payable=Decimal('120000.00'),
+            balance_remaining=Decimal('120000.00'), status=SaleStatus.ACTIVE
+        )
+
+        response, more = get_sales(sale_list, user, '?expand=customer,phone,sold_by,installments')
+
+        assert response.data['count'] == 4
+        assert [row['sold_by'] for row in response.data['results']].count(None) == 1
+        assert len(more) == len(few)
+
+    def test_retrieve_honours_fields(self, user, sales, get_sales):
+        response, _ = get_sales(sale_detail, user, '?fields=status,phone.imei', pk=sales[0].id)
+
+        assert response.data == {'phone': {'imei': '350000000000000'}, 'status': 'active'}
+
+    def test_unknown_names_are_rejected(self, user, sales, get_sales):
+        response, _ = get_sales(sale_list, user, '?fields=id,margin&expand=agent')
+
+        assert response.status_code == 400
+        assert set(response.data) == {'fields', 'expand'}
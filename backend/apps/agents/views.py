@@ -1,61 +1,77 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
-from .models import AgentStaff, Customer, Phone, Sale
+from django.utils import timezone
+from .models import AgentStaff, Customer, Phone, Sale, SaleStatus, PHONE_LIFECYCLE_TRANSITIONS
+from .search_service import TrigramSearchFilter
 from .serializers import (
     AgentStaffSerializer, CustomerSerializer, 
-    PhoneSerializer, SaleSerializer
+    PhoneSerializer, PhoneBulkUpdateSerializer, PhonePresenceSerializer, SaleSerializer
 )
-from apps.platform.models import Agent
 # Android 15+ Hardening: Settlement enforcement decorator
 from apps.payments.decorators import require_settlement_paid
+from apps.audit.middleware import get_client_ip
+from apps.platform.bulk_service import apply_bulk_update, bulk_update_response
+from apps.platform.export_service import filter_export, stream_export
+from apps.platform.fieldsets import PlannedQuerysetMixin
+from apps.platform.filters import IndexedFilterBackend
 
 
-class AgentStaffViewSet(viewsets.ModelViewSet):
+class AgentStaffViewSet(PlannedQuerysetMixin, viewsets.ModelViewSet):
     """Sub-agents and staff management"""
     serializer_class = AgentStaffSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        agent = Agent.objects.get(user=self.request.user)
+        agent = self.request.user.agent_profile
         return AgentStaff.objects.filter(agent=agent)
     
     def perform_create(self, serializer):
-        agent = Agent.objects.get(user=self.request.user)
+        agent = self.request.user.agent_profile
         serializer.save(agent=agent)
 
 
-class CustomerViewSet(viewsets.ModelViewSet):
+class CustomerViewSet(PlannedQuerysetMixin, viewsets.ModelViewSet):
     """Customer management"""
     serializer_class = CustomerSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # ?search= by name or phone number (search_service)
+    filter_backends = [IndexedFilterBackend, TrigramSearchFilter]
     
     def get_queryset(self):
-        agent = Agent.objects.get(user=self.request.user)
+        agent = self.request.user.agent_profile
         return Customer.objects.filter(agent=agent)
     
     # Android 15+ Hardening: Enforce settlement payment before customer operations
     @require_settlement_paid
     def perform_create(self, serializer):
-        agent = Agent.objects.get(user=self.request.user)
+        agent = self.request.user.agent_profile
         serializer.save(agent=agent)
 
 
-class PhoneViewSet(viewsets.ModelViewSet):
+class SilentPhonePagination(CursorPagination):
+    """Keyset pagination along the (agent, last_enforcement_check) index"""
+    ordering = 'last_enforcement_check'
+    page_size = 50
+
+
+class PhoneViewSet(PlannedQuerysetMixin, viewsets.ModelViewSet):
     """Phone inventory management"""
     serializer_class = PhoneSerializer
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['lifecycle_status', 'locking_app_installed']
-    search_fields = ['imei', 'model']
+    # ?search= by IMEI prefix or model (search_service)
+    filter_backends = [IndexedFilterBackend, TrigramSearchFilter]
     
     def get_queryset(self):
-        agent = Agent.objects.get(user=self.request.user)
+        agent = self.request.user.agent_profile
         return Phone.objects.filter(agent=agent)
     
     # Android 15+ Hardening: Enforce settlement payment before phone registration
     @require_settlement_paid
     def perform_create(self, serializer):
-        agent = Agent.objects.get(user=self.request.user)
+        agent = self.request.user.agent_profile
         serializer.save(agent=agent)
     
     @action(detail=True, methods=['get'])
@@ -76,22 +92,94 @@ class PhoneViewSet(viewsets.ModelViewSet):
                 'created_at': latest_command.created_at if latest_command else None,
             } if latest_command else None
         })
+    
+    @action(detail=False, methods=['patch'])
+    def bulk(self, request):
+        """
+        Apply one lifecycle move or locking_app_installed toggle to many phones
+        
+        PATCH {"ids": [...], "lifecycle_status": "in_stock"} or
+        {"ids": [...], "locking_app_installed": true}; responds with per-id outcomes.
+        """
+        serializer = PhoneBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        
+        agent = request.user.agent_profile
+        result = apply_bulk_update(
+            Phone.objects.filter(agent=agent),
+            data['ids'], data['field'], data['value'],
+            agent=agent,
+            entity_type='phone',
+            transitions=PHONE_LIFECYCLE_TRANSITIONS if data['field'] == 'lifecycle_status' else None,
+            updates={'updated_at': timezone.now()},
+            actor=getattr(request.user, 'staff_profile', None),
+            ip_address=get_client_ip(request)
+        )
+        return bulk_update_response(result)
+    
+    @action(detail=False, methods=['get'])
+    def presence(self, request):
+        """Count the agent's phones by time since their last check-in"""
+        from apps.enforcement.heartbeat_service import presence_counts
+        agent = request.user.agent_profile
+        return Response(presence_counts(agent.id))
+    
+    @action(detail=False, methods=['get'])
+    def offline(self, request):
+        """List phones that stopped checking in, longest silent first"""
+        from apps.enforcement.heartbeat_service import silent_phones
+        try:
+            hours = int(request.query_params.get('hours', 24))
+        except ValueError:
+            return Response({'error': 'hours must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        agent = request.user.agent_profile
+        phones = silent_phones(hours, agent=agent).only(
+            'id', 'imei', 'model', 'lifecycle_status', 'is_locked', 'last_enforcement_check'
+        )
+        paginator = SilentPhonePagination()
+        page = paginator.paginate_queryset(phones, request, view=self)
+        return paginator.get_paginated_response(PhonePresenceSerializer(page, many=True).data)
+
+
+SALE_EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('created_at', 'created_at'),
+    ('status', 'status'),
+    ('customer_id', 'customer_id'),
+    ('customer_name', 'customer__full_name'),
+    ('customer_phone', 'customer__phone_number'),
+    ('imei', 'phone__imei'),
+    ('phone_model', 'phone__model'),
+    ('staff_name', 'sold_by__full_name'),
+    ('sale_price', 'sale_price'),
+    ('down_payment', 'down_payment'),
+    ('total_payable', 'total_payable'),
+    ('balance_remaining', 'balance_remaining'),
+    ('installment_amount', 'installment_amount'),
+    ('installment_frequency', 'installment_frequency'),
+    ('number_of_installments', 'number_of_installments'),
+    ('completion_date', 'completion_date'),
+)
 
 
-class SaleViewSet(viewsets.ModelViewSet):
+class SaleViewSet(PlannedQuerysetMixin, viewsets.ModelViewSet):
     """Sales management"""
     serializer_class = SaleSerializer
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['status', 'customer', 'phone']
+    filter_date_field = 'created_at'
     
     def get_queryset(self):
-        agent = Agent.objects.get(user=self.request.user)
-        return Sale.objects.filter(agent=agent).select_related('customer', 'phone', 'staff')
+        agent = self.request.user.agent_profile
+        # Related rows for list/retrieve are joined per ?fields=/?expand=
+        return Sale.objects.filter(agent=agent)
     
     # Android 15+ Hardening: Enforce settlement payment before sale creation
     @require_settlement_paid
     def perform_create(self, serializer):
-        agent = Agent.objects.get(user=self.request.user)
+        agent = self.request.user.agent_profile
         sale = serializer.save(agent=agent)
         
         # Update phone status
@@ -113,10 +201,24 @@ class SaleViewSet(viewsets.ModelViewSet):
             InstallmentSchedule.objects.create(
                 sale=sale,
                 installment_number=i,
-                amount=sale.installment_amount,
+                amount_due=sale.installment_amount,
                 due_date=due_date
             )
     
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream all matching sales as CSV or NDJSON (?output=, ?from=, ?to=, ?status=)"""
+        sales = filter_export(
+            self.get_queryset(), request.query_params, 'created_at', SaleStatus.values
+        )
+        return stream_export(
+            sales.order_by('id'),
+            SALE_EXPORT_COLUMNS,
+            request.query_params.get('output', 'csv'),
+            f'sales-{timezone.localdate()}',
+            agent_id=request.user.agent_profile.id
+        )
+    
     @action(detail=True, methods=['get'])
     def payment_status(self, request, pk=None):
         """Get payment status for a sale"""
@@ -134,7 +236,8 @@ class SaleViewSet(viewsets.ModelViewSet):
             'installments': [
                 {
                     'number': inst.installment_number,
-                    'amount': inst.amount,
+                    'amount': inst.amount_due,
+                    'paid_amount': inst.paid_amount,
                     'due_date': inst.due_date,
                     'status': inst.status,
                     'paid_date': inst.paid_date
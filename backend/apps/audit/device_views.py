@@ -49,7 +49,7 @@ class DeviceAuditLogViewSet(viewsets.ViewSet):
         
         # Get agent from authenticated user
         try:
-            agent = Agent.objects.get(user=request.user)
+            agent = request.user.agent_profile
         except Agent.DoesNotExist:
             return Response(
                 {'error': 'Agent profile not found'},
@@ -107,7 +107,7 @@ class DeviceAuditLogViewSet(viewsets.ViewSet):
         
         # Get agent from authenticated user
         try:
-            agent = Agent.objects.get(user=request.user)
+            agent = request.user.agent_profile
         except Agent.DoesNotExist:
             return Response(
                 {'error': 'Agent profile not found'},
@@ -46,6 +46,10 @@ class AuditLoggingMiddleware(MiddlewareMixin):
         if not (200 <= response.status_code < 300):
             return response
         
+        # Views that wrote their own audit entry (e.g. bulk updates)
+        if getattr(response, 'audit_logged', False):
+            return response
+        
         # Get user (if authenticated)
         user = request.user if request.user.is_authenticated else None
         
@@ -166,9 +170,16 @@ class AuditLoggingMiddleware(MiddlewareMixin):
         """
         Get the client's IP address from the request.
         """
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return get_client_ip(request)
+
+
+def get_client_ip(request):
+    """
+    Get the client's IP address from the request.
+    """
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        ip = x_forwarded_for.split(',')[0]
+    else:
+        ip = request.META.get('REMOTE_ADDR')
+    return ip
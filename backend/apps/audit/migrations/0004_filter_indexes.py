@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+from config.db.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes for the filters IndexedFilterBackend accepts, built without
+    # blocking writes (CREATE INDEX CONCURRENTLY can't run in a transaction)
+    atomic = False
+
+    dependencies = [
+        ('audit', '0003_agentauditlog_description_agentauditlog_ip_address_and_more'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='agentauditlog',
+            index=models.Index(fields=['agent', 'action', 'created_at'], name='agent_audit_agent_i_4f39ad_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='platformauditlog',
+            index=models.Index(fields=['action', 'created_at'], name='platform_au_action_9631b4_idx'),
+        ),
+    ]
@@ -25,6 +25,7 @@ class PlatformAuditLog(models.Model):
         db_table = 'platform_audit_logs'
         indexes = [
             models.Index(fields=['user', 'created_at']),
+            models.Index(fields=['action', 'created_at']),
             models.Index(fields=['entity_type', 'entity_id']),
             models.Index(fields=['created_at']),
         ]
@@ -58,6 +59,7 @@ class AgentAuditLog(models.Model):
         db_table = 'agent_audit_logs'
         indexes = [
             models.Index(fields=['agent', 'created_at']),
+            models.Index(fields=['agent', 'action', 'created_at']),
             models.Index(fields=['actor', 'created_at']),
             models.Index(fields=['entity_type', 'entity_id']),
             models.Index(fields=['created_at']),
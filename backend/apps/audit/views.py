@@ -1,14 +1,15 @@
 from rest_framework import viewsets, permissions
 from .models import PlatformAuditLog, AgentAuditLog
 from .serializers import PlatformAuditLogSerializer, AgentAuditLogSerializer
-from apps.platform.models import Agent
+from config.db.routers import ReplicaReadMixin
 
 
-class PlatformAuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class PlatformAuditLogViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """Platform-level audit logs (read-only)"""
     serializer_class = PlatformAuditLogSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filterset_fields = ['action', 'resource_type', 'user']
+    filterset_fields = ['action', 'entity_type', 'user']
+    filter_date_field = 'created_at'
     
     def get_queryset(self):
         # Only platform admins can view platform audit logs
@@ -17,12 +18,13 @@ class PlatformAuditLogViewSet(viewsets.ReadOnlyModelViewSet):
         return PlatformAuditLog.objects.none()
 
 
-class AgentAuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AgentAuditLogViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """Agent-level audit logs (read-only)"""
     serializer_class = AgentAuditLogSerializer
     permission_classes = [permissions.IsAuthenticated]
-    filterset_fields = ['action', 'resource_type', 'user']
+    filterset_fields = ['action', 'entity_type', 'actor']
+    filter_date_field = 'created_at'
     
     def get_queryset(self):
-        agent = Agent.objects.get(user=self.request.user)
+        agent = self.request.user.agent_profile
         return AgentAuditLog.objects.filter(agent=agent)
@@ -0,0 +1,115 @@
+"""
+Async Device Views
+Async versions of the IMEI-keyed device polling endpoints, for ASGI
+
+Served at the same paths as their synchronous counterparts by the ASGI
+entry point (config/asgi.py routes through config/urls_asgi.py), so a
+polling request waiting on the cache or database does not hold a worker
+slot. Responses match the synchronous views field for field.
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import AuthenticationFailed
+
+from apps.agents.imei_service import aresolve_imei
+from apps.payments import monnify_views
+from apps.payments.settlement_service import aexisting_reserved_account_details
+from apps.platform.authentication import CachedJWTAuthentication
+from apps.platform.billing_service import abilling_settlement_snapshot
+from apps.platform.rate_limit_service import device_rate_limit
+from config.db.routers import set_read_agent, use_replica
+from .device_service import (
+    SYNC_SECTIONS,
+    aenforcement_status,
+    aclaim_pending_commands,
+    abuild_device_sync
+)
+
+
+def _phone_not_found():
+    return JsonResponse({'error': 'Phone not found'}, status=404)
+
+
+@require_GET
+@device_rate_limit('enforcement-status')
+@use_replica
+async def enforcement_status(request, imei):
+    """Async EnforcementStatusView"""
+    device = await aresolve_imei(imei)
+    if device is None:
+        return _phone_not_found()
+    set_read_agent(device.agent_id)
+    return JsonResponse(await aenforcement_status(device.phone_id))
+
+
+@require_GET
+async def pending_commands(request):
+    """Async DeviceCommandViewSet.pending"""
+    # Same authentication as the viewset (JWT)
+    try:
+        authenticated = await sync_to_async(CachedJWTAuthentication().authenticate)(request)
+    except AuthenticationFailed:
+        authenticated = None
+    if authenticated is None:
+        return JsonResponse(
+            {'detail': 'Authentication credentials were not provided.'}, status=401
+        )
+
+    imei = request.GET.get('imei')
+    if not imei:
+        return JsonResponse({'error': 'IMEI required'}, status=400)
+
+    device = await aresolve_imei(imei)
+    if device is None:
+        return _phone_not_found()
+    return JsonResponse(await aclaim_pending_commands(device.phone_id), safe=False)
+
+
+@require_GET
+@device_rate_limit('weekly-settlement')
+@use_replica
+async def weekly_settlement(request, imei):
+    """Async WeeklySettlementView"""
+    device = await aresolve_imei(imei)
+    if device is None:
+        return _phone_not_found()
+    set_read_agent(device.agent_id)
+    return JsonResponse(await abilling_settlement_snapshot(device.agent_id))
+
+
+@require_GET
+@device_rate_limit('reserved-account')
+async def reserved_account(request, imei):
+    """Async get_reserved_account"""
+    device = await aresolve_imei(imei)
+    if device is None:
+        return JsonResponse({
+            'success': False,
+            'message': 'Device not found'
+        }, status=404)
+
+    details = await aexisting_reserved_account_details(device.agent_id)
+    if details is not None:
+        return JsonResponse(details)
+
+    # First request for this agent: creating the account calls Monnify,
+    # so hand over to the synchronous view in a worker thread
+    return await sync_to_async(monnify_views.get_reserved_account)(request, imei)
+
+
+@require_GET
+@device_rate_limit('device-sync')
+@use_replica
+async def device_sync(request, imei):
+    """Async DeviceSyncView"""
+    device = await aresolve_imei(imei)
+    if device is None:
+        return _phone_not_found()
+    set_read_agent(device.agent_id)
+
+    known_versions = {
+        name: request.GET[name]
+        for name in SYNC_SECTIONS if name in request.GET
+    }
+    return JsonResponse(await abuild_device_sync(imei, device, known_versions))
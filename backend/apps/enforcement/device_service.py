@@ -0,0 +1,157 @@
+"""
+Device Sync Service
+Builds the payloads polled by the Android enforcement app
+
+The combined sync payload resolves the phone once and returns every
+section the device polls for. Each section carries a version (a short
+hash of its content); sections whose version matches the one the device
+already holds are sent without data.
+"""
+import hashlib
+import json
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from apps.agents.models import Sale
+from apps.payments.models import InstallmentSchedule
+from apps.payments.payment_service import OPEN_INSTALLMENT_STATUSES
+from apps.payments.settlement_service import (
+    existing_reserved_account_details,
+    aexisting_reserved_account_details,
+    weekly_settlement_snapshot,
+    aweekly_settlement_snapshot
+)
+from .models import DeviceCommand
+from .serializers import DeviceCommandSerializer
+
+# Sections of the sync payload, in response order
+SYNC_SECTIONS = ['enforcement', 'commands', 'settlement', 'reserved_account']
+
+
+def enforcement_status(phone_id):
+    """
+    Lock decision for a phone based on its active sale's installments
+
+    Args:
+        phone_id: Phone to decide for
+
+    Returns:
+        Dict matching the mobile EnforcementStatus response
+    """
+    sale = Sale.objects.filter(phone_id=phone_id, status='active').only('id', 'balance_remaining').first()
+
+    if not sale:
+        return {
+            'should_lock': False,
+            'reason': 'No active sale',
+            'balance': 0,
+            'overdue_count': 0
+        }
+
+    overdue_count = InstallmentSchedule.objects.filter(
+        sale=sale,
+        status__in=OPEN_INSTALLMENT_STATUSES,
+        due_date__lt=timezone.now().date()
+    ).count()
+    should_lock = overdue_count > 0
+
+    return {
+        'should_lock': should_lock,
+        'reason': 'Payment overdue' if should_lock else 'Up to date',
+        'balance': float(sale.balance_remaining),
+        'overdue_count': overdue_count
+    }
+
+
+async def aenforcement_status(phone_id):
+    """Async version of enforcement_status"""
+    sale = await Sale.objects.filter(phone_id=phone_id, status='active').only('id', 'balance_remaining').afirst()
+
+    if not sale:
+        return {
+            'should_lock': False,
+            'reason': 'No active sale',
+            'balance': 0,
+            'overdue_count': 0
+        }
+
+    overdue_count = await InstallmentSchedule.objects.filter(
+        sale=sale,
+        status__in=OPEN_INSTALLMENT_STATUSES,
+        due_date__lt=timezone.now().date()
+    ).acount()
+    should_lock = overdue_count > 0
+
+    return {
+        'should_lock': should_lock,
+        'reason': 'Payment overdue' if should_lock else 'Up to date',
+        'balance': float(sale.balance_remaining),
+        'overdue_count': overdue_count
+    }
+
+
+def claim_pending_commands(phone_id):
+    """Claim a device's pending commands for delivery and serialize them"""
+    commands = DeviceCommand.objects.claim_for_delivery(phone_id)
+    return DeviceCommandSerializer(commands, many=True).data
+
+
+# Claiming runs in a transaction with row locks, which the async ORM
+# does not support, so async callers run it in a worker thread
+aclaim_pending_commands = sync_to_async(claim_pending_commands)
+
+
+def section_version(data):
+    """Short content hash identifying one version of a sync section"""
+    encoded = json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha1(encoded.encode()).hexdigest()[:16]
+
+
+def build_device_sync(imei, device, known_versions=None):
+    """
+    Build the combined sync payload for a device
+
+    Pending commands are claimed for delivery (see
+    DeviceCommandQuerySet.claim_for_delivery), so the commands section is
+    always sent in full regardless of the version the device holds.
+
+    Args:
+        imei: Device IMEI
+        device: ResolvedDevice for the IMEI (see apps.agents.imei_service)
+        known_versions: Dict of section name -> version the device already has
+
+    Returns:
+        Dict with one {'version', 'changed', 'data'} entry per section;
+        'data' is omitted for unchanged sections
+    """
+    sections = {
+        'enforcement': enforcement_status(device.phone_id),
+        'commands': claim_pending_commands(device.phone_id),
+        'settlement': weekly_settlement_snapshot(device.agent_id),
+        'reserved_account': existing_reserved_account_details(device.agent_id),
+    }
+    return _versioned_payload(imei, sections, known_versions or {})
+
+
+async def abuild_device_sync(imei, device, known_versions=None):
+    """Async version of build_device_sync"""
+    sections = {
+        'enforcement': await aenforcement_status(device.phone_id),
+        'commands': await aclaim_pending_commands(device.phone_id),
+        'settlement': await aweekly_settlement_snapshot(device.agent_id),
+        'reserved_account': await aexisting_reserved_account_details(device.agent_id),
+    }
+    return _versioned_payload(imei, sections, known_versions or {})
+
+
+def _versioned_payload(imei, sections, known_versions):
+    payload = {'imei': imei, 'server_time': timezone.now().isoformat()}
+    for name in SYNC_SECTIONS:
+        data = sections[name]
+        version = section_version(data)
+        changed = name == 'commands' or known_versions.get(name) != version
+        payload[name] = {'version': version, 'changed': changed}
+        if changed:
+            payload[name]['data'] = data
+
+    return payload
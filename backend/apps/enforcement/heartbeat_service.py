@@ -0,0 +1,271 @@
+"""
+Device Heartbeat Service
+Records device health checks in the shared cache and flushes them in bulk
+
+Each heartbeat overwrites the phone's latest state in the cache and, if
+the phone is not already queued, appends it to a flush queue. The queue is
+a sequence counter plus one cache key per slot, which works on any cache
+backend with an atomic incr. flush_heartbeats() drains the queue and
+writes Phone.last_enforcement_check for all queued phones with a single
+bulk UPDATE, so the database sees one write per phone per flush interval
+instead of one per heartbeat.
+
+A slot is written just after its number is taken, so a flush can find a
+slot missing that is about to appear. The flush stops before the first
+missing slot and picks it up next time; a slot still missing after
+SLOT_WRITE_GRACE seconds (its writer died) is skipped. A phone whose slot
+was lost is queued again once its queued marker expires.
+
+Fleet presence (how many of an agent's phones are in each staleness
+bucket) is counted from the (agent, last_enforcement_check) index and
+cached per agent for PRESENCE_COUNTS_TTL seconds.
+"""
+import logging
+import time
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from apps.agents.models import Phone
+from apps.platform.cache_service import acquire_lock, release_lock
+
+logger = logging.getLogger(__name__)
+
+SEQUENCE_KEY = 'device:heartbeat:seq'
+CURSOR_KEY = 'device:heartbeat:flushed'
+FLUSH_LOCK_KEY = 'device:heartbeat:flush-lock'
+GAP_KEY = 'device:heartbeat:gap'
+
+# Seconds a flush waits for a missing queue slot to be written before
+# skipping it
+SLOT_WRITE_GRACE = 5
+
+# Presence buckets by time since last check-in, as (name, upper bound in
+# hours). Phones silent for longer than the last bound are 'silent';
+# phones that never checked in are 'never_seen'.
+PRESENCE_BUCKETS = [
+    ('online', 1),
+    ('recent', 24),
+    ('stale', 72),
+]
+
+# Heartbeat fields kept in the shared store
+HEARTBEAT_FIELDS = [
+    'is_device_admin_enabled',
+    'is_companion_app_installed',
+    'companion_app_version',
+    'android_version',
+    'app_version',
+    'battery_level',
+    'is_locked',
+    'lock_reason',
+]
+
+
+def _state_key(phone_id):
+    return f'device:heartbeat:{phone_id}'
+
+
+def _queued_key(phone_id):
+    return f'device:heartbeat:queued:{phone_id}'
+
+
+def _slot_key(seq):
+    return f'device:heartbeat:slot:{seq}'
+
+
+def record_heartbeat(phone_id, data, seen_at=None):
+    """
+    Store a device heartbeat and queue the phone for the next flush
+
+    Args:
+        phone_id: Phone that checked in
+        data: Validated health check fields (see HEARTBEAT_FIELDS)
+        seen_at: When the device checked in (defaults to now)
+
+    Returns:
+        The stored heartbeat state
+    """
+    ttl = settings.HEARTBEAT_STATE_TTL
+    state = {field: data.get(field) for field in HEARTBEAT_FIELDS}
+    state['last_seen'] = (seen_at or timezone.now()).isoformat()
+    cache.set(_state_key(phone_id), state, ttl)
+
+    # Only the first heartbeat since the last flush takes a queue slot. The
+    # marker expires after a few flush intervals so a lost slot cannot keep
+    # the phone out of the queue for long.
+    if cache.add(_queued_key(phone_id), 1, settings.HEARTBEAT_FLUSH_INTERVAL * 10):
+        cache.add(SEQUENCE_KEY, 0, None)
+        seq = cache.incr(SEQUENCE_KEY)
+        cache.set(_slot_key(seq), phone_id, ttl)
+
+    return state
+
+
+def latest_heartbeat(phone_id):
+    """Latest heartbeat state of a phone, or None if none is cached"""
+    return cache.get(_state_key(phone_id))
+
+
+def _flushable_until(cursor, head, slots):
+    """Last sequence number up to which every slot is written or given up on"""
+    now = time.time()
+    gap = cache.get(GAP_KEY)
+    for seq in range(cursor + 1, head + 1):
+        if _slot_key(seq) in slots:
+            continue
+        if gap is not None and gap[0] == seq:
+            if now - gap[1] >= SLOT_WRITE_GRACE:
+                continue  # Its writer never finished; skip the slot
+        else:
+            cache.set(GAP_KEY, (seq, now), None)
+        return seq - 1
+    return head
+
+
+def flush_heartbeats(batch_size=1000):
+    """
+    Write the latest heartbeat of every queued phone to Phone.last_enforcement_check
+
+    Only one flusher runs at a time (guarded by a cache lock); a concurrent
+    call returns 0 immediately. At most HEARTBEAT_FLUSH_MAX_SLOTS queue
+    slots are read per call; phones queued after them, or after a slot
+    still being written, are left for the next flush.
+
+    Args:
+        batch_size: Max phones written per UPDATE statement
+
+    Returns:
+        Number of phones updated
+    """
+    token = acquire_lock(FLUSH_LOCK_KEY, settings.HEARTBEAT_FLUSH_INTERVAL * 10)
+    if token is None:
+        return 0
+
+    try:
+        cursor = cache.get(CURSOR_KEY, 0)
+        head = cache.get(SEQUENCE_KEY, 0)
+        if head < cursor:
+            # The sequence was evicted and restarted; drain from the beginning
+            cursor = 0
+            cache.delete(GAP_KEY)
+        if head <= cursor:
+            return 0
+        head = min(head, cursor + settings.HEARTBEAT_FLUSH_MAX_SLOTS)
+
+        slots = cache.get_many([_slot_key(seq) for seq in range(cursor + 1, head + 1)])
+        end = _flushable_until(cursor, head, slots)
+        if end <= cursor:
+            return 0
+        slot_keys = [_slot_key(seq) for seq in range(cursor + 1, end + 1)]
+        phone_ids = {slots[key] for key in slot_keys if key in slots}
+
+        # Unqueue before reading state: a heartbeat arriving from here on
+        # queues its phone again for the next flush instead of being lost
+        cache.delete_many([_queued_key(phone_id) for phone_id in phone_ids])
+        states = cache.get_many([_state_key(phone_id) for phone_id in phone_ids])
+
+        phones = [
+            Phone(id=phone_id, last_enforcement_check=datetime.fromisoformat(state['last_seen']))
+            for phone_id in phone_ids
+            if (state := states.get(_state_key(phone_id)))
+        ]
+        Phone.objects.bulk_update(phones, ['last_enforcement_check'], batch_size=batch_size)
+
+        cache.delete_many(slot_keys)
+        cache.set(CURSOR_KEY, end, None)
+        logger.info(f"Flushed heartbeats for {len(phones)} phones")
+        return len(phones)
+
+    finally:
+        release_lock(FLUSH_LOCK_KEY, token)
+
+
+def silent_phones(hours, agent=None, include_never_seen=False):
+    """
+    Phones that have not checked in for more than the given number of hours
+
+    Served by the index on Phone.last_enforcement_check, or by the
+    (agent, last_enforcement_check) index when restricted to one agent.
+
+    Args:
+        hours: Silence threshold in hours
+        agent: Optionally restrict to one agent's phones
+        include_never_seen: Also include phones that never checked in
+    """
+    cutoff = timezone.now() - timedelta(hours=hours)
+    condition = Q(last_enforcement_check__lt=cutoff)
+    if include_never_seen:
+        condition |= Q(last_enforcement_check__isnull=True)
+
+    phones = Phone.objects.filter(condition)
+    if agent is not None:
+        phones = phones.filter(agent=agent)
+    return phones.order_by('last_enforcement_check')
+
+
+def _presence_aggregates(now):
+    # Cumulative counts over indexed columns only, so the (agent,
+    # last_enforcement_check) index can answer without reading phone rows
+    aggregates = {
+        'total': Count('agent_id'),
+        'seen': Count('last_enforcement_check'),
+    }
+    for name, hours in PRESENCE_BUCKETS:
+        aggregates[name] = Count(
+            'last_enforcement_check',
+            filter=Q(last_enforcement_check__gte=now - timedelta(hours=hours))
+        )
+    return aggregates
+
+
+def _presence_buckets(row):
+    buckets = {}
+    previous = 0
+    for name, _ in PRESENCE_BUCKETS:
+        buckets[name] = row[name] - previous
+        previous = row[name]
+    buckets['silent'] = row['seen'] - previous
+    buckets['never_seen'] = row['total'] - row['seen']
+    return buckets
+
+
+def presence_counts(agent_id):
+    """
+    Number of an agent's phones in each presence bucket
+
+    Returns:
+        Dict with 'total', 'buckets' (bucket name -> count) and 'as_of'
+    """
+    key = f'presence:{agent_id}'
+    counts = cache.get(key)
+    if counts is None:
+        now = timezone.now()
+        row = Phone.objects.filter(agent_id=agent_id).aggregate(**_presence_aggregates(now))
+        counts = {
+            'total': row['total'],
+            'buckets': _presence_buckets(row),
+            'as_of': now.isoformat(),
+        }
+        cache.set(key, counts, settings.PRESENCE_COUNTS_TTL)
+    return counts
+
+
+def presence_counts_by_agent():
+    """
+    Presence bucket counts for every agent with phones, in one grouped query
+
+    Returns:
+        Dict of agent id -> {'total', 'buckets'}
+    """
+    rows = (
+        Phone.objects.order_by()
+        .values('agent_id')
+        .annotate(**_presence_aggregates(timezone.now()))
+    )
+    return {
+        row['agent_id']: {'total': row['total'], 'buckets': _presence_buckets(row)}
+        for row in rows
+    }
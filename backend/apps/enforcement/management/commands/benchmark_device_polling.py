@@ -0,0 +1,196 @@
+"""
+Django management command to benchmark device polling under WSGI and ASGI.
+
+Fires the same device polling requests through the WSGI handler (one
+worker with --threads threads, like a threaded gunicorn worker) and
+through the ASGI handler (one event loop, like a single uvicorn worker),
+and reports throughput, latency and peak requests in flight for each.
+--latency-ms adds a fixed delay to every database query to model a
+remote Postgres.
+
+Usage:
+    python manage.py benchmark_device_polling
+    python manage.py benchmark_device_polling --endpoint sync --requests 2000 --concurrency 200
+    python manage.py benchmark_device_polling --threads 4 --latency-ms 5
+"""
+
+import asyncio
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, AsyncClient
+from django.test.utils import override_settings
+from apps.agents.models import Phone
+
+ENDPOINTS = {
+    'status': '/api/enforcement/status/{imei}/',
+    'settlement': '/api/settlements/weekly/{imei}/',
+    'reserved-account': '/api/monnify/reserved-account/{imei}/',
+    'sync': '/api/devices/{imei}/sync/',
+}
+
+
+class InFlight:
+    """Counts concurrent requests and remembers the peak"""
+
+    def __init__(self):
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        with self._lock:
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.current -= 1
+
+
+def _query_delay(seconds):
+    def wrapper(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+    return wrapper
+
+
+class Command(BaseCommand):
+    help = 'Compare device polling concurrency per worker under WSGI and ASGI'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--endpoint',
+            choices=sorted(ENDPOINTS),
+            default='status',
+            help='Device endpoint to poll (default: status)',
+        )
+        parser.add_argument(
+            '--imei',
+            help='IMEI to poll as (default: first phone in the database)',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Requests per run (default: 500)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=100,
+            help='Concurrent requests for the ASGI run (default: 100)',
+        )
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=1,
+            help='Threads in the WSGI worker (default: 1, a sync worker)',
+        )
+        parser.add_argument(
+            '--latency-ms',
+            type=float,
+            default=0,
+            help='Delay added to every database query (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        imei = options['imei'] or Phone.objects.values_list('imei', flat=True).first()
+        if not imei:
+            raise CommandError('No phones in the database; pass --imei or create one first')
+        path = ENDPOINTS[options['endpoint']].format(imei=imei)
+
+        self.stdout.write(
+            f"\nPolling {path} {options['requests']} times "
+            f"(query latency {options['latency_ms']}ms)\n"
+        )
+
+        # The test clients send Host: testserver; every request polls the
+        # same IMEI from the same address, so the device rate limits are off
+        with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            DEVICE_RATE_LIMIT_IMEI_RATE=0,
+            DEVICE_RATE_LIMIT_IP_RATE=0,
+        ):
+            wsgi = self.run_wsgi(path, options)
+            asgi = self.run_asgi(path, options)
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS('\nSummary:'))
+        self.stdout.write(f"  {'':<28} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'in flight':>10}")
+        for label, result in [
+            (f"WSGI ({options['threads']} thread(s))", wsgi),
+            (f"ASGI ({options['concurrency']} concurrent)", asgi),
+        ]:
+            self.stdout.write(
+                f"  {label:<28} {result['rps']:>9.1f} {result['p50']:>9.1f} "
+                f"{result['p95']:>9.1f} {result['peak']:>10}"
+            )
+
+    def summarize(self, latencies, elapsed, in_flight, errors):
+        latencies.sort()
+        if errors:
+            self.stdout.write(self.style.WARNING(f'  ⚠️  {errors} non-200 responses'))
+        return {
+            'rps': len(latencies) / elapsed,
+            'p50': statistics.median(latencies) * 1000,
+            'p95': latencies[int(len(latencies) * 0.95) - 1] * 1000,
+            'peak': in_flight.peak,
+        }
+
+    def run_wsgi(self, path, options):
+        in_flight = InFlight()
+        local = threading.local()
+        delay = options['latency_ms'] / 1000
+
+        def poll(_):
+            if not hasattr(local, 'client'):
+                local.client = Client()
+            with connections['default'].execute_wrapper(_query_delay(delay)), in_flight:
+                start = time.perf_counter()
+                response = local.client.get(path)
+                return time.perf_counter() - start, response.status_code
+
+        self.stdout.write('  Running WSGI...')
+        start = time.perf_counter()
+        with override_settings(ROOT_URLCONF='config.urls'):
+            with ThreadPoolExecutor(max_workers=options['threads']) as executor:
+                results = list(executor.map(poll, range(options['requests'])))
+        elapsed = time.perf_counter() - start
+
+        errors = sum(1 for _, code in results if code != 200)
+        return self.summarize([latency for latency, _ in results], elapsed, in_flight, errors)
+
+    def run_asgi(self, path, options):
+        in_flight = InFlight()
+        delay = options['latency_ms'] / 1000
+
+        async def run():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(options['concurrency'])
+
+            async def poll():
+                async with semaphore:
+                    with in_flight:
+                        start = time.perf_counter()
+                        response = await client.get(path)
+                        return time.perf_counter() - start, response.status_code
+
+            return await asyncio.gather(*(poll() for _ in range(options['requests'])))
+
+        self.stdout.write('  Running ASGI...')
+        start = time.perf_counter()
+        with override_settings(ROOT_URLCONF='config.urls_asgi'):
+            with connections['default'].execute_wrapper(_query_delay(delay)):
+                # Driven through async_to_sync so the async ORM's thread-sensitive
+                # work runs on this thread, whose connection carries the delay
+                results = async_to_sync(run)()
+        elapsed = time.perf_counter() - start
+
+        errors = sum(1 for _, code in results if code != 200)
+        return self.summarize([latency for latency, _ in results], elapsed, in_flight, errors)
@@ -0,0 +1,52 @@
+"""
+Django management command to flush device heartbeats to the database.
+
+Writes the latest cached heartbeat of every phone that checked in since
+the previous flush to Phone.last_enforcement_check, in bulk. Run it as a
+long-lived worker (the default), or once per cron tick with --once.
+
+Usage:
+    python manage.py flush_heartbeats
+    python manage.py flush_heartbeats --interval 60
+    python manage.py flush_heartbeats --once
+"""
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.enforcement.heartbeat_service import flush_heartbeats
+
+
+class Command(BaseCommand):
+    help = 'Flush cached device heartbeats to Phone.last_enforcement_check'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=settings.HEARTBEAT_FLUSH_INTERVAL,
+            help=f'Seconds between flushes (default: {settings.HEARTBEAT_FLUSH_INTERVAL})',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Flush once and exit',
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            flushed = flush_heartbeats()
+            self.stdout.write(self.style.SUCCESS(f'✅ Flushed heartbeats for {flushed} phones'))
+            return
+
+        self.stdout.write(f"Flushing heartbeats every {options['interval']}s (Ctrl+C to stop)")
+        try:
+            while True:
+                close_old_connections()
+                flushed = flush_heartbeats()
+                if flushed:
+                    self.stdout.write(f'  Flushed heartbeats for {flushed} phones')
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n⚠️  Heartbeat flusher stopped'))
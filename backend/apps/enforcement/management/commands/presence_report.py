@@ -0,0 +1,57 @@
+"""
+Django management command to report fleet presence per agent.
+
+Counts each agent's phones by time since their last check-in (see
+PRESENCE_BUCKETS), highlighting agents whose phones have gone silent,
+which may mean the enforcement app was removed or tampered with.
+
+Usage:
+    python manage.py presence_report
+    python manage.py presence_report --min-silent 10
+"""
+
+from django.core.management.base import BaseCommand
+from config.db.routers import use_replica
+from apps.platform.models import Agent
+from apps.enforcement.heartbeat_service import PRESENCE_BUCKETS, presence_counts_by_agent
+
+
+class Command(BaseCommand):
+    help = 'Report phone presence buckets per agent'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-silent',
+            type=int,
+            default=0,
+            help='Only list agents with at least this many silent phones',
+        )
+
+    @use_replica
+    def handle(self, *args, **options):
+        counts = presence_counts_by_agent()
+        names = dict(
+            Agent.objects.filter(id__in=counts).values_list('id', 'business_name')
+        )
+        columns = [name for name, _ in PRESENCE_BUCKETS] + ['silent', 'never_seen']
+
+        self.stdout.write(f"\n{'Agent':<30} {'Total':>7} " + ' '.join(f'{c:>10}' for c in columns))
+        listed = 0
+        for agent_id, agent_counts in sorted(
+            counts.items(), key=lambda item: item[1]['buckets']['silent'], reverse=True
+        ):
+            buckets = agent_counts['buckets']
+            if buckets['silent'] < options['min_silent']:
+                continue
+            listed += 1
+            line = (
+                f"{names.get(agent_id, agent_id):<30.30} {agent_counts['total']:>7} "
+                + ' '.join(f'{buckets[c]:>10}' for c in columns)
+            )
+            self.stdout.write(self.style.WARNING(line) if buckets['silent'] else line)
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS('\nSummary:'))
+        self.stdout.write(f'  Agents Listed: {listed}')
+        self.stdout.write(f"  Phones: {sum(c['total'] for c in counts.values())}")
+        self.stdout.write(f"  Silent Phones: {sum(c['buckets']['silent'] for c in counts.values())}")
@@ -0,0 +1,28 @@
+from django.db import migrations, models
+
+from config.db.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes for the filters IndexedFilterBackend accepts, built without
+    # blocking writes (CREATE INDEX CONCURRENTLY can't run in a transaction)
+    atomic = False
+
+    dependencies = [
+        ('enforcement', '0003_remove_devicecommand_device_comm_status_dc8019_idx_and_more'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='devicecommand',
+            index=models.Index(fields=['agent', 'status', 'created_at'], name='device_comm_agent_i_02e3ad_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='devicecommand',
+            index=models.Index(fields=['agent', 'command', 'created_at'], name='device_comm_agent_i_9eb81e_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='devicecommand',
+            index=models.Index(fields=['agent', 'created_at'], name='device_comm_agent_i_10b60e_idx'),
+        ),
+    ]
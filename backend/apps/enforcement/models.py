@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from datetime import timedelta
 import secrets
@@ -24,6 +24,45 @@ class DeviceCommandStatus(models.TextChoices):
     FAILED = "failed", "Failed"
 
 
+# ========================================
+# QUERYSETS
+# ========================================
+
+class DeviceCommandQuerySet(models.QuerySet):
+    """Delivery primitives for the Android command poll"""
+    
+    def claim_for_delivery(self, phone):
+        """
+        Claim a device's pending commands and mark them as sent.
+        
+        Delivery is at most once: only 'pending' commands are claimed, and
+        claiming moves them to 'sent', so a command is never handed out
+        again. Rows are locked with SELECT ... FOR UPDATE SKIP LOCKED, so a
+        concurrent poll skips rows held by another instead of waiting and
+        then claiming them too. issued_at records the (first and only)
+        delivery time. Returns the claimed commands with their new status
+        already applied, without re-reading them.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            claimed = list(
+                self.select_for_update(skip_locked=True, of=('self',))
+                .select_related('phone')
+                .filter(phone=phone, status=DeviceCommandStatus.PENDING, expires_at__gt=now)
+                .order_by('created_at')
+            )
+            if claimed:
+                self.filter(pk__in=[command.pk for command in claimed]).update(
+                    status=DeviceCommandStatus.SENT,
+                    issued_at=now
+                )
+        
+        for command in claimed:
+            command.status = DeviceCommandStatus.SENT
+            command.issued_at = now
+        return claimed
+
+
 # ========================================
 # ENFORCEMENT DOMAIN MODELS
 # ========================================
@@ -62,10 +101,15 @@ class DeviceCommand(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     executed_at = models.DateTimeField(null=True, blank=True)
     
+    objects = DeviceCommandQuerySet.as_manager()
+    
     class Meta:
         db_table = 'device_commands'
         indexes = [
             models.Index(fields=['phone', 'status']),
+            models.Index(fields=['agent', 'status', 'created_at']),
+            models.Index(fields=['agent', 'command', 'created_at']),
+            models.Index(fields=['agent', 'created_at']),
             models.Index(fields=['sale']),
             models.Index(fields=['expires_at']),
         ]
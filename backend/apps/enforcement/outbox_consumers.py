@@ -0,0 +1,56 @@
+"""
+Outbox consumers: device commands
+
+A completed sale gets an unlock command for its phone. The command is
+created by the relay rather than by the request that completed the sale,
+and is skipped if the sale already has one, so redelivered events don't
+issue a second unlock.
+"""
+import hashlib
+import secrets
+from datetime import timedelta
+from django.utils import timezone
+
+from apps.agents.models import Sale
+from apps.platform.outbox_service import consumer, outbox_event, publish_many
+from .models import DeviceCommand, DeviceCommandType
+
+UNLOCK_REASON = 'Payment completed'
+UNLOCK_COMMAND_TTL = timedelta(days=1)
+
+
+@consumer('sale.completed')
+def issue_unlock_commands(events):
+    sale_ids = {event.aggregate_id for event in events}
+    already_issued = set(
+        DeviceCommand.objects.filter(
+            sale_id__in=sale_ids,
+            command=DeviceCommandType.UNLOCK,
+            reason=UNLOCK_REASON
+        ).values_list('sale_id', flat=True)
+    )
+    sales = Sale.objects.filter(id__in=sale_ids - already_issued).only('id', 'agent_id', 'phone_id')
+    
+    expires_at = timezone.now() + UNLOCK_COMMAND_TTL
+    commands = DeviceCommand.objects.bulk_create([
+        DeviceCommand(
+            phone_id=sale.phone_id,
+            agent_id=sale.agent_id,
+            sale_id=sale.id,
+            command=DeviceCommandType.UNLOCK,
+            reason=UNLOCK_REASON,
+            auth_token_hash=hashlib.sha256(secrets.token_urlsafe(32).encode()).hexdigest(),
+            expires_at=expires_at
+        )
+        for sale in sales
+    ])
+    
+    publish_many([
+        outbox_event(
+            'command.issued',
+            {'command': command.command, 'phone_id': command.phone_id, 'sale_id': command.sale_id},
+            agent_id=command.agent_id,
+            aggregate=command
+        )
+        for command in commands
+    ])
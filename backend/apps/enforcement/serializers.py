@@ -11,3 +11,16 @@ class DeviceCommandSerializer(serializers.ModelSerializer):
                   'reason', 'auth_token_hash', 'expires_at', 'issued_by',
                   'created_at', 'executed_at']
         read_only_fields = ['id', 'created_at', 'executed_at']
+
+
+class HealthCheckSerializer(serializers.Serializer):
+    """Device health check sent by the Android app"""
+    imei = serializers.CharField(max_length=20)
+    is_device_admin_enabled = serializers.BooleanField()
+    is_companion_app_installed = serializers.BooleanField()
+    companion_app_version = serializers.CharField(max_length=50, required=False, allow_null=True, allow_blank=True)
+    android_version = serializers.CharField(max_length=50)
+    app_version = serializers.CharField(max_length=50)
+    battery_level = serializers.IntegerField(min_value=0, max_value=100, required=False, allow_null=True)
+    is_locked = serializers.BooleanField()
+    lock_reason = serializers.CharField(max_length=255, required=False, allow_null=True, allow_blank=True)
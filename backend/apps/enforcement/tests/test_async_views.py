@@ -0,0 +1,148 @@
+"""
+Tests for the async (ASGI) device views
+"""
+import json
+import pytest
+from datetime import timedelta
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.platform.models import User, Agent, AgentBilling
+from apps.platform.views import WeeklySettlementView
+from apps.agents.models import Phone, Customer, Sale
+from apps.payments.models import InstallmentSchedule
+from apps.payments.monnify_models import MonnifyReservedAccount
+from apps.payments.settlement_service import current_week_ending
+from apps.enforcement.models import DeviceCommand
+from apps.enforcement.views import EnforcementStatusView
+from apps.enforcement import async_views
+
+
+@pytest.fixture
+def async_sale(db):
+    """Create a sold phone with an overdue installment, a billing record and a reserved account"""
+    user = User.objects.create_user(email='async@test.com', password='testpass123')
+    agent = Agent.objects.create(user=user, business_name='Async Agent')
+    phone = Phone.objects.create(
+        agent=agent,
+        imei='350000000000601',
+        model='Galaxy A14',
+        lifecycle_status='sold'
+    )
+    customer = Customer.objects.create(agent=agent, full_name='Buyer', phone_number='+2348000000601')
+    sale = Sale.objects.create(
+        agent=agent,
+        customer=customer,
+        phone=phone,
+        sale_price=100000,
+        total_payable=100000,
+        balance_remaining=40000,
+        status='active'
+    )
+    InstallmentSchedule.objects.create(
+        sale=sale,
+        installment_number=1,
+        amount_due=20000,
+        due_date=timezone.now().date() - timedelta(days=1),
+        status='pending'
+    )
+    today = timezone.now().date()
+    AgentBilling.objects.create(
+        agent=agent,
+        billing_period_start=today - timedelta(days=today.weekday()),
+        billing_period_end=current_week_ending(today),
+        phones_sold_count=1,
+        fee_per_phone=500,
+        total_amount_due=500,
+        status='pending',
+        invoice_number='INV-ASYNC-001'
+    )
+    MonnifyReservedAccount.objects.create(
+        agent=agent,
+        account_reference=f'agent-{agent.id}',
+        account_number='9900000601',
+        account_name='Async Agent',
+        bank_name='Moniepoint',
+        bank_code='50515',
+        reservation_reference='RES-ASYNC-1'
+    )
+    return sale
+
+
+def call_async(view, path, *args, headers=None, **params):
+    request = AsyncRequestFactory().get(path, params, headers=headers)
+    response = async_to_sync(view)(request, *args)
+    return response.status_code, json.loads(response.content)
+
+
+def call_sync(view, path, **kwargs):
+    request = APIRequestFactory().get(path)
+    response = view.as_view()(request, **kwargs)
+    response.render()
+    return response.status_code, json.loads(response.content)
+
+
+@pytest.mark.django_db
+class TestAsyncDeviceViews:
+    """Async views must answer exactly like their synchronous counterparts"""
+    
+    def test_enforcement_status_matches_sync(self, async_sale):
+        imei = async_sale.phone.imei
+        
+        assert call_async(async_views.enforcement_status, '/', imei) == \
+            call_sync(EnforcementStatusView, '/', imei=imei)
+    
+    def test_weekly_settlement_matches_sync(self, async_sale):
+        imei = async_sale.phone.imei
+        
+        status, body = call_async(async_views.weekly_settlement, '/', imei)
+        
+        assert (status, body) == call_sync(WeeklySettlementView, '/', imei=imei)
+        assert body['amount_due'] == 500.0
+    
+    def test_reserved_account(self, async_sale):
+        status, body = call_async(async_views.reserved_account, '/', async_sale.phone.imei)
+        
+        assert status == 200
+        assert body['account_number'] == '9900000601'
+    
+    def test_pending_commands_requires_jwt(self, async_sale):
+        DeviceCommand.objects.create(
+            agent=async_sale.agent,
+            phone=async_sale.phone,
+            sale=async_sale,
+            command='lock',
+            reason='Payment overdue',
+            expires_at=timezone.now() + timedelta(hours=1)
+        )
+        imei = async_sale.phone.imei
+        token = AccessToken.for_user(async_sale.agent.user)
+        
+        assert call_async(async_views.pending_commands, '/', imei=imei)[0] == 401
+        status, body = call_async(
+            async_views.pending_commands, '/',
+            headers={'Authorization': f'Bearer {token}'}, imei=imei
+        )
+        
+        assert status == 200
+        assert [c['command'] for c in body] == ['lock']
+        assert DeviceCommand.objects.get().status == 'sent'
+    
+    def test_device_sync_skips_unchanged_sections(self, async_sale):
+        imei = async_sale.phone.imei
+        _, first = call_async(async_views.device_sync, '/', imei)
+        
+        _, second = call_async(
+            async_views.device_sync, '/', imei,
+            enforcement=first['enforcement']['version']
+        )
+        
+        assert first['enforcement']['data']['overdue_count'] == 1
+        assert second['enforcement'] == {'version': first['enforcement']['version'], 'changed': False}
+    
+    def test_unknown_device(self, db):
+        assert call_async(async_views.enforcement_status, '/', '000000000000000')[0] == 404
+        assert call_async(async_views.device_sync, '/', '000000000000000')[0] == 404
@@ -0,0 +1,184 @@
+"""
+Tests for device command delivery
+"""
+import threading
+import pytest
+from datetime import timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.platform.models import User, Agent
+from apps.agents.models import Phone, Customer, Sale
+from apps.platform.models import OutboxEvent
+from apps.platform.outbox_service import relay_pending
+from apps.payments.payment_service import apply_sale_payment
+from apps.enforcement.models import DeviceCommand
+
+
+@pytest.fixture
+def command_sale(db):
+    """Create an agent with one sold phone"""
+    user = User.objects.create_user(email='commands@test.com', password='testpass123')
+    agent = Agent.objects.create(user=user, business_name='Command Agent')
+    phone = Phone.objects.create(
+        agent=agent,
+        imei='350000000000001',
+        model='Galaxy A14',
+        lifecycle_status='sold'
+    )
+    customer = Customer.objects.create(agent=agent, full_name='Buyer', phone_number='+2348000000001')
+    return Sale.objects.create(
+        agent=agent,
+        customer=customer,
+        phone=phone,
+        sale_price=100000,
+        total_payable=100000,
+        balance_remaining=100000,
+        status='active'
+    )
+
+
+def make_command(sale, **kwargs):
+    return DeviceCommand.objects.create(
+        agent=sale.agent,
+        phone=sale.phone,
+        sale=sale,
+        command=kwargs.pop('command', 'lock'),
+        reason='Payment overdue',
+        **kwargs
+    )
+
+
+@pytest.mark.django_db
+class TestClaimForDelivery:
+    """Test DeviceCommand.objects.claim_for_delivery"""
+    
+    def test_claims_pending_commands_and_marks_sent(self, command_sale):
+        """Claimed commands are returned already marked as sent"""
+        command = make_command(command_sale)
+        
+        claimed = DeviceCommand.objects.claim_for_delivery(command_sale.phone)
+        
+        assert [c.id for c in claimed] == [command.id]
+        assert claimed[0].status == 'sent'
+        command.refresh_from_db()
+        assert command.status == 'sent'
+        assert command.issued_at is not None
+    
+    def test_second_poll_does_not_receive_same_command(self, command_sale):
+        """A claimed command is never handed out twice"""
+        make_command(command_sale)
+        
+        first = DeviceCommand.objects.claim_for_delivery(command_sale.phone)
+        second = DeviceCommand.objects.claim_for_delivery(command_sale.phone)
+        
+        assert len(first) == 1
+        assert second == []
+    
+    def test_sent_command_is_not_redelivered(self, command_sale):
+        """An old unacknowledged command keeps its first delivery time"""
+        first_delivery = timezone.now() - timedelta(hours=1)
+        command = make_command(command_sale, status='sent', issued_at=first_delivery)
+        
+        assert DeviceCommand.objects.claim_for_delivery(command_sale.phone) == []
+        command.refresh_from_db()
+        assert command.issued_at == first_delivery
+    
+    def test_skips_expired_and_finished_commands(self, command_sale):
+        """Expired, acknowledged and executed commands are not delivered"""
+        make_command(command_sale, expires_at=timezone.now() - timedelta(minutes=1))
+        make_command(command_sale, status='acknowledged')
+        make_command(command_sale, status='executed')
+        
+        assert DeviceCommand.objects.claim_for_delivery(command_sale.phone) == []
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='SKIP LOCKED needs PostgreSQL'
+)
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentClaims:
+    """Concurrent polls never claim the same command"""
+    
+    def test_locked_rows_are_skipped_not_shared(self, command_sale):
+        """A poll skips the command another poll holds and takes the rest"""
+        held, other = make_command(command_sale), make_command(command_sale)
+        locked, release = threading.Event(), threading.Event()
+        
+        def hold_first_command():
+            try:
+                with transaction.atomic():
+                    DeviceCommand.objects.select_for_update().get(pk=held.pk)
+                    locked.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+        
+        holder = threading.Thread(target=hold_first_command)
+        holder.start()
+        try:
+            assert locked.wait(10)
+            claimed = DeviceCommand.objects.claim_for_delivery(command_sale.phone)
+        finally:
+            release.set()
+            holder.join()
+        
+        assert [c.id for c in claimed] == [other.id]
+        assert [c.id for c in DeviceCommand.objects.claim_for_delivery(command_sale.phone)] == [held.id]
+    
+    def test_simultaneous_polls_split_the_commands(self, command_sale):
+        commands = [make_command(command_sale) for _ in range(20)]
+        barrier = threading.Barrier(8)
+        claims, errors = [], []
+        
+        def poll():
+            try:
+                barrier.wait()
+                claims.extend(c.id for c in DeviceCommand.objects.claim_for_delivery(command_sale.phone))
+            except Exception as e:  # pragma: no cover - reported below
+                errors.append(e)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=poll) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert errors == []
+        assert sorted(claims) == sorted(c.id for c in commands)
+
+
+@pytest.mark.django_db
+class TestUnlockOnCompletion:
+    """The outbox relay issues an unlock command for completed sales"""
+    
+    def test_completed_sale_gets_one_unlock_command(self, command_sale):
+        apply_sale_payment(command_sale, 100000, agent=command_sale.agent, payment_method='cash')
+        assert not DeviceCommand.objects.exists()
+        
+        relay_pending()
+        
+        command = DeviceCommand.objects.get()
+        assert (command.command, command.phone_id, command.status) == ('unlock', command_sale.phone_id, 'pending')
+        assert command.expires_at > timezone.now() + timedelta(hours=23)
+        assert OutboxEvent.objects.filter(event_type='command.issued', aggregate_id=command.id).exists()
+    
+    def test_redelivered_event_does_not_issue_a_second_unlock(self, command_sale):
+        apply_sale_payment(command_sale, 100000, agent=command_sale.agent, payment_method='cash')
+        relay_pending()
+        
+        OutboxEvent.objects.filter(event_type='sale.completed').update(status='pending')
+        relay_pending()
+        
+        assert DeviceCommand.objects.filter(command='unlock').count() == 1
+    
+    def test_partial_payment_issues_nothing(self, command_sale):
+        apply_sale_payment(command_sale, 5000, agent=command_sale.agent, payment_method='cash')
+        
+        relay_pending()
+        
+        assert not DeviceCommand.objects.exists()
+
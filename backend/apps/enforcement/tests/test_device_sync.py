@@ -0,0 +1,135 @@
+"""
+Tests for the combined device sync endpoint
+"""
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from apps.platform.models import User, Agent
+from apps.agents.models import Phone, Customer, Sale
+from apps.payments.models import InstallmentSchedule
+from apps.payments.monnify_models import MonnifyReservedAccount, WeeklySettlement
+from apps.payments.payment_service import apply_settlement_payment
+from apps.payments.settlement_service import current_week_ending
+from apps.enforcement.models import DeviceCommand
+from apps.enforcement.views import DeviceSyncView
+
+
+@pytest.fixture
+def synced_sale(db):
+    """Create a sold phone with an overdue installment, a settlement and a reserved account"""
+    user = User.objects.create_user(email='sync@test.com', password='testpass123')
+    agent = Agent.objects.create(user=user, business_name='Sync Agent')
+    phone = Phone.objects.create(
+        agent=agent,
+        imei='350000000000101',
+        model='Galaxy A14',
+        lifecycle_status='sold'
+    )
+    customer = Customer.objects.create(agent=agent, full_name='Buyer', phone_number='+2348000000101')
+    sale = Sale.objects.create(
+        agent=agent,
+        customer=customer,
+        phone=phone,
+        sale_price=100000,
+        total_payable=100000,
+        balance_remaining=60000,
+        status='active'
+    )
+    InstallmentSchedule.objects.create(
+        sale=sale,
+        installment_number=1,
+        amount_due=20000,
+        due_date=timezone.now().date() - timedelta(days=3),
+        status='pending'
+    )
+    week_ending = current_week_ending()
+    WeeklySettlement.objects.create(
+        agent=agent,
+        week_starting=week_ending - timedelta(days=6),
+        week_ending=week_ending,
+        total_amount=5000,
+        status='PENDING',
+        due_date=week_ending + timedelta(days=2),
+        invoice_number='INV-SYNC-001'
+    )
+    MonnifyReservedAccount.objects.create(
+        agent=agent,
+        account_reference=f'agent-{agent.id}',
+        account_number='9900000101',
+        account_name='Sync Agent',
+        bank_name='Moniepoint',
+        bank_code='50515',
+        reservation_reference='RES-SYNC-1'
+    )
+    return sale
+
+
+def sync(imei, **versions):
+    request = APIRequestFactory().get(f'/api/devices/{imei}/sync/', versions)
+    return DeviceSyncView.as_view()(request, imei=imei)
+
+
+@pytest.mark.django_db
+class TestDeviceSync:
+    """Test DeviceSyncView"""
+    
+    def test_returns_all_sections(self, synced_sale):
+        DeviceCommand.objects.create(
+            agent=synced_sale.agent,
+            phone=synced_sale.phone,
+            sale=synced_sale,
+            command='lock',
+            reason='Payment overdue',
+            expires_at=timezone.now() + timedelta(hours=1)
+        )
+        
+        response = sync(synced_sale.phone.imei)
+        
+        assert response.status_code == 200
+        assert response.data['enforcement']['data'] == {
+            'should_lock': True,
+            'reason': 'Payment overdue',
+            'balance': 60000.0,
+            'overdue_count': 1
+        }
+        assert [c['command'] for c in response.data['commands']['data']] == ['lock']
+        assert response.data['settlement']['data']['amount_due'] == 5000.0
+        assert response.data['reserved_account']['data']['account_number'] == '9900000101'
+        assert DeviceCommand.objects.get().status == 'sent'
+    
+    def test_unchanged_sections_are_sent_without_data(self, synced_sale):
+        first = sync(synced_sale.phone.imei).data
+        versions = {name: first[name]['version'] for name in ['enforcement', 'settlement', 'reserved_account']}
+        
+        second = sync(synced_sale.phone.imei, **versions).data
+        
+        for name in versions:
+            assert second[name] == {'version': versions[name], 'changed': False}
+        assert second['commands']['changed'] is True
+    
+    def test_changed_section_gets_new_version(self, synced_sale, django_capture_on_commit_callbacks):
+        first = sync(synced_sale.phone.imei).data
+        with django_capture_on_commit_callbacks(execute=True):
+            apply_settlement_payment(synced_sale.agent, 5000, 'MNFY-SYNC-1')
+        
+        second = sync(synced_sale.phone.imei, settlement=first['settlement']['version']).data
+        
+        assert second['settlement']['changed'] is True
+        assert second['settlement']['version'] != first['settlement']['version']
+        assert second['settlement']['data']['is_paid'] is True
+    
+    def test_unknown_device(self, db):
+        assert sync('000000000000000').status_code == 404
+    
+    def test_query_count_is_bounded(self, synced_sale):
+        sync(synced_sale.phone.imei)
+        
+        with CaptureQueriesContext(connection) as queries:
+            sync(synced_sale.phone.imei)
+        
+        # phone, command claim, sale, overdue count, settlement, reserved account
+        assert len(queries) <= 8
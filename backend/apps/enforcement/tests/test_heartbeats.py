@@ -0,0 +1,172 @@
+"""
+Tests for device heartbeat ingestion and flushing
+"""
+import pytest
+from datetime import timedelta
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from apps.platform.models import User, Agent
+from apps.agents.models import Phone
+from apps.enforcement import heartbeat_service
+from apps.enforcement.heartbeat_service import (
+    SEQUENCE_KEY,
+    SLOT_WRITE_GRACE,
+    record_heartbeat,
+    latest_heartbeat,
+    flush_heartbeats,
+    silent_phones
+)
+from apps.enforcement.views import HealthCheckView
+
+
+@pytest.fixture
+def fleet(db):
+    """Create an agent with five phones"""
+    user = User.objects.create_user(email='heartbeat@test.com', password='testpass123')
+    agent = Agent.objects.create(user=user, business_name='Heartbeat Agent')
+    return [
+        Phone.objects.create(
+            agent=agent,
+            imei=f'35000000000040{i}',
+            model='Galaxy A14',
+            lifecycle_status='sold'
+        )
+        for i in range(5)
+    ]
+
+
+def health_check(imei, **overrides):
+    body = {
+        'imei': imei,
+        'is_device_admin_enabled': True,
+        'is_companion_app_installed': True,
+        'companion_app_version': '1.0.0',
+        'android_version': '13',
+        'app_version': '1.2.0',
+        'battery_level': 80,
+        'is_locked': False,
+        'lock_reason': None,
+        **overrides
+    }
+    request = APIRequestFactory().post('/api/enforcement/health-check/', body, format='json')
+    return HealthCheckView.as_view()(request)
+
+
+@pytest.mark.django_db
+class TestHealthCheckView:
+    """Test HealthCheckView"""
+    
+    def test_records_state_without_writing_phone(self, fleet):
+        with CaptureQueriesContext(connection) as queries:
+            response = health_check(fleet[0].imei, is_locked=True, lock_reason='Payment overdue')
+        
+        assert response.status_code == 200
+        assert not [q for q in queries if q['sql'].startswith('UPDATE')]
+        assert latest_heartbeat(fleet[0].id)['lock_reason'] == 'Payment overdue'
+        fleet[0].refresh_from_db()
+        assert fleet[0].last_enforcement_check is None
+    
+    def test_unknown_device(self, db):
+        assert health_check('000000000000000').status_code == 404
+    
+    def test_invalid_body(self, fleet):
+        assert health_check(fleet[0].imei, battery_level=150).status_code == 400
+
+
+@pytest.mark.django_db
+class TestFlushHeartbeats:
+    """Test flush_heartbeats"""
+    
+    def test_flushes_latest_heartbeat_per_phone_in_one_update(self, fleet):
+        start = timezone.now()
+        for minute in range(3):
+            for phone in fleet:
+                record_heartbeat(phone.id, {}, seen_at=start + timedelta(minutes=minute))
+        
+        with CaptureQueriesContext(connection) as queries:
+            assert flush_heartbeats() == 5
+        
+        assert len([q for q in queries if q['sql'].startswith('UPDATE')]) == 1
+        assert set(
+            Phone.objects.values_list('last_enforcement_check', flat=True)
+        ) == {start + timedelta(minutes=2)}
+    
+    def test_only_new_heartbeats_are_flushed(self, fleet):
+        record_heartbeat(fleet[0].id, {})
+        flush_heartbeats()
+        
+        assert flush_heartbeats() == 0
+        
+        record_heartbeat(fleet[1].id, {})
+        record_heartbeat(fleet[0].id, {})
+        
+        assert flush_heartbeats() == 2
+    
+    def test_flush_between_sequence_and_slot_write(self, fleet, monkeypatch):
+        record_heartbeat(fleet[0].id, {})
+        incr = cache.incr
+        flushed = []
+
+        def incr_then_flush(*args, **kwargs):
+            seq = incr(*args, **kwargs)
+            flushed.append(flush_heartbeats())  # Lands before the slot is written
+            return seq
+
+        monkeypatch.setattr(heartbeat_service.cache, 'incr', incr_then_flush)
+        record_heartbeat(fleet[1].id, {})
+        monkeypatch.undo()
+
+        assert flushed == [1]
+        assert flush_heartbeats() == 1
+        fleet[1].refresh_from_db()
+        assert fleet[1].last_enforcement_check is not None
+
+        # Its queued marker was cleared, so the phone is queued again
+        record_heartbeat(fleet[1].id, {})
+        assert flush_heartbeats() == 1
+    
+    def test_slot_never_written_is_skipped_after_grace(self, fleet, monkeypatch):
+        now = [1_000_000.0]
+        monkeypatch.setattr(heartbeat_service.time, 'time', lambda: now[0])
+        cache.add(SEQUENCE_KEY, 0, None)
+        cache.incr(SEQUENCE_KEY)  # Its writer died before writing the slot
+        record_heartbeat(fleet[0].id, {})
+        
+        assert flush_heartbeats() == 0
+        now[0] += SLOT_WRITE_GRACE
+        assert flush_heartbeats() == 1
+    
+    def test_backlog_is_flushed_a_window_at_a_time(self, fleet, settings):
+        settings.HEARTBEAT_FLUSH_MAX_SLOTS = 2
+        for phone in fleet:
+            record_heartbeat(phone.id, {})
+        
+        assert [flush_heartbeats() for _ in range(4)] == [2, 2, 1, 0]
+        assert not Phone.objects.filter(last_enforcement_check__isnull=True).exists()
+    
+    def test_command_once(self, fleet):
+        record_heartbeat(fleet[0].id, {})
+        
+        call_command('flush_heartbeats', '--once')
+        
+        fleet[0].refresh_from_db()
+        assert fleet[0].last_enforcement_check is not None
+
+
+@pytest.mark.django_db
+class TestSilentPhones:
+    """Test silent_phones"""
+    
+    def test_phones_silent_longer_than_threshold(self, fleet):
+        now = timezone.now()
+        Phone.objects.filter(id=fleet[0].id).update(last_enforcement_check=now - timedelta(hours=30))
+        Phone.objects.filter(id=fleet[1].id).update(last_enforcement_check=now - timedelta(hours=2))
+        
+        assert list(silent_phones(24)) == [fleet[0]]
+        assert len(silent_phones(24, include_never_seen=True)) == 4
+        assert list(silent_phones(1, agent=fleet[0].agent)) == [fleet[0], fleet[1]]
@@ -0,0 +1,103 @@
+"""
+Tests for fleet presence counts and the offline phone list
+"""
+import pytest
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.platform.models import User, Agent
+from apps.agents.models import Phone
+from apps.agents.views import PhoneViewSet
+from apps.enforcement.heartbeat_service import presence_counts, presence_counts_by_agent
+
+# Hours since last check-in of each phone; None = never checked in
+LAST_SEEN_HOURS = [0.5, 0.5, 5, 30, 100, 200, None]
+
+
+@pytest.fixture
+def presence_agent(db):
+    """Create an agent with phones spread across the presence buckets"""
+    user = User.objects.create_user(email='presence@test.com', password='testpass123')
+    agent = Agent.objects.create(user=user, business_name='Presence Agent')
+    now = timezone.now()
+    for i, hours in enumerate(LAST_SEEN_HOURS):
+        phone = Phone.objects.create(
+            agent=agent,
+            imei=f'35000000000050{i}',
+            model='Galaxy A14',
+            lifecycle_status='sold'
+        )
+        if hours is not None:
+            Phone.objects.filter(id=phone.id).update(
+                last_enforcement_check=now - timedelta(hours=hours)
+            )
+    return agent
+
+
+def phone_action(agent, action, **params):
+    request = APIRequestFactory().get(f'/api/phones/{action}/', params)
+    force_authenticate(request, user=agent.user)
+    return PhoneViewSet.as_view({'get': action})(request)
+
+
+@pytest.mark.django_db
+class TestPresenceCounts:
+    """Test presence bucket counts"""
+    
+    def test_counts_per_bucket(self, presence_agent):
+        counts = presence_counts(presence_agent.id)
+        
+        assert counts['total'] == 7
+        assert counts['buckets'] == {
+            'online': 2,
+            'recent': 1,
+            'stale': 1,
+            'silent': 2,
+            'never_seen': 1,
+        }
+    
+    def test_counts_are_one_query_then_cached(self, presence_agent):
+        with CaptureQueriesContext(connection) as queries:
+            presence_counts(presence_agent.id)
+            presence_counts(presence_agent.id)
+        
+        assert len(queries) == 1
+    
+    def test_counts_by_agent(self, presence_agent):
+        counts = presence_counts_by_agent()
+        
+        assert counts[presence_agent.id]['buckets']['silent'] == 2
+    
+    def test_presence_endpoint(self, presence_agent):
+        response = phone_action(presence_agent, 'presence')
+        
+        assert response.status_code == 200
+        assert response.data['buckets']['online'] == 2
+    
+    def test_report_command(self, presence_agent):
+        out = StringIO()
+        call_command('presence_report', stdout=out)
+        
+        assert 'Presence Agent' in out.getvalue()
+        assert 'Silent Phones: 2' in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestOfflinePhones:
+    """Test the offline phone list"""
+    
+    def test_lists_silent_phones_longest_silent_first(self, presence_agent):
+        response = phone_action(presence_agent, 'offline', hours=24)
+        
+        assert response.status_code == 200
+        assert [p['imei'] for p in response.data['results']] == [
+            '350000000000505', '350000000000504', '350000000000503'
+        ]
+    
+    def test_invalid_hours(self, presence_agent):
+        assert phone_action(presence_agent, 'offline', hours='x').status_code == 400
@@ -0,0 +1,8 @@
+from django.urls import path
+from ..views import DeviceSyncView
+
+app_name = 'devices'
+
+urlpatterns = [
+    path('<str:imei>/sync/', DeviceSyncView.as_view(), name='sync'),
+]
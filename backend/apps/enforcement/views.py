@@ -4,9 +4,12 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.utils import timezone
 from .models import DeviceCommand
-from .serializers import DeviceCommandSerializer
-from apps.platform.models import Agent
-from apps.agents.models import Phone
+from .serializers import DeviceCommandSerializer, HealthCheckSerializer
+from .device_service import SYNC_SECTIONS, build_device_sync, enforcement_status
+from .heartbeat_service import record_heartbeat
+from apps.agents.imei_service import resolve_imei
+from apps.platform.rate_limit_service import DeviceRateThrottle
+from config.db.routers import ReplicaReadMixin, set_read_agent
 
 
 class DeviceCommandViewSet(viewsets.ModelViewSet):
@@ -14,13 +17,14 @@ class DeviceCommandViewSet(viewsets.ModelViewSet):
     serializer_class = DeviceCommandSerializer
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['status', 'command', 'phone']
+    filter_date_field = 'created_at'
     
     def get_queryset(self):
-        agent = Agent.objects.get(user=self.request.user)
+        agent = self.request.user.agent_profile
         return DeviceCommand.objects.filter(agent=agent).select_related('phone')
     
     def perform_create(self, serializer):
-        agent = Agent.objects.get(user=self.request.user)
+        agent = self.request.user.agent_profile
         serializer.save(agent=agent)
     
     @action(detail=False, methods=['get'])
@@ -30,19 +34,14 @@ class DeviceCommandViewSet(viewsets.ModelViewSet):
         if not imei:
             return Response({'error': 'IMEI required'}, status=400)
         
-        try:
-            phone = Phone.objects.get(imei=imei)
-            commands = DeviceCommand.objects.filter(
-                phone=phone,
-                status__in=['pending', 'sent']
-            )
-            
-            # Update status to sent
-            commands.update(status='sent')
-            
-            return Response(DeviceCommandSerializer(commands, many=True).data)
-        except Phone.DoesNotExist:
+        device = resolve_imei(imei)
+        if device is None:
             return Response({'error': 'Phone not found'}, status=404)
+        
+        # Claim and mark as sent in one locked round trip
+        commands = DeviceCommand.objects.claim_for_delivery(device.phone_id)
+        
+        return Response(DeviceCommandSerializer(commands, many=True).data)
     
     @action(detail=True, methods=['post'])
     def acknowledge(self, request, pk=None):
@@ -64,39 +63,65 @@ class DeviceCommandViewSet(viewsets.ModelViewSet):
         return Response({'status': 'executed'})
 
 
-class EnforcementStatusView(APIView):
+class EnforcementStatusView(ReplicaReadMixin, APIView):
     """Get enforcement status for a device"""
     permission_classes = [permissions.AllowAny]  # Android API
+    throttle_classes = [DeviceRateThrottle]
+    rate_limit_endpoint = 'enforcement-status'
+    
+    def get(self, request, imei):
+        device = resolve_imei(imei)
+        if device is None:
+            return Response({'error': 'Phone not found'}, status=404)
+        set_read_agent(device.agent_id)
+        
+        return Response(enforcement_status(device.phone_id))
+
+
+class DeviceSyncView(ReplicaReadMixin, APIView):
+    """
+    Combined device sync (Android API)
+    
+    Returns enforcement status, pending commands, settlement status and
+    reserved account details in one round trip. Pass the versions the
+    device already holds as query parameters (e.g. ?enforcement=<version>)
+    to receive unchanged sections without data.
+    """
+    permission_classes = [permissions.AllowAny]  # Android API
+    throttle_classes = [DeviceRateThrottle]
+    rate_limit_endpoint = 'device-sync'
     
     def get(self, request, imei):
-        try:
-            phone = Phone.objects.get(imei=imei)
-            from apps.agents.models import Sale
-            sale = Sale.objects.filter(phone=phone, status='active').first()
-            
-            if not sale:
-                return Response({
-                    'should_lock': False,
-                    'reason': 'No active sale',
-                    'balance': 0
-                })
-            
-            # Check if payment is overdue
-            from apps.payments.models import InstallmentSchedule
-            today = timezone.now().date()
-            overdue_installments = InstallmentSchedule.objects.filter(
-                sale=sale,
-                status__in=['pending', 'overdue'],
-                due_date__lt=today
-            )
-            
-            should_lock = overdue_installments.exists()
-            
-            return Response({
-                'should_lock': should_lock,
-                'reason': 'Payment overdue' if should_lock else 'Up to date',
-                'balance': float(sale.balance_remaining),
-                'overdue_count': overdue_installments.count()
-            })
-        except Phone.DoesNotExist:
+        device = resolve_imei(imei)
+        if device is None:
             return Response({'error': 'Phone not found'}, status=404)
+        set_read_agent(device.agent_id)
+        
+        known_versions = {
+            name: request.query_params[name]
+            for name in SYNC_SECTIONS if name in request.query_params
+        }
+        return Response(build_device_sync(imei, device, known_versions))
+
+
+class HealthCheckView(APIView):
+    """
+    Device heartbeat (Android API)
+    
+    Stores the device's latest state in the shared cache; last-seen times
+    are written to the database in bulk by the flush_heartbeats command.
+    """
+    permission_classes = [permissions.AllowAny]  # Android API
+    throttle_classes = [DeviceRateThrottle]
+    rate_limit_endpoint = 'health-check'
+    
+    def post(self, request):
+        serializer = HealthCheckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        device = resolve_imei(serializer.validated_data['imei'])
+        if device is None:
+            return Response({'error': 'Phone not found'}, status=404)
+        
+        record_heartbeat(device.phone_id, serializer.validated_data)
+        return Response({'status': 'ok'})
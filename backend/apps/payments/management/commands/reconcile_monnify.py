@@ -0,0 +1,98 @@
+"""
+Django management command to reconcile Monnify transactions with received webhooks.
+
+Pages through the transactions of every active reserved account and backfills
+any payment that never arrived as a webhook (or arrived but was never applied).
+Should be run periodically (e.g., hourly via cron or Celery Beat).
+
+Usage:
+    python manage.py reconcile_monnify
+    python manage.py reconcile_monnify --dry-run
+    python manage.py reconcile_monnify --days 30 --workers 8
+"""
+
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.payments.monnify_models import MonnifyReservedAccount
+from apps.payments.reconciliation import reconcile_reserved_accounts
+
+
+class Command(BaseCommand):
+    help = 'Reconcile Monnify reserved-account transactions against received webhooks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report missing transactions without backfilling them',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=7,
+            help='Only check transactions from the last N days (default: 7)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Max concurrent Monnify requests (default: 4)',
+        )
+        parser.add_argument(
+            '--account',
+            help='Only reconcile this reserved account number',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - Nothing will be backfilled'))
+
+        accounts = MonnifyReservedAccount.objects.filter(status='ACTIVE')
+        if options['account']:
+            accounts = accounts.filter(account_number=options['account'])
+
+        since = timezone.now() - timedelta(days=options['days'])
+        self.stdout.write(f'\nReconciling transactions since {since:%Y-%m-%d %H:%M}\n')
+
+        results = reconcile_reserved_accounts(
+            accounts=accounts,
+            since=since,
+            workers=options['workers'],
+            dry_run=dry_run
+        )
+
+        total_missing = total_unapplied = total_backfilled = failed = 0
+        for result in results:
+            if 'error' in result:
+                failed += 1
+                self.stdout.write(self.style.ERROR(
+                    f"  ❌ {result['account_number']}: {result['error']}"
+                ))
+                continue
+
+            total_missing += len(result['missing'])
+            total_unapplied += len(result['unapplied'])
+            total_backfilled += len(result['backfilled'])
+            for reference in sorted(result['missing'] | result['unapplied']):
+                state = 'missing' if reference in result['missing'] else 'unapplied'
+                done = ' -> backfilled' if reference in result['backfilled'] else ''
+                self.stdout.write(self.style.WARNING(
+                    f"  ⚠️  {result['account_number']}: {reference} ({state}){done}"
+                ))
+
+        # Summary
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS('\nSummary:'))
+        self.stdout.write(f'  Accounts Checked: {len(results)}')
+        self.stdout.write(f'  Accounts Failed: {failed}')
+        self.stdout.write(f'  Missing Webhooks: {total_missing}')
+        self.stdout.write(f'  Unapplied Webhooks: {total_unapplied}')
+        self.stdout.write(f'  Backfilled Payments: {total_backfilled}')
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING('\n⚠️  DRY RUN COMPLETE - Nothing was backfilled'))
+        else:
+            self.stdout.write(self.style.SUCCESS('\n✅ Monnify reconciliation complete!'))
@@ -0,0 +1,115 @@
+"""
+Django management command to reprocess Monnify webhooks that were never applied.
+
+Picks up SUCCESSFUL_TRANSACTION webhook logs that are still unprocessed
+(including ones whose processing failed) and applies their payments.
+Safe to run repeatedly: each transaction reference is applied at most once.
+
+Usage:
+    python manage.py reprocess_webhooks
+    python manage.py reprocess_webhooks --dry-run
+    python manage.py reprocess_webhooks --workers 8 --since 2026-01-01
+"""
+
+from datetime import datetime
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from apps.payments.webhook_replay import (
+    replayable_webhook_logs,
+    reprocess_webhook_logs,
+    plan_webhook_logs,
+    APPLIED,
+    FAILED,
+)
+
+
+class Command(BaseCommand):
+    help = 'Reprocess unprocessed or failed Monnify webhook logs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show the settlement changes each webhook would make without applying them',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Number of parallel workers (default: 4)',
+        )
+        parser.add_argument(
+            '--since',
+            help='Only webhooks received on or after this date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--reference',
+            help='Only reprocess this transaction reference',
+        )
+
+    def handle(self, *args, **options):
+        queryset = replayable_webhook_logs()
+
+        if options['since']:
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError('--since must be in YYYY-MM-DD format')
+            queryset = queryset.filter(received_at__gte=timezone.make_aware(since))
+
+        if options['reference']:
+            queryset = queryset.filter(transaction_reference=options['reference'])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No payments will be applied'))
+            self.dry_run(queryset)
+            return
+
+        self.stdout.write(f'\nReprocessing webhooks with {options["workers"]} worker(s)\n')
+
+        counts = reprocess_webhook_logs(
+            queryset,
+            workers=options['workers'],
+            progress=self.report_progress
+        )
+
+        # Summary
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS('\nSummary:'))
+        self.stdout.write(f'  References Processed: {sum(counts.values())}')
+        for outcome, count in sorted(counts.items()):
+            self.stdout.write(f'  {outcome}: {count}')
+
+        if counts[FAILED]:
+            self.stdout.write(self.style.ERROR(
+                f'\n⚠️  {counts[FAILED]} reference(s) failed - see processing_error on the webhook logs'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('\n✅ Webhook reprocessing complete!'))
+
+    def report_progress(self, counts):
+        self.stdout.write(
+            f'  ... {sum(counts.values())} references '
+            f'({", ".join(f"{outcome}: {count}" for outcome, count in sorted(counts.items()))})'
+        )
+
+    def dry_run(self, queryset):
+        total = 0
+        for plan in plan_webhook_logs(queryset):
+            total += 1
+            if plan['outcome'] == APPLIED:
+                before, after = plan['before'], plan['after']
+                self.stdout.write(
+                    f"  {plan['reference']}: settlement #{plan['settlement_id']} "
+                    f"amount_paid ₦{before['amount_paid']} -> ₦{after['amount_paid']}, "
+                    f"status {before['status']} -> {after['status']}"
+                )
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f"  {plan['reference']}: {plan['outcome']}"
+                    + (f" ({plan['error']})" if plan.get('error') else '')
+                ))
+
+        self.stdout.write(self.style.WARNING(
+            f'\n⚠️  DRY RUN COMPLETE - {total} reference(s) inspected, nothing was changed'
+        ))
@@ -0,0 +1,17 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0004_monnify_integration'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='monnifywebhooklog',
+            name='settlement_payment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='monnify_webhooks', to='payments.settlementpayment'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+from config.db.operations import AddIndexConcurrently, RemoveIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes for the filters IndexedFilterBackend accepts, built without
+    # blocking writes (CREATE INDEX CONCURRENTLY can't run in a transaction)
+    atomic = False
+
+    dependencies = [
+        ('payments', '0005_monnifywebhooklog_settlement_payment'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='paymentrecord',
+            index=models.Index(fields=['agent', 'status', 'created_at'], name='payment_rec_agent_i_38af92_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='paymentrecord',
+            index=models.Index(fields=['agent', 'payment_method', 'created_at'], name='payment_rec_agent_i_6ceef6_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='paymentrecord',
+            index=models.Index(fields=['agent', 'created_at'], name='payment_rec_agent_i_c7c9a5_idx'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='paymentrecord',
+            name='payment_rec_agent_i_f4e3cd_idx',
+        ),
+    ]
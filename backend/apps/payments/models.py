@@ -80,7 +80,9 @@ class PaymentRecord(models.Model):
         db_table = 'payment_records'
         indexes = [
             models.Index(fields=['sale']),
-            models.Index(fields=['agent', 'status']),
+            models.Index(fields=['agent', 'status', 'created_at']),
+            models.Index(fields=['agent', 'payment_method', 'created_at']),
+            models.Index(fields=['agent', 'created_at']),
             models.Index(fields=['installment']),
             models.Index(fields=['monnify_reference']),
         ]
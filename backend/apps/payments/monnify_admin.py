@@ -8,6 +8,7 @@ from .monnify_models import (
     WeeklySettlement,
     SettlementPayment
 )
+from .webhook_replay import reprocess_webhook_logs
 
 
 @admin.register(MonnifyReservedAccount)
@@ -49,7 +50,7 @@ class MonnifyWebhookLogAdmin(admin.ModelAdmin):
             'fields': ('account_number', 'amount_paid', 'payment_reference', 'customer_name', 'paid_on')
         }),
         ('Processing Status', {
-            'fields': ('processed', 'processed_at', 'processing_error', 'payment_record')
+            'fields': ('processed', 'processed_at', 'processing_error', 'payment_record', 'settlement_payment')
         }),
         ('Raw Data', {
             'fields': ('raw_payload', 'signature'),
@@ -57,9 +58,20 @@ class MonnifyWebhookLogAdmin(admin.ModelAdmin):
         }),
     )
     
+    actions = ['reprocess_webhooks']
+    
     def has_add_permission(self, request):
         # Webhooks are created automatically, not manually
         return False
+    
+    @admin.action(description='Reprocess selected unprocessed webhooks')
+    def reprocess_webhooks(self, request, queryset):
+        counts = reprocess_webhook_logs(queryset.filter(processed=False))
+        self.message_user(
+            request,
+            ', '.join(f'{outcome}: {count}' for outcome, count in sorted(counts.items()))
+            or 'No unprocessed webhooks selected'
+        )
 
 
 @admin.register(WeeklySettlement)
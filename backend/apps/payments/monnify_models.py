@@ -82,6 +82,15 @@ class MonnifyWebhookLog(models.Model):
         related_name='monnify_webhooks'
     )
     
+    # Link to settlement payment if one was applied
+    settlement_payment = models.ForeignKey(
+        'SettlementPayment',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='monnify_webhooks'
+    )
+    
     # Timestamps
     received_at = models.DateTimeField(auto_now_add=True)
     
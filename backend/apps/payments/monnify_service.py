@@ -4,7 +4,9 @@ Handles all communication with Monnify payment gateway
 """
 import base64
 import logging
+import threading
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 from typing import Optional, Dict, Any
 
@@ -22,19 +24,32 @@ class MonnifyService:
     All Monnify operations must go through this service
     """
     
-    def __init__(self):
+    def __init__(self, base_url: Optional[str] = None):
         self.api_key = settings.MONNIFY_API_KEY
         self.secret_key = settings.MONNIFY_SECRET_KEY
         self.contract_code = settings.MONNIFY_CONTRACT_CODE
-        self.base_url = settings.MONNIFY_BASE_URL
+        self.base_url = base_url or settings.MONNIFY_BASE_URL
         self._access_token = None
         self._token_expires_at = None
+        self._token_lock = threading.Lock()
+        
+        # Pooled keep-alive connections, shared by all threads using this service
+        pool_size = settings.MONNIFY_HTTP_POOL_SIZE
+        self.session = requests.Session()
+        self.session.mount(
+            self.base_url,
+            HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        )
     
     def _get_access_token(self) -> str:
         """
         Authenticate with Monnify and get access token
         Implements token caching
         """
+        with self._token_lock:
+            return self._get_or_refresh_access_token()
+    
+    def _get_or_refresh_access_token(self) -> str:
         # Check if we have a valid cached token
         if self._access_token and self._token_expires_at:
             from datetime import datetime, timedelta
@@ -46,7 +61,7 @@ class MonnifyService:
             credentials = f"{self.api_key}:{self.secret_key}"
             base64_credentials = base64.b64encode(credentials.encode()).decode()
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/v1/auth/login",
                 headers={"Authorization": f"Basic {base64_credentials}"},
                 timeout=30
@@ -114,10 +129,10 @@ class MonnifyService:
             if nin:
                 payload["nin"] = nin
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/v2/bank-transfer/reserved-accounts",
                 headers={
-                    "Authorization": f"******",
+                    "Authorization": f"Bearer {access_token}",
                     "Content-Type": "application/json"
                 },
                 json=payload,
@@ -204,9 +219,9 @@ class MonnifyService:
         try:
             access_token = self._get_access_token()
             
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/api/v2/transactions/{transaction_reference}",
-                headers={"Authorization": f"******"},
+                headers={"Authorization": f"Bearer {access_token}"},
                 timeout=30
             )
             
@@ -222,6 +237,62 @@ class MonnifyService:
             logger.error(f"Monnify API error querying transaction: {str(e)}")
             raise MonnifyAPIError(f"Failed to query transaction: {str(e)}")
 
+    
+    def list_reserved_account_transactions(
+        self,
+        account_reference: str,
+        page: int = 0,
+        size: int = 100
+    ) -> Dict[str, Any]:
+        """
+        Fetch one page of transactions received on a reserved account
+        
+        Args:
+            account_reference: Reference the reserved account was created with
+            page: Zero-based page number
+            size: Page size
+        
+        Returns:
+            Dict with 'content' (list of transactions) and paging fields ('last', 'totalPages')
+        """
+        try:
+            access_token = self._get_access_token()
+            
+            response = self.session.get(
+                f"{self.base_url}/api/v1/bank-transfer/reserved-accounts/transactions",
+                headers={"Authorization": f"Bearer {access_token}"},
+                params={"accountReference": account_reference, "page": page, "size": size},
+                timeout=30
+            )
+            
+            response.raise_for_status()
+            data = response.json()
+            
+            if not data.get('requestSuccessful'):
+                raise MonnifyAPIError(f"Transaction listing failed: {data.get('responseMessage')}")
+            
+            return data.get('responseBody', {})
+            
+        except requests.RequestException as e:
+            logger.error(f"Monnify API error listing transactions: {str(e)}")
+            raise MonnifyAPIError(f"Failed to list transactions: {str(e)}")
+    
+    def iter_reserved_account_transactions(self, account_reference: str, page_size: int = 100):
+        """
+        Iterate over all transactions of a reserved account, page by page
+        
+        Monnify returns the most recent transactions first, so callers that
+        only need a recent window can stop iterating early.
+        """
+        page = 0
+        while True:
+            body = self.list_reserved_account_transactions(account_reference, page, page_size)
+            yield from body.get('content', [])
+            
+            if body.get('last', True) or page + 1 >= body.get('totalPages', 0):
+                return
+            page += 1
+
 
 # Singleton instance
 monnify_service = MonnifyService()
@@ -5,7 +5,7 @@ API endpoints for mobile app and webhook handling
 import json
 import logging
 from decimal import Decimal
-from datetime import datetime, timedelta
+from datetime import datetime
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
@@ -13,19 +13,21 @@ from django.utils import timezone
 from django.db import transaction
 
 from apps.platform.models import Agent
-from apps.agents.models import Phone
+from apps.agents.imei_service import resolve_imei
+from apps.platform.rate_limit_service import device_rate_limit
 from .monnify_models import (
     MonnifyReservedAccount,
-    MonnifyWebhookLog,
-    WeeklySettlement,
-    SettlementPayment
+    MonnifyWebhookLog
 )
 from .monnify_service import monnify_service, MonnifyAPIError
+from .payment_service import apply_settlement_payment
+from .settlement_service import reserved_account_details, weekly_settlement_snapshot
 
 logger = logging.getLogger(__name__)
 
 
 @require_http_methods(["GET"])
+@device_rate_limit('reserved-account')
 def get_reserved_account(request, imei):
     """
     Get reserved account details for a device
@@ -35,31 +37,23 @@ def get_reserved_account(request, imei):
     Returns account number, bank name, etc. for display in mobile app
     """
     try:
-        # Find phone by IMEI
-        try:
-            phone = Phone.objects.select_related('agent').get(imei=imei)
-        except Phone.DoesNotExist:
+        # Resolve device by IMEI
+        device = resolve_imei(imei)
+        if device is None:
             return JsonResponse({
                 'success': False,
                 'message': 'Device not found'
             }, status=404)
         
-        agent = phone.agent
-        
         # Check if agent already has a reserved account
         try:
-            reserved_account = MonnifyReservedAccount.objects.get(agent=agent)
+            reserved_account = MonnifyReservedAccount.objects.get(agent_id=device.agent_id)
             
-            return JsonResponse({
-                'success': True,
-                'account_number': reserved_account.account_number,
-                'account_name': reserved_account.account_name,
-                'bank_name': reserved_account.bank_name,
-                'bank_code': reserved_account.bank_code
-            })
+            return JsonResponse(reserved_account_details(reserved_account))
             
         except MonnifyReservedAccount.DoesNotExist:
             # Create reserved account via Monnify API
+            agent = Agent.objects.select_related('user').get(id=device.agent_id)
             try:
                 account_reference = f"agent-{agent.id}"
                 
@@ -96,13 +90,7 @@ def get_reserved_account(request, imei):
                 
                 logger.info(f"Created reserved account for agent {agent.id}: {reserved_account.account_number}")
                 
-                return JsonResponse({
-                    'success': True,
-                    'account_number': reserved_account.account_number,
-                    'account_name': reserved_account.account_name,
-                    'bank_name': reserved_account.bank_name,
-                    'bank_code': reserved_account.bank_code
-                })
+                return JsonResponse(reserved_account_details(reserved_account))
                 
             except MonnifyAPIError as e:
                 logger.error(f"Failed to create reserved account for agent {agent.id}: {str(e)}")
@@ -213,51 +201,30 @@ def process_successful_payment(data: dict, webhook_log: MonnifyWebhookLog):
     except MonnifyReservedAccount.DoesNotExist:
         raise ValueError(f"No agent found for account number: {account_number}")
     
-    # Find pending settlement for this agent
-    settlement = WeeklySettlement.objects.filter(
-        agent=agent,
-        status__in=['PENDING', 'PARTIAL']
-    ).order_by('-week_ending').first()
+    # Apply to the agent's open settlement under a row lock
+    settlement_payment = apply_settlement_payment(
+        agent,
+        amount_paid,
+        transaction_reference,
+        paid_on=paid_on
+    )
     
-    if not settlement:
-        logger.warning(f"No pending settlement for agent {agent.id}")
+    if not settlement_payment:
         # Still log the payment but don't link to settlement
         return
     
-    # Create settlement payment record
-    settlement_payment = SettlementPayment.objects.create(
-        settlement=settlement,
-        amount=amount_paid,
-        payment_reference=transaction_reference,
-        payment_method='BANK_TRANSFER',
-        status='CONFIRMED',
-        payment_date=paid_on,
-        confirmed_at=timezone.now()
-    )
-    
-    # Update settlement
-    settlement.amount_paid += amount_paid
-    
-    if settlement.amount_paid >= settlement.total_amount:
-        settlement.status = 'PAID'
-        settlement.paid_date = timezone.now()
-        settlement.payment_reference = transaction_reference
-    elif settlement.amount_paid > 0:
-        settlement.status = 'PARTIAL'
-    
-    settlement.save()
-    
     # Link webhook to payment
-    webhook_log.payment_record_id = settlement_payment.id
-    webhook_log.save()
+    webhook_log.settlement_payment = settlement_payment
+    webhook_log.save(update_fields=['settlement_payment'])
     
     logger.info(
         f"Processed payment for agent {agent.id}: "
-        f"₦{amount_paid} towards settlement {settlement.id}"
+        f"₦{amount_paid} towards settlement {settlement_payment.settlement_id}"
     )
 
 
 @require_http_methods(["GET"])
+@device_rate_limit('weekly-settlement')
 def get_weekly_settlement(request, imei):
     """
     Get weekly settlement status for a device
@@ -267,67 +234,15 @@ def get_weekly_settlement(request, imei):
     Used by mobile app to check if payment is required and poll for confirmation
     """
     try:
-        # Find phone by IMEI
-        try:
-            phone = Phone.objects.select_related('agent').get(imei=imei)
-        except Phone.DoesNotExist:
+        # Resolve device by IMEI
+        device = resolve_imei(imei)
+        if device is None:
             return JsonResponse({
                 'success': False,
                 'message': 'Device not found'
             }, status=404)
         
-        agent = phone.agent
-        
-        # Get current week's settlement
-        from datetime import date, timedelta
-        today = date.today()
-        week_start = today - timedelta(days=today.weekday())
-        week_end = week_start + timedelta(days=6)
-        
-        settlement = WeeklySettlement.objects.filter(
-            agent=agent,
-            week_ending=week_end
-        ).first()
-        
-        if not settlement:
-            return JsonResponse({
-                'has_settlement': False,
-                'is_due': False,
-                'is_paid': False,
-                'is_overdue': False
-            })
-        
-        is_overdue = settlement.is_overdue
-        is_paid = settlement.status == 'PAID'
-        is_due = settlement.status in ['PENDING', 'PARTIAL'] and not is_overdue
-        
-        response_data = {
-            'has_settlement': True,
-            'is_due': is_due,
-            'is_paid': is_paid,
-            'is_overdue': is_overdue,
-            'settlement_id': str(settlement.id),
-            'amount_due': float(settlement.total_amount - settlement.amount_paid),
-            'total_amount': float(settlement.total_amount),
-            'amount_paid': float(settlement.amount_paid),
-            'due_date': settlement.due_date.isoformat(),
-            'invoice_number': settlement.invoice_number,
-            'message': None
-        }
-        
-        # Add payment reference if paid
-        if is_paid and settlement.payment_reference:
-            response_data['payment_reference'] = settlement.payment_reference
-        
-        # Add helpful messages
-        if is_overdue:
-            response_data['message'] = 'Payment is overdue. Please make payment immediately.'
-        elif is_due:
-            response_data['message'] = f'Payment of ₦{response_data["amount_due"]:.2f} is due.'
-        elif is_paid:
-            response_data['message'] = 'Payment received. Thank you!'
-        
-        return JsonResponse(response_data)
+        return JsonResponse(weekly_settlement_snapshot(device.agent_id))
     
     except Exception as e:
         logger.error(f"Error in get_weekly_settlement: {str(e)}", exc_info=True)
@@ -0,0 +1,16 @@
+"""
+Outbox consumers: settlement caches
+
+apply_settlement_payment rebuilds the agent's settlement snapshot as soon
+as the payment commits. That hook is lost if the process dies in between;
+this consumer rebuilds it again from the outbox, so devices always see the
+payment within one relay interval.
+"""
+from apps.platform.outbox_service import consumer
+from .settlement_service import rebuild_weekly_settlement_snapshot
+
+
+@consumer('settlement.payment_applied')
+def refresh_settlement_snapshots(events):
+    for agent_id in {event.agent_id for event in events}:
+        rebuild_weekly_settlement_snapshot(agent_id)
@@ -0,0 +1,232 @@
+"""
+Payment Application Service
+Applies payments to sale and settlement balances under row-level locks
+
+Every balance change goes through here so that concurrent payments
+(agent-recorded payments, Monnify webhooks, retries) serialize on the
+affected row instead of overwriting each other's updates. Side effects
+(unlock commands, cache refreshes) are published as outbox events in the
+same transaction and run by the outbox relay.
+"""
+import logging
+from decimal import Decimal
+from django.db import transaction
+from django.utils import timezone
+
+from apps.agents.models import Sale
+from apps.platform.outbox_service import outbox_event, publish, publish_many
+from .models import PaymentRecord, InstallmentSchedule
+from .monnify_models import WeeklySettlement, SettlementPayment
+from .settlement_service import rebuild_weekly_settlement_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Installment statuses that can still receive money
+OPEN_INSTALLMENT_STATUSES = ['pending', 'partial', 'overdue']
+
+
+def allocate_to_installments(sale, amount):
+    """
+    Spread a payment across a sale's open installments, oldest first
+
+    Each installment absorbs up to its outstanding amount; the last one
+    touched may be left 'partial' (or stay 'overdue' if it already was).
+    All touched rows are written with a single bulk UPDATE. Callers must
+    hold the sale row lock (see apply_sale_payment), which serializes
+    allocations for the sale.
+
+    Args:
+        sale: Sale the payment is for
+        amount: Amount to allocate
+
+    Returns:
+        List of installments that received money, oldest first
+    """
+    remaining = Decimal(str(amount))
+    today = timezone.now().date()
+    touched = []
+
+    installments = InstallmentSchedule.objects.filter(
+        sale=sale,
+        status__in=OPEN_INSTALLMENT_STATUSES
+    ).order_by('due_date', 'installment_number', 'id')
+
+    for installment in installments:
+        if remaining <= 0:
+            break
+
+        applied = min(installment.amount_due - installment.paid_amount, remaining)
+        if applied <= 0:
+            continue
+
+        installment.paid_amount += applied
+        remaining -= applied
+
+        if installment.paid_amount >= installment.amount_due:
+            installment.status = 'paid'
+            installment.paid_date = today
+        elif installment.status != 'overdue':
+            installment.status = 'partial'
+        touched.append(installment)
+
+    if touched:
+        InstallmentSchedule.objects.bulk_update(
+            touched, ['paid_amount', 'status', 'paid_date']
+        )
+    return touched
+
+
+@transaction.atomic
+def apply_sale_payment(sale, amount, **payment_fields) -> PaymentRecord:
+    """
+    Record a payment against a sale and reduce its balance
+
+    The sale row is locked with SELECT ... FOR UPDATE for the duration of
+    the transaction, so balance_before/balance_after are always computed
+    from the committed balance. The amount is allocated to the sale's
+    installments oldest-first and, unless an installment was given, the
+    payment is linked to the oldest one it paid into.
+
+    Args:
+        sale: Sale instance (or primary key) the payment is for
+        amount: Amount paid
+        **payment_fields: Extra PaymentRecord fields (agent, payment_method, ...)
+
+    Returns:
+        The created PaymentRecord; the locked sale is available as payment.sale
+    """
+    sale_id = getattr(sale, 'pk', sale)
+    sale = Sale.objects.select_for_update().get(pk=sale_id)
+    amount = Decimal(str(amount))
+
+    balance_before = sale.balance_remaining
+    balance_after = max(Decimal('0'), balance_before - amount)
+
+    installments = allocate_to_installments(sale, amount)
+    if installments and not payment_fields.get('installment'):
+        payment_fields['installment'] = installments[0]
+
+    payment_fields.setdefault('status', 'confirmed')
+    payment = PaymentRecord.objects.create(
+        sale=sale,
+        amount=amount,
+        balance_before=balance_before,
+        balance_after=balance_after,
+        **payment_fields
+    )
+
+    sale.balance_remaining = balance_after
+    update_fields = ['balance_remaining']
+    if balance_after == 0 and sale.status == 'active':
+        sale.status = 'completed'
+        sale.completion_date = timezone.now()
+        update_fields += ['status', 'completion_date']
+    sale.save(update_fields=update_fields)
+
+    events = [outbox_event(
+        'payment.applied',
+        {
+            'sale_id': sale.id,
+            'amount': amount,
+            'balance_before': balance_before,
+            'balance_after': balance_after,
+        },
+        agent_id=sale.agent_id,
+        aggregate=payment
+    )]
+    if 'completion_date' in update_fields:
+        # Issues the unlock command (apps.enforcement.outbox_consumers)
+        events.append(outbox_event(
+            'sale.completed', {'phone_id': sale.phone_id}, agent_id=sale.agent_id, aggregate=sale
+        ))
+    publish_many(events)
+
+    logger.info(
+        f"Applied payment {payment.id} to sale {sale.id}: "
+        f"₦{balance_before} -> ₦{balance_after}"
+    )
+    return payment
+
+
+def open_settlements_for(agent):
+    """Settlements of an agent that can still receive money, latest first"""
+    return WeeklySettlement.objects.filter(
+        agent=agent,
+        status__in=['PENDING', 'PARTIAL']
+    ).order_by('-week_ending')
+
+
+def settlement_status_after(settlement, amount_paid):
+    """Status a settlement moves to once amount_paid has been received"""
+    if amount_paid >= settlement.total_amount:
+        return 'PAID'
+    if amount_paid > 0:
+        return 'PARTIAL'
+    return settlement.status
+
+
+@transaction.atomic
+def apply_settlement_payment(agent, amount, payment_reference, paid_on=None):
+    """
+    Apply a payment to the agent's latest open weekly settlement
+
+    The settlement row is locked before amount_paid is read, so concurrent
+    webhooks for the same agent are applied one after the other.
+
+    Args:
+        agent: Agent the payment was received for
+        amount: Amount paid
+        payment_reference: Monnify transaction reference
+        paid_on: When the payment was made (defaults to now)
+
+    Returns:
+        The created SettlementPayment, or None if the agent has no open settlement
+    """
+    settlement = open_settlements_for(agent).select_for_update().first()
+
+    if not settlement:
+        logger.warning(f"No pending settlement for agent {agent.id}")
+        return None
+
+    amount = Decimal(str(amount))
+    now = timezone.now()
+
+    settlement_payment = SettlementPayment.objects.create(
+        settlement=settlement,
+        amount=amount,
+        payment_reference=payment_reference,
+        payment_method='BANK_TRANSFER',
+        status='CONFIRMED',
+        payment_date=paid_on or now,
+        confirmed_at=now
+    )
+
+    settlement.amount_paid += amount
+    settlement.status = settlement_status_after(settlement, settlement.amount_paid)
+    update_fields = ['amount_paid', 'status', 'updated_at']
+    if settlement.status == 'PAID':
+        settlement.paid_date = now
+        settlement.payment_reference = payment_reference
+        update_fields += ['paid_date', 'payment_reference']
+    settlement.save(update_fields=update_fields)
+
+    publish(
+        'settlement.payment_applied',
+        {
+            'settlement_id': settlement.id,
+            'amount': amount,
+            'amount_paid': settlement.amount_paid,
+            'status': settlement.status,
+        },
+        agent_id=settlement.agent_id,
+        aggregate=settlement_payment
+    )
+
+    # Devices read the cached snapshot; refresh it once the payment is committed
+    transaction.on_commit(lambda: rebuild_weekly_settlement_snapshot(settlement.agent_id))
+
+    logger.info(
+        f"Applied ₦{amount} to settlement {settlement.id}: "
+        f"₦{settlement.amount_paid} of ₦{settlement.total_amount} paid"
+    )
+    return settlement_payment
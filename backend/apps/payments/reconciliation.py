@@ -0,0 +1,156 @@
+"""
+Monnify Reconciliation
+Finds reserved-account transactions that never reached us as a webhook
+
+Transactions are fetched from Monnify per reserved account (concurrently,
+over the service's pooled HTTP client), compared set-wise against
+MonnifyWebhookLog and SettlementPayment, and the missing ones are
+backfilled as webhook logs and applied through the webhook replay path.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from .monnify_models import MonnifyReservedAccount, MonnifyWebhookLog, SettlementPayment
+from .monnify_service import monnify_service as default_monnify_service
+from .webhook_replay import reprocess_reference, APPLIED
+
+logger = logging.getLogger(__name__)
+
+
+def _paid_on(transaction):
+    try:
+        return datetime.fromisoformat(transaction['paidOn'].replace('Z', '+00:00'))
+    except (KeyError, ValueError, AttributeError):
+        return None
+
+
+def fetch_paid_transactions(service, reserved_account, since=None):
+    """
+    Return PAID transactions of a reserved account, keyed by transaction reference
+
+    Args:
+        service: MonnifyService to fetch with
+        reserved_account: MonnifyReservedAccount to fetch for
+        since: Optional aware datetime; older transactions are ignored and
+               paging stops once a transaction older than this is seen
+    """
+    transactions = {}
+    for txn in service.iter_reserved_account_transactions(reserved_account.account_reference):
+        paid_on = _paid_on(txn)
+        if since and paid_on and paid_on < since:
+            break
+        if txn.get('paymentStatus') == 'PAID' and txn.get('transactionReference'):
+            transactions[txn['transactionReference']] = txn
+    return transactions
+
+
+def reconcile_account(reserved_account, transactions, dry_run=False):
+    """
+    Diff one account's Monnify transactions against our records and backfill
+
+    Args:
+        reserved_account: MonnifyReservedAccount the transactions belong to
+        transactions: Dict of transaction reference -> Monnify transaction
+        dry_run: Only report what is missing
+
+    Returns:
+        Dict with the account number and sets of missing/unapplied/backfilled references
+    """
+    references = set(transactions)
+    logs = MonnifyWebhookLog.objects.filter(transaction_reference__in=references)
+    logged = set(logs.values_list('transaction_reference', flat=True))
+    # Logs still waiting to be applied; a processed log without a settlement
+    # payment was handled on purpose (e.g. no open settlement to pay)
+    pending = set(logs.filter(processed=False).values_list('transaction_reference', flat=True))
+    applied = set(
+        SettlementPayment.objects.filter(payment_reference__in=references)
+        .values_list('payment_reference', flat=True)
+    )
+
+    # Never received as a webhook at all
+    missing = references - logged - applied
+    # Received, but never processed (or processing failed)
+    unapplied = pending - applied
+
+    result = {
+        'account_number': reserved_account.account_number,
+        'transactions': len(references),
+        'missing': missing,
+        'unapplied': unapplied,
+        'backfilled': set(),
+    }
+    if dry_run:
+        return result
+
+    for reference in missing:
+        txn = transactions[reference]
+        MonnifyWebhookLog.objects.create(
+            event_type='SUCCESSFUL_TRANSACTION',
+            transaction_reference=reference,
+            account_number=reserved_account.account_number,
+            amount_paid=txn.get('amountPaid'),
+            payment_reference=txn.get('paymentReference'),
+            customer_name=(txn.get('customer') or {}).get('name'),
+            paid_on=_paid_on(txn),
+            raw_payload={
+                **txn,
+                'eventType': 'SUCCESSFUL_TRANSACTION',
+                'accountNumber': reserved_account.account_number,
+                'source': 'reconciliation',
+            },
+            signature=None
+        )
+
+    for reference in missing | unapplied:
+        if reprocess_reference(reference) == APPLIED:
+            result['backfilled'].add(reference)
+
+    if missing or unapplied:
+        logger.warning(
+            f"Reconciled account {reserved_account.account_number}: "
+            f"{len(missing)} missing, {len(unapplied)} unapplied, "
+            f"{len(result['backfilled'])} backfilled"
+        )
+    return result
+
+
+def reconcile_reserved_accounts(service=None, accounts=None, since=None, workers=4, dry_run=False):
+    """
+    Reconcile every active reserved account against Monnify
+
+    HTTP fetches run on a bounded thread pool; the database diff and
+    backfill for each account run in the calling thread as fetches finish.
+
+    Args:
+        service: MonnifyService to use (defaults to the shared instance)
+        accounts: Queryset of reserved accounts (defaults to all ACTIVE ones)
+        since: Only consider transactions paid on or after this datetime
+        workers: Max concurrent Monnify requests
+        dry_run: Only report differences
+
+    Returns:
+        List of per-account results (see reconcile_account); accounts whose
+        fetch failed carry an 'error' key instead
+    """
+    service = service or default_monnify_service
+    if accounts is None:
+        accounts = MonnifyReservedAccount.objects.filter(status='ACTIVE')
+
+    results = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(fetch_paid_transactions, service, account, since): account
+            for account in accounts.iterator()
+        }
+        for future in as_completed(futures):
+            account = futures[future]
+            try:
+                transactions = future.result()
+            except Exception as e:
+                logger.error(f"Failed to fetch transactions for {account.account_number}: {str(e)}")
+                results.append({'account_number': account.account_number, 'error': str(e)})
+                continue
+            results.append(reconcile_account(account, transactions, dry_run=dry_run))
+
+    return results
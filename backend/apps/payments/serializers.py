@@ -1,8 +1,10 @@
 from rest_framework import serializers
+from apps.platform.bulk_service import BulkUpdateSerializer
+from apps.platform.fieldsets import SparseFieldsetMixin
 from .models import PaymentRecord, InstallmentSchedule
 
 
-class PaymentRecordSerializer(serializers.ModelSerializer):
+class PaymentRecordSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     customer_name = serializers.CharField(source='sale.customer.full_name', read_only=True)
     
     class Meta:
@@ -11,11 +13,20 @@ class PaymentRecordSerializer(serializers.ModelSerializer):
                   'payment_method', 'balance_before', 'balance_after',
                   'monnify_reference', 'status', 'created_at']
         read_only_fields = ['id', 'balance_before', 'balance_after', 'created_at']
+        expandable_fields = {
+            'sale': ('apps.agents.serializers.SaleSerializer', {}),
+            'installment': ('apps.payments.serializers.InstallmentScheduleSerializer', {}),
+        }
 
 
-class InstallmentScheduleSerializer(serializers.ModelSerializer):
+class InstallmentScheduleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = InstallmentSchedule
         fields = ['id', 'sale', 'amount_due', 'due_date', 
                   'paid_amount', 'status']
         read_only_fields = ['id']
+
+
+class InstallmentBulkUpdateSerializer(BulkUpdateSerializer):
+    """Bulk PATCH: one status move for a list of installments"""
+    status = serializers.ChoiceField(choices=['pending', 'overdue'])
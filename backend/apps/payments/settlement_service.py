@@ -0,0 +1,185 @@
+"""
+Device Settlement Service
+Builds the settlement and reserved-account payloads shown on devices
+
+Shared by the per-endpoint mobile views and the combined device sync
+endpoint so every path reports the same state.
+
+Settlement state depends only on the agent, so it is cached as one
+snapshot per agent and week in a TwoLevelCache (see
+apps.platform.cache_service), tagged with the agent. With the IMEI
+resolver in front (see apps.agents.imei_service) a device poll is served
+from cache without touching the database. Snapshots are rebuilt whenever
+a payment is applied or a settlement job runs, and otherwise expire after
+SETTLEMENT_SNAPSHOT_TTL.
+"""
+import functools
+from datetime import date, timedelta
+from django.conf import settings
+
+from apps.platform.cache_service import TwoLevelCache, agent_tag
+from .monnify_models import MonnifyReservedAccount, WeeklySettlement
+
+
+def current_week_ending(today=None):
+    """Sunday ending the current settlement week"""
+    today = today or date.today()
+    week_start = today - timedelta(days=today.weekday())
+    return week_start + timedelta(days=6)
+
+
+snapshots = TwoLevelCache(
+    'settlement',
+    ttl=lambda snapshot: settings.SETTLEMENT_SNAPSHOT_TTL,
+    local_ttl=settings.SETTLEMENT_SNAPSHOT_LOCAL_TTL
+)
+
+
+def agent_snapshot(kind, agent_id, build, today=None, rebuild=False):
+    """
+    Cached per-agent, per-week snapshot
+
+    Args:
+        kind: Snapshot name, part of the cache key
+        agent_id: Agent the snapshot is for
+        build: Callable(agent_id, today) computing the snapshot
+        today: Date whose settlement week the snapshot covers (defaults to today)
+        rebuild: Recompute and store the snapshot even if one is cached
+
+    Returns:
+        The snapshot
+    """
+    today = today or date.today()
+    key = f'{kind}:{agent_id}:{current_week_ending(today).isoformat()}'
+    tags = [agent_tag(agent_id)]
+    if rebuild:
+        return snapshots.refresh(key, lambda: build(agent_id, today), tags)
+    return snapshots.get_or_set(key, lambda: build(agent_id, today), tags)
+
+
+async def aagent_snapshot(kind, agent_id, abuild, today=None):
+    """
+    Async version of agent_snapshot
+
+    Cache reads and writes are awaited, and so is abuild (an async version
+    of the builder) on a miss.
+    """
+    today = today or date.today()
+    key = f'{kind}:{agent_id}:{current_week_ending(today).isoformat()}'
+    return await snapshots.aget_or_set(key, functools.partial(abuild, agent_id, today), [agent_tag(agent_id)])
+
+
+def weekly_settlement_status(agent, today=None):
+    """
+    Current week's settlement status for an agent, as shown on devices
+
+    Args:
+        agent: Agent (or agent id) to report on
+        today: Date to evaluate the settlement week for (defaults to today)
+
+    Returns:
+        Dict matching the mobile WeeklySettlementResponse
+    """
+    return _weekly_settlement_payload(_current_settlements(agent, today).first())
+
+
+async def aweekly_settlement_status(agent, today=None):
+    """Async version of weekly_settlement_status"""
+    return _weekly_settlement_payload(await _current_settlements(agent, today).afirst())
+
+
+def _current_settlements(agent, today):
+    return WeeklySettlement.objects.filter(
+        agent=agent,
+        week_ending=current_week_ending(today)
+    )
+
+
+def _weekly_settlement_payload(settlement):
+    if not settlement:
+        return {
+            'has_settlement': False,
+            'is_due': False,
+            'is_paid': False,
+            'is_overdue': False
+        }
+
+    is_overdue = settlement.is_overdue
+    is_paid = settlement.status == 'PAID'
+    is_due = settlement.status in ['PENDING', 'PARTIAL'] and not is_overdue
+
+    status = {
+        'has_settlement': True,
+        'is_due': is_due,
+        'is_paid': is_paid,
+        'is_overdue': is_overdue,
+        'settlement_id': str(settlement.id),
+        'amount_due': float(settlement.total_amount - settlement.amount_paid),
+        'total_amount': float(settlement.total_amount),
+        'amount_paid': float(settlement.amount_paid),
+        'due_date': settlement.due_date.isoformat(),
+        'invoice_number': settlement.invoice_number,
+        'message': None
+    }
+
+    # Add payment reference if paid
+    if is_paid and settlement.payment_reference:
+        status['payment_reference'] = settlement.payment_reference
+
+    # Add helpful messages
+    if is_overdue:
+        status['message'] = 'Payment is overdue. Please make payment immediately.'
+    elif is_due:
+        status['message'] = f'Payment of ₦{status["amount_due"]:.2f} is due.'
+    elif is_paid:
+        status['message'] = 'Payment received. Thank you!'
+
+    return status
+
+
+def weekly_settlement_snapshot(agent_id, today=None):
+    """Cached weekly_settlement_status for an agent"""
+    return agent_snapshot('weekly', agent_id, weekly_settlement_status, today)
+
+
+async def aweekly_settlement_snapshot(agent_id, today=None):
+    """Async version of weekly_settlement_snapshot"""
+    return await aagent_snapshot('weekly', agent_id, aweekly_settlement_status, today)
+
+
+def rebuild_weekly_settlement_snapshot(agent_id, today=None):
+    """Recompute and cache an agent's weekly settlement snapshot"""
+    return agent_snapshot('weekly', agent_id, weekly_settlement_status, today, rebuild=True)
+
+
+def reserved_account_details(reserved_account):
+    """Account details of a reserved account for display on devices"""
+    return {
+        'success': True,
+        'account_number': reserved_account.account_number,
+        'account_name': reserved_account.account_name,
+        'bank_name': reserved_account.bank_name,
+        'bank_code': reserved_account.bank_code
+    }
+
+
+def existing_reserved_account_details(agent):
+    """
+    Reserved account details for an agent, without creating one
+
+    Returns:
+        Dict from reserved_account_details, or None if the agent has no
+        reserved account yet
+    """
+    reserved_account = MonnifyReservedAccount.objects.filter(agent=agent).first()
+    if not reserved_account:
+        return None
+    return reserved_account_details(reserved_account)
+
+
+async def aexisting_reserved_account_details(agent):
+    """Async version of existing_reserved_account_details"""
+    reserved_account = await MonnifyReservedAccount.objects.filter(agent=agent).afirst()
+    if not reserved_account:
+        return None
+    return reserved_account_details(reserved_account)
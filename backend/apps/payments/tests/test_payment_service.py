@@ -0,0 +1,243 @@
+"""
+Tests for the payment application service
+"""
+import threading
+import pytest
+from decimal import Decimal
+from datetime import timedelta
+from django.db import connection
+from django.utils import timezone
+
+from apps.platform.models import User, Agent, OutboxEvent
+from apps.agents.models import Phone, Customer, Sale
+from apps.payments.models import PaymentRecord, InstallmentSchedule
+from apps.payments.monnify_models import WeeklySettlement, SettlementPayment
+from apps.payments.payment_service import apply_sale_payment, apply_settlement_payment
+
+
+@pytest.fixture
+def service_agent(db):
+    """Create an agent for payment tests"""
+    user = User.objects.create_user(email='payments@test.com', password='testpass123')
+    return Agent.objects.create(user=user, business_name='Payments Agent')
+
+
+@pytest.fixture
+def service_sale(service_agent):
+    """Create an active sale with 1,000 outstanding"""
+    phone = Phone.objects.create(
+        agent=service_agent,
+        imei='350000000000101',
+        model='Redmi 12',
+        lifecycle_status='sold'
+    )
+    customer = Customer.objects.create(
+        agent=service_agent,
+        full_name='Payer',
+        phone_number='+2348000000101'
+    )
+    return Sale.objects.create(
+        agent=service_agent,
+        customer=customer,
+        phone=phone,
+        sale_price=1000,
+        total_payable=1000,
+        balance_remaining=1000,
+        status='active'
+    )
+
+
+@pytest.fixture
+def installments(service_sale):
+    """Split the sale into four weekly installments of 250"""
+    today = timezone.now().date()
+    return [
+        InstallmentSchedule.objects.create(
+            sale=service_sale,
+            installment_number=i,
+            amount_due=250,
+            due_date=today + timedelta(weeks=i - 2)
+        )
+        for i in range(1, 5)
+    ]
+
+
+@pytest.fixture
+def open_settlement(service_agent):
+    """Create a pending weekly settlement of 1,000"""
+    today = timezone.now().date()
+    return WeeklySettlement.objects.create(
+        agent=service_agent,
+        week_starting=today - timedelta(days=6),
+        week_ending=today,
+        total_amount=1000,
+        status='PENDING',
+        due_date=today + timedelta(days=2),
+        invoice_number='INV-SERVICE-001'
+    )
+
+
+@pytest.mark.django_db
+class TestApplySalePayment:
+    """Test apply_sale_payment"""
+    
+    def test_records_balances_and_reduces_sale(self, service_agent, service_sale):
+        payment = apply_sale_payment(service_sale, 400, agent=service_agent, payment_method='cash')
+        
+        assert payment.balance_before == Decimal('1000')
+        assert payment.balance_after == Decimal('600')
+        assert payment.status == 'confirmed'
+        service_sale.refresh_from_db()
+        assert service_sale.balance_remaining == Decimal('600')
+        assert service_sale.status == 'active'
+    
+    def test_final_payment_completes_sale(self, service_agent, service_sale):
+        apply_sale_payment(service_sale, 1200, agent=service_agent, payment_method='cash')
+        
+        service_sale.refresh_from_db()
+        assert service_sale.balance_remaining == 0
+        assert service_sale.status == 'completed'
+        assert service_sale.completion_date is not None
+    
+    def test_final_payment_publishes_sale_completed(self, service_agent, service_sale):
+        apply_sale_payment(service_sale, 400, agent=service_agent, payment_method='cash')
+        apply_sale_payment(service_sale, 600, agent=service_agent, payment_method='cash')
+        
+        events = list(OutboxEvent.objects.order_by('id').values_list('event_type', 'aggregate_id'))
+        assert [event_type for event_type, _ in events] == [
+            'payment.applied', 'payment.applied', 'sale.completed'
+        ]
+        assert events[2][1] == service_sale.id
+
+
+@pytest.mark.django_db
+class TestInstallmentAllocation:
+    """Test oldest-first allocation of sale payments"""
+    
+    def statuses(self, service_sale):
+        return list(
+            InstallmentSchedule.objects.filter(sale=service_sale)
+            .order_by('installment_number')
+            .values_list('status', 'paid_amount')
+        )
+    
+    def test_partial_payment_fills_oldest_installment(self, service_agent, service_sale, installments):
+        payment = apply_sale_payment(service_sale, 100, agent=service_agent, payment_method='cash')
+        
+        assert payment.installment_id == installments[0].id
+        assert self.statuses(service_sale) == [
+            ('partial', Decimal('100')),
+            ('pending', Decimal('0')),
+            ('pending', Decimal('0')),
+            ('pending', Decimal('0')),
+        ]
+    
+    def test_payment_spills_over_into_next_installments(self, service_agent, service_sale, installments):
+        apply_sale_payment(service_sale, 100, agent=service_agent, payment_method='cash')
+        payment = apply_sale_payment(service_sale, 500, agent=service_agent, payment_method='cash')
+        
+        # Linked to the oldest installment it paid into
+        assert payment.installment_id == installments[0].id
+        assert self.statuses(service_sale) == [
+            ('paid', Decimal('250')),
+            ('paid', Decimal('250')),
+            ('partial', Decimal('100')),
+            ('pending', Decimal('0')),
+        ]
+    
+    def test_partial_payment_keeps_overdue_status(self, service_agent, service_sale, installments):
+        InstallmentSchedule.objects.filter(pk=installments[0].pk).update(status='overdue')
+        
+        apply_sale_payment(service_sale, 50, agent=service_agent, payment_method='cash')
+        
+        assert self.statuses(service_sale)[0] == ('overdue', Decimal('50'))
+    
+    def test_allocation_is_one_update(self, service_agent, service_sale, installments, django_assert_max_num_queries):
+        apply_sale_payment(service_sale, 100, agent=service_agent, payment_method='cash')
+        
+        # Lock sale, read installments, bulk update, insert payment, update sale,
+        # insert outbox events (+ savepoint)
+        with django_assert_max_num_queries(8):
+            apply_sale_payment(service_sale, 900, agent=service_agent, payment_method='cash')
+        assert all(status == 'paid' for status, _ in self.statuses(service_sale))
+
+
+@pytest.mark.django_db
+class TestApplySettlementPayment:
+    """Test apply_settlement_payment"""
+    
+    def test_partial_then_full_payment(self, service_agent, open_settlement):
+        apply_settlement_payment(service_agent, 300, 'MNFY-REF-1')
+        open_settlement.refresh_from_db()
+        assert open_settlement.status == 'PARTIAL'
+        
+        apply_settlement_payment(service_agent, 700, 'MNFY-REF-2')
+        open_settlement.refresh_from_db()
+        assert open_settlement.status == 'PAID'
+        assert open_settlement.amount_paid == Decimal('1000')
+        assert open_settlement.payment_reference == 'MNFY-REF-2'
+        assert OutboxEvent.objects.filter(
+            event_type='settlement.payment_applied', agent_id=service_agent.id
+        ).count() == 2
+    
+    def test_returns_none_without_open_settlement(self, service_agent):
+        assert apply_settlement_payment(service_agent, 300, 'MNFY-REF-3') is None
+
+
+def run_concurrently(func, count):
+    """Run func(i) in `count` threads released at the same moment"""
+    barrier = threading.Barrier(count)
+    errors = []
+    
+    def worker(i):
+        try:
+            barrier.wait()
+            func(i)
+        except Exception as e:  # pragma: no cover - reported below
+            errors.append(e)
+        finally:
+            connection.close()
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Concurrency stress test needs row-level locking (PostgreSQL)'
+)
+@pytest.mark.django_db(transaction=True)
+class TestConcurrentPayments:
+    """Concurrent payments must never lose an update"""
+    
+    WORKERS = 20
+    
+    def test_concurrent_sale_payments(self, service_agent, service_sale):
+        run_concurrently(
+            lambda i: apply_sale_payment(
+                service_sale.pk, 10, agent=service_agent, payment_method='cash'
+            ),
+            self.WORKERS
+        )
+        
+        service_sale.refresh_from_db()
+        assert service_sale.balance_remaining == Decimal('1000') - 10 * self.WORKERS
+        balances = sorted(
+            PaymentRecord.objects.filter(sale=service_sale).values_list('balance_after', flat=True)
+        )
+        # Every payment saw a distinct committed balance
+        assert len(set(balances)) == self.WORKERS
+    
+    def test_concurrent_settlement_payments(self, service_agent, open_settlement):
+        run_concurrently(
+            lambda i: apply_settlement_payment(service_agent, 10, f'MNFY-STRESS-{i}'),
+            self.WORKERS
+        )
+        
+        open_settlement.refresh_from_db()
+        assert open_settlement.amount_paid == Decimal('10') * self.WORKERS
+        assert SettlementPayment.objects.filter(settlement=open_settlement).count() == self.WORKERS
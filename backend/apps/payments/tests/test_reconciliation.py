@@ -0,0 +1,209 @@
+"""
+Tests for Monnify reconciliation against a local fake Monnify server
+"""
+import json
+import threading
+import pytest
+from decimal import Decimal
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from django.utils import timezone
+
+from apps.platform.models import User, Agent
+from apps.payments.monnify_models import (
+    MonnifyReservedAccount,
+    MonnifyWebhookLog,
+    WeeklySettlement,
+    SettlementPayment
+)
+from apps.payments.monnify_service import MonnifyService
+from apps.payments.reconciliation import reconcile_reserved_accounts
+
+
+class FakeMonnifyHandler(BaseHTTPRequestHandler):
+    """Serves the auth and reserved-account transaction endpoints"""
+    
+    transactions = {}  # account reference -> list of transactions, newest first
+    
+    def log_message(self, *args):
+        pass
+    
+    def send_json(self, body, status=200):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+    
+    def do_POST(self):
+        if self.path == '/api/v1/auth/login':
+            return self.send_json({
+                'requestSuccessful': True,
+                'responseBody': {'accessToken': 'fake-token', 'expiresIn': 3600}
+            })
+        self.send_json({'requestSuccessful': False}, status=404)
+    
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != '/api/v1/bank-transfer/reserved-accounts/transactions':
+            return self.send_json({'requestSuccessful': False}, status=404)
+        if self.headers.get('Authorization') != 'Bearer fake-token':
+            return self.send_json({'requestSuccessful': False}, status=401)
+        
+        query = parse_qs(url.query)
+        page, size = int(query['page'][0]), int(query['size'][0])
+        items = self.transactions.get(query['accountReference'][0], [])
+        total_pages = max(1, -(-len(items) // size))
+        self.send_json({
+            'requestSuccessful': True,
+            'responseBody': {
+                'content': items[page * size:(page + 1) * size],
+                'totalPages': total_pages,
+                'last': page + 1 >= total_pages,
+            }
+        })
+
+
+@pytest.fixture
+def fake_monnify():
+    """Run a fake Monnify API on a random local port"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeMonnifyHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield FakeMonnifyHandler, MonnifyService(base_url=f'http://127.0.0.1:{server.server_port}')
+    server.shutdown()
+    FakeMonnifyHandler.transactions = {}
+
+
+@pytest.fixture
+def reconcile_account(db):
+    """Create an agent with a reserved account and a pending settlement of 1,000"""
+    user = User.objects.create_user(email='reconcile@test.com', password='testpass123')
+    agent = Agent.objects.create(user=user, business_name='Reconcile Agent')
+    account = MonnifyReservedAccount.objects.create(
+        agent=agent,
+        account_reference=f'agent-{agent.id}',
+        account_number='9900000002',
+        account_name='Reconcile Agent',
+        bank_name='Moniepoint',
+        bank_code='50515',
+        reservation_reference='RES-RECONCILE-1'
+    )
+    today = timezone.now().date()
+    WeeklySettlement.objects.create(
+        agent=agent,
+        week_starting=today - timedelta(days=6),
+        week_ending=today,
+        total_amount=1000,
+        status='PENDING',
+        due_date=today + timedelta(days=2),
+        invoice_number='INV-RECONCILE-001'
+    )
+    return account
+
+
+def monnify_transaction(reference, amount, hours_ago=1, status='PAID'):
+    paid_on = timezone.now() - timedelta(hours=hours_ago)
+    return {
+        'transactionReference': reference,
+        'paymentReference': f'PAY-{reference}',
+        'amountPaid': amount,
+        'paidOn': paid_on.strftime('%Y-%m-%dT%H:%M:%S.000Z'),
+        'paymentStatus': status,
+    }
+
+
+@pytest.mark.django_db
+class TestReconciliation:
+    """Test reconciliation of reserved-account transactions"""
+    
+    def test_backfills_transactions_missing_a_webhook(self, fake_monnify, reconcile_account):
+        handler, service = fake_monnify
+        handler.transactions[reconcile_account.account_reference] = [
+            monnify_transaction(f'MNFY-REC-{i}', 100) for i in range(5)
+        ] + [monnify_transaction('MNFY-REC-FAILED', 100, status='FAILED')]
+        # One transaction already arrived and was applied normally
+        MonnifyWebhookLog.objects.create(
+            event_type='SUCCESSFUL_TRANSACTION',
+            transaction_reference='MNFY-REC-0',
+            raw_payload={},
+            processed=True
+        )
+        SettlementPayment.objects.create(
+            settlement=WeeklySettlement.objects.get(),
+            amount=100,
+            payment_reference='MNFY-REC-0',
+            status='CONFIRMED',
+            payment_date=timezone.now()
+        )
+        
+        [result] = reconcile_reserved_accounts(service=service, workers=2)
+        
+        assert result['missing'] == {'MNFY-REC-1', 'MNFY-REC-2', 'MNFY-REC-3', 'MNFY-REC-4'}
+        assert result['backfilled'] == result['missing']
+        settlement = WeeklySettlement.objects.get()
+        assert settlement.amount_paid == Decimal('400')
+        assert not MonnifyWebhookLog.objects.filter(processed=False).exists()
+        assert not MonnifyWebhookLog.objects.filter(transaction_reference='MNFY-REC-FAILED').exists()
+    
+    def test_webhooks_handled_without_a_payment_are_not_unapplied(self, fake_monnify, reconcile_account):
+        handler, service = fake_monnify
+        handler.transactions[reconcile_account.account_reference] = [
+            monnify_transaction('MNFY-NO-SETTLEMENT', 100),
+            monnify_transaction('MNFY-ERRORED', 100),
+        ]
+        # Processed with nothing to apply (no open settlement at the time)
+        MonnifyWebhookLog.objects.create(
+            event_type='SUCCESSFUL_TRANSACTION',
+            transaction_reference='MNFY-NO-SETTLEMENT',
+            raw_payload={},
+            processed=True
+        )
+        MonnifyWebhookLog.objects.create(
+            event_type='SUCCESSFUL_TRANSACTION',
+            transaction_reference='MNFY-ERRORED',
+            raw_payload={},
+            processing_error='Timeout'
+        )
+        
+        [result] = reconcile_reserved_accounts(service=service, dry_run=True)
+        
+        assert result['missing'] == set()
+        assert result['unapplied'] == {'MNFY-ERRORED'}
+    
+    def test_pages_through_all_transactions(self, fake_monnify, reconcile_account):
+        handler, service = fake_monnify
+        handler.transactions[reconcile_account.account_reference] = [
+            monnify_transaction(f'MNFY-PAGE-{i}', 1) for i in range(250)
+        ]
+        
+        [result] = reconcile_reserved_accounts(service=service, dry_run=True)
+        
+        assert result['transactions'] == 250
+        assert len(result['missing']) == 250
+        assert not MonnifyWebhookLog.objects.exists()
+    
+    def test_stops_at_since_window(self, fake_monnify, reconcile_account):
+        handler, service = fake_monnify
+        handler.transactions[reconcile_account.account_reference] = [
+            monnify_transaction('MNFY-RECENT', 100, hours_ago=1),
+            monnify_transaction('MNFY-OLD', 100, hours_ago=72),
+        ]
+        
+        [result] = reconcile_reserved_accounts(
+            service=service,
+            since=timezone.now() - timedelta(days=1),
+            dry_run=True
+        )
+        
+        assert result['missing'] == {'MNFY-RECENT'}
+    
+    def test_fetch_failure_is_reported_per_account(self, fake_monnify, reconcile_account):
+        _, service = fake_monnify
+        service.base_url += '/unreachable'
+        
+        [result] = reconcile_reserved_accounts(service=service)
+        
+        assert 'error' in result
@@ -0,0 +1,118 @@
+"""
+Tests for the cached per-agent settlement snapshots
+"""
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.platform.models import User, Agent, AgentBilling
+from apps.platform.views import WeeklySettlementView
+from apps.agents.models import Phone
+from apps.payments.monnify_models import WeeklySettlement
+from apps.payments.monnify_views import get_weekly_settlement
+from apps.payments.payment_service import apply_settlement_payment
+from apps.payments.settlement_service import current_week_ending
+
+
+@pytest.fixture
+def fleet_agent(db):
+    """Create an agent with a few phones and a pending settlement for this week"""
+    user = User.objects.create_user(email='fleet@test.com', password='testpass123')
+    agent = Agent.objects.create(user=user, business_name='Fleet Agent')
+    for i in range(3):
+        Phone.objects.create(
+            agent=agent,
+            imei=f'35000000000020{i}',
+            model='Galaxy A14',
+            lifecycle_status='sold'
+        )
+    week_ending = current_week_ending()
+    WeeklySettlement.objects.create(
+        agent=agent,
+        week_starting=week_ending - timedelta(days=6),
+        week_ending=week_ending,
+        total_amount=3000,
+        status='PENDING',
+        due_date=week_ending + timedelta(days=2),
+        invoice_number='INV-FLEET-001'
+    )
+    return agent
+
+
+def poll(imei):
+    request = RequestFactory().get(f'/api/settlements/weekly/{imei}/')
+    return get_weekly_settlement(request, imei)
+
+
+@pytest.mark.django_db
+class TestWeeklySettlementSnapshot:
+    """Test the cached weekly settlement poll"""
+    
+    def test_polls_after_the_first_hit_no_database(self, fleet_agent):
+        poll('350000000000200')
+        
+        with CaptureQueriesContext(connection) as queries:
+            # Other phones of the same agent share the snapshot
+            poll('350000000000200')
+            poll('350000000000201')
+            responses = [poll('350000000000202')]
+        
+        # Only the IMEI -> agent lookups for the two phones not seen yet
+        assert len(queries) == 2
+        assert responses[0].status_code == 200
+    
+    def test_payment_rebuilds_snapshot(self, fleet_agent, django_capture_on_commit_callbacks):
+        poll('350000000000200')
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            apply_settlement_payment(fleet_agent, 1000, 'MNFY-SNAPSHOT-1')
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = poll('350000000000200')
+        
+        assert len(queries) == 0
+        assert b'"amount_paid": 1000.0' in response.content
+    
+    def test_unknown_imei_until_phone_is_created(self, fleet_agent, django_capture_on_commit_callbacks):
+        assert poll('000000000000000').status_code == 404
+        
+        with django_capture_on_commit_callbacks(execute=True):
+            Phone.objects.create(
+                agent=fleet_agent,
+                imei='000000000000000',
+                model='Galaxy A14',
+                lifecycle_status='in_stock'
+            )
+        
+        assert poll('000000000000000').status_code == 200
+
+
+@pytest.mark.django_db
+class TestBillingSettlementSnapshot:
+    """Test the cached billing settlement poll"""
+    
+    def test_billing_status_is_cached(self, fleet_agent):
+        today = timezone.now().date()
+        AgentBilling.objects.create(
+            agent=fleet_agent,
+            billing_period_start=today - timedelta(days=today.weekday()),
+            billing_period_end=current_week_ending(today),
+            phones_sold_count=3,
+            fee_per_phone=500,
+            total_amount_due=1500,
+            status='pending',
+            invoice_number='INV-BILLING-001'
+        )
+        view = WeeklySettlementView.as_view()
+        request = RequestFactory().get('/api/settlements/weekly/350000000000200/')
+        
+        first = view(request, imei='350000000000200')
+        with CaptureQueriesContext(connection) as queries:
+            second = view(request, imei='350000000000201')
+        
+        assert first.data['amount_due'] == 1500.0
+        assert second.data == first.data
+        assert len(queries) == 1
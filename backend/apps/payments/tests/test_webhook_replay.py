@@ -0,0 +1,131 @@
+"""
+Tests for Monnify webhook reprocessing
+"""
+import pytest
+from decimal import Decimal
+from datetime import timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.utils import timezone
+
+from apps.platform.models import User, Agent
+from apps.payments.monnify_models import (
+    MonnifyReservedAccount,
+    MonnifyWebhookLog,
+    WeeklySettlement,
+    SettlementPayment
+)
+from apps.payments.webhook_replay import reprocess_webhook_logs, APPLIED, ALREADY_APPLIED
+
+
+@pytest.fixture
+def replay_settlement(db):
+    """Create an agent with a reserved account and a pending settlement of 1,000"""
+    user = User.objects.create_user(email='replay@test.com', password='testpass123')
+    agent = Agent.objects.create(user=user, business_name='Replay Agent')
+    MonnifyReservedAccount.objects.create(
+        agent=agent,
+        account_reference=f'agent-{agent.id}',
+        account_number='9900000001',
+        account_name='Replay Agent',
+        bank_name='Moniepoint',
+        bank_code='50515',
+        reservation_reference='RES-REPLAY-1'
+    )
+    today = timezone.now().date()
+    return WeeklySettlement.objects.create(
+        agent=agent,
+        week_starting=today - timedelta(days=6),
+        week_ending=today,
+        total_amount=1000,
+        status='PENDING',
+        due_date=today + timedelta(days=2),
+        invoice_number='INV-REPLAY-001'
+    )
+
+
+def failed_webhook(reference, amount):
+    payload = {
+        'eventType': 'SUCCESSFUL_TRANSACTION',
+        'transactionReference': reference,
+        'accountNumber': '9900000001',
+        'amountPaid': amount,
+        'paidOn': '2026-01-20T10:00:00Z',
+    }
+    return MonnifyWebhookLog.objects.create(
+        event_type='SUCCESSFUL_TRANSACTION',
+        transaction_reference=reference,
+        account_number='9900000001',
+        amount_paid=amount,
+        raw_payload=payload,
+        processing_error='connection reset'
+    )
+
+
+@pytest.mark.django_db
+class TestReprocessWebhooks:
+    """Test reprocessing of failed webhooks"""
+    
+    def test_applies_failed_webhook_and_marks_processed(self, replay_settlement):
+        log = failed_webhook('MNFY-REPLAY-1', 400)
+        
+        counts = reprocess_webhook_logs()
+        
+        assert counts == {APPLIED: 1}
+        replay_settlement.refresh_from_db()
+        assert replay_settlement.amount_paid == Decimal('400')
+        assert replay_settlement.status == 'PARTIAL'
+        log.refresh_from_db()
+        assert log.processed is True
+        assert log.processing_error is None
+        assert log.settlement_payment.payment_reference == 'MNFY-REPLAY-1'
+    
+    def test_duplicate_deliveries_applied_once(self, replay_settlement):
+        failed_webhook('MNFY-REPLAY-2', 400)
+        failed_webhook('MNFY-REPLAY-2', 400)
+        
+        reprocess_webhook_logs()
+        reprocess_webhook_logs(MonnifyWebhookLog.objects.all())
+        
+        replay_settlement.refresh_from_db()
+        assert replay_settlement.amount_paid == Decimal('400')
+        assert not MonnifyWebhookLog.objects.filter(processed=False).exists()
+    
+    def test_already_applied_reference_only_marked_processed(self, replay_settlement):
+        failed_webhook('MNFY-REPLAY-3', 400)
+        reprocess_webhook_logs()
+        failed_webhook('MNFY-REPLAY-3', 400)
+        
+        assert reprocess_webhook_logs() == {ALREADY_APPLIED: 1}
+        assert SettlementPayment.objects.count() == 1
+    
+    def test_dry_run_reports_diff_without_changes(self, replay_settlement):
+        failed_webhook('MNFY-REPLAY-4', 1000)
+        out = StringIO()
+        
+        call_command('reprocess_webhooks', '--dry-run', stdout=out)
+        
+        assert 'MNFY-REPLAY-4' in out.getvalue()
+        assert 'PENDING -> PAID' in out.getvalue()
+        replay_settlement.refresh_from_db()
+        assert replay_settlement.amount_paid == 0
+        assert MonnifyWebhookLog.objects.filter(processed=False).count() == 1
+
+
+@pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Parallel workers need a shared database with row-level locking (PostgreSQL)'
+)
+@pytest.mark.django_db(transaction=True)
+def test_parallel_workers_apply_each_reference_once(replay_settlement):
+    for i in range(20):
+        # Every transaction delivered twice
+        failed_webhook(f'MNFY-PARALLEL-{i}', 10)
+        failed_webhook(f'MNFY-PARALLEL-{i}', 10)
+    
+    counts = reprocess_webhook_logs(workers=8, chunk_size=5)
+    
+    assert counts == {APPLIED: 20}
+    replay_settlement.refresh_from_db()
+    assert replay_settlement.amount_paid == Decimal('200')
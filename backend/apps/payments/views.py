@@ -2,86 +2,157 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from django.db import transaction
+from django.db.models import Q
 from django.utils import timezone
-from .models import PaymentRecord, InstallmentSchedule
-from .serializers import PaymentRecordSerializer, InstallmentScheduleSerializer
-from apps.platform.models import Agent
+from .models import PaymentRecord, PaymentStatus, InstallmentSchedule
+from .serializers import (
+    PaymentRecordSerializer, InstallmentScheduleSerializer, InstallmentBulkUpdateSerializer
+)
+from .payment_service import apply_sale_payment
+from apps.audit.middleware import get_client_ip
+from apps.platform.bulk_service import apply_bulk_update, bulk_update_response
+from apps.platform.export_service import filter_export, stream_export
+from apps.platform.fieldsets import PlannedQuerysetMixin
+from apps.platform.outbox_service import publish
 from apps.agents.models import Sale
 
 
-class PaymentRecordViewSet(viewsets.ModelViewSet):
+PAYMENT_EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('created_at', 'created_at'),
+    ('payment_date', 'payment_date'),
+    ('status', 'status'),
+    ('sale_id', 'sale_id'),
+    ('installment_id', 'installment_id'),
+    ('customer_name', 'sale__customer__full_name'),
+    ('amount', 'amount'),
+    ('payment_method', 'payment_method'),
+    ('balance_before', 'balance_before'),
+    ('balance_after', 'balance_after'),
+    ('monnify_reference', 'monnify_reference'),
+)
+
+INSTALLMENT_EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('sale_id', 'sale_id'),
+    ('installment_number', 'installment_number'),
+    ('customer_name', 'sale__customer__full_name'),
+    ('due_date', 'due_date'),
+    ('amount_due', 'amount_due'),
+    ('paid_amount', 'paid_amount'),
+    ('paid_date', 'paid_date'),
+    ('status', 'status'),
+)
+
+INSTALLMENT_STATUSES = ('pending', 'partial', 'paid', 'overdue')
+
+# Status moves allowed in bulk; 'partial' and 'paid' are set by payments only
+INSTALLMENT_TRANSITIONS = {
+    'pending': {'overdue'},
+    'partial': {'overdue'},
+    'overdue': {'pending'},  # Rescheduled; only installments nothing was paid on
+}
+
+
+class PaymentRecordViewSet(PlannedQuerysetMixin, viewsets.ModelViewSet):
     """Payment records management"""
     serializer_class = PaymentRecordSerializer
     permission_classes = [permissions.IsAuthenticated]
     filterset_fields = ['status', 'payment_method', 'sale']
+    filter_date_field = 'created_at'
     
     def get_queryset(self):
-        agent = Agent.objects.get(user=self.request.user)
-        return PaymentRecord.objects.filter(agent=agent).select_related('sale')
+        agent = self.request.user.agent_profile
+        return PaymentRecord.objects.filter(agent=agent)
     
+    @transaction.atomic
     def perform_create(self, serializer):
-        agent = Agent.objects.get(user=self.request.user)
-        sale = serializer.validated_data['sale']
-        amount = serializer.validated_data['amount']
-        
-        # Record balance before and after
-        balance_before = sale.balance_remaining
-        balance_after = max(0, balance_before - amount)
+        agent = self.request.user.agent_profile
+        data = serializer.validated_data
         
-        payment = serializer.save(
+        # Lock the sale and apply the payment against its committed balance
+        payment = apply_sale_payment(
+            data['sale'],
+            data['amount'],
             agent=agent,
-            balance_before=balance_before,
-            balance_after=balance_after,
-            status='confirmed'
+            installment=data.get('installment'),
+            payment_method=data['payment_method'],
+            monnify_reference=data.get('monnify_reference')
         )
+        serializer.instance = payment
+        # A payment that settles the sale publishes 'sale.completed'; the
+        # outbox relay issues the unlock command
+    
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """Stream all matching payments as CSV or NDJSON (?output=, ?from=, ?to=, ?status=)"""
+        payments = filter_export(
+            self.get_queryset(), request.query_params, 'created_at', PaymentStatus.values
+        )
+        return stream_export(
+            payments.order_by('id'),
+            PAYMENT_EXPORT_COLUMNS,
+            request.query_params.get('output', 'csv'),
+            f'payments-{timezone.localdate()}',
+            agent_id=request.user.agent_profile.id
+        )
+    
+    @action(detail=False, methods=['get'], url_path='installments/export')
+    def installments_export(self, request):
+        """Stream installments by due date as CSV or NDJSON (?output=, ?from=, ?to=, ?status=)"""
+        agent = request.user.agent_profile
+        installments = filter_export(
+            InstallmentSchedule.objects.filter(sale__agent=agent),
+            request.query_params, 'due_date', INSTALLMENT_STATUSES
+        )
+        return stream_export(
+            installments.order_by('id'),
+            INSTALLMENT_EXPORT_COLUMNS,
+            request.query_params.get('output', 'csv'),
+            f'installments-{timezone.localdate()}',
+            agent_id=agent.id
+        )
+    
+    @action(detail=False, methods=['patch'], url_path='installments/bulk')
+    def installments_bulk(self, request):
+        """Move a list of installments to one status (ids + status), with per-id outcomes"""
+        serializer = InstallmentBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
         
-        # Update sale balance
-        sale.balance_remaining = balance_after
-        if balance_after == 0:
-            sale.status = 'completed'
-            sale.completion_date = timezone.now()
-            
-            # Issue unlock command
-            from apps.enforcement.models import DeviceCommand
-            import hashlib
-            from django.utils import timezone as tz
-            
-            # Generate secure token hash
-            token = f"{sale.id}-{tz.now().timestamp()}"
-            token_hash = hashlib.sha256(token.encode()).hexdigest()
-            
-            DeviceCommand.objects.create(
-                phone=sale.phone,
-                agent=agent,
-                sale=sale,
-                command='unlock',
-                reason='Payment completed',
-                auth_token_hash=token_hash,
-                expires_at=timezone.now() + timezone.timedelta(days=1)
-            )
-        
-        sale.save()
-        
-        # Update installment statuses
-        InstallmentSchedule.objects.filter(
-            sale=sale,
-            status='pending'
-        ).update(status='paid', paid_date=timezone.now().date())
+        agent = request.user.agent_profile
+        result = apply_bulk_update(
+            InstallmentSchedule.objects.filter(sale__agent=agent),
+            data['ids'], data['field'], data['value'],
+            agent=agent,
+            entity_type='installment',
+            transitions=INSTALLMENT_TRANSITIONS,
+            # A partly paid installment is 'partial' once no longer overdue;
+            # only payments set that status
+            blocked=Q(paid_amount__gt=0) if data['value'] == 'pending' else None,
+            actor=getattr(request.user, 'staff_profile', None),
+            ip_address=get_client_ip(request)
+        )
+        return bulk_update_response(result)
     
     @action(detail=False, methods=['get'])
     def overdue(self, request):
         """Get overdue payments"""
-        agent = Agent.objects.get(user=request.user)
+        agent = request.user.agent_profile
         today = timezone.now().date()
         
-        overdue_installments = InstallmentSchedule.objects.filter(
+        overdue_installments = list(InstallmentSchedule.objects.filter(
             sale__agent=agent,
-            status='pending',
+            status__in=['pending', 'partial', 'overdue'],
             due_date__lt=today
-        ).select_related('sale', 'sale__customer', 'sale__phone')
+        ).select_related('sale', 'sale__customer', 'sale__phone'))
         
         # Update status to overdue
-        overdue_installments.update(status='overdue')
+        InstallmentSchedule.objects.filter(
+            id__in=[inst.id for inst in overdue_installments],
+            status__in=['pending', 'partial']
+        ).update(status='overdue')
         
         return Response([
             {
@@ -89,7 +160,7 @@ class PaymentRecordViewSet(viewsets.ModelViewSet):
                 'sale_id': inst.sale.id,
                 'customer_name': inst.sale.customer.full_name,
                 'phone_model': f"{inst.sale.phone.brand} {inst.sale.phone.model}",
-                'amount': inst.amount,
+                'amount': inst.amount_due - inst.paid_amount,
                 'due_date': inst.due_date,
                 'days_overdue': (today - inst.due_date).days
             }
@@ -113,20 +184,30 @@ class MonnifyWebhookView(APIView):
         if payment_status == 'PAID':
             # Find and update payment record
             try:
-                payment = PaymentRecord.objects.get(
-                    monnify_transaction_reference=transaction_reference
-                )
-                payment.status = 'completed'
-                payment.confirmed_at = timezone.now()
-                payment.save()
-                
-                # Update sale balance
-                sale = payment.sale
-                sale.balance_remaining = payment.balance_after
-                if sale.balance_remaining == 0:
-                    sale.status = 'completed'
-                    sale.completion_date = timezone.now()
-                sale.save()
+                with transaction.atomic():
+                    payment = PaymentRecord.objects.get(
+                        monnify_transaction_reference=transaction_reference
+                    )
+                    payment.status = 'completed'
+                    payment.confirmed_at = timezone.now()
+                    payment.save()
+                    
+                    # Update sale balance
+                    sale = payment.sale
+                    sale.balance_remaining = payment.balance_after
+                    completed = sale.balance_remaining == 0 and sale.status != 'completed'
+                    if completed:
+                        sale.status = 'completed'
+                        sale.completion_date = timezone.now()
+                    sale.save()
+                    
+                    if completed:
+                        publish(
+                            'sale.completed',
+                            {'phone_id': sale.phone_id},
+                            agent_id=sale.agent_id,
+                            aggregate=sale
+                        )
                 
                 return Response({'status': 'success'})
             except PaymentRecord.DoesNotExist:
@@ -0,0 +1,202 @@
+"""
+Monnify Webhook Replay
+Reprocesses webhook logs whose payment was never applied
+
+Used by the `reprocess_webhooks` management command and the webhook log
+admin action. Work is done per transaction reference: Monnify may deliver
+the same transaction several times, so all logs sharing a reference are
+locked together and replayed as one. The payment is applied at most once
+because SettlementPayment.payment_reference is unique.
+"""
+import logging
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from decimal import Decimal
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .monnify_models import MonnifyReservedAccount, MonnifyWebhookLog, SettlementPayment
+from .monnify_views import process_successful_payment
+from .payment_service import open_settlements_for, settlement_status_after
+
+logger = logging.getLogger(__name__)
+
+# Outcomes reported for each transaction reference
+APPLIED = 'applied'
+ALREADY_APPLIED = 'already_applied'
+NO_SETTLEMENT = 'no_settlement'
+FAILED = 'failed'
+
+
+def replayable_webhook_logs():
+    """Successful-transaction webhooks that have not been processed yet"""
+    return MonnifyWebhookLog.objects.filter(
+        event_type='SUCCESSFUL_TRANSACTION',
+        processed=False
+    )
+
+
+def plan_reference(transaction_reference):
+    """
+    Describe what reprocessing a reference would change, without writing
+
+    Returns:
+        Dict with the outcome and, for payments that would be applied,
+        the settlement's amount_paid/status before and after
+    """
+    log = MonnifyWebhookLog.objects.filter(
+        transaction_reference=transaction_reference
+    ).order_by('-received_at').first()
+    plan = {'reference': transaction_reference, 'log_id': log.id if log else None}
+
+    if SettlementPayment.objects.filter(payment_reference=transaction_reference).exists():
+        return {**plan, 'outcome': ALREADY_APPLIED}
+
+    try:
+        reserved_account = MonnifyReservedAccount.objects.select_related('agent').get(
+            account_number=log.raw_payload.get('accountNumber')
+        )
+    except (AttributeError, MonnifyReservedAccount.DoesNotExist):
+        return {**plan, 'outcome': FAILED, 'error': 'No agent found for account number'}
+
+    settlement = open_settlements_for(reserved_account.agent).first()
+    if not settlement:
+        return {**plan, 'outcome': NO_SETTLEMENT, 'agent_id': reserved_account.agent_id}
+
+    amount = Decimal(str(log.raw_payload.get('amountPaid', 0)))
+    amount_paid_after = settlement.amount_paid + amount
+    return {
+        **plan,
+        'outcome': APPLIED,
+        'agent_id': reserved_account.agent_id,
+        'settlement_id': settlement.id,
+        'amount': amount,
+        'before': {'amount_paid': settlement.amount_paid, 'status': settlement.status},
+        'after': {
+            'amount_paid': amount_paid_after,
+            'status': settlement_status_after(settlement, amount_paid_after),
+        },
+    }
+
+
+def reprocess_reference(transaction_reference):
+    """
+    Apply the payment for one transaction reference and mark its logs processed
+
+    All webhook logs for the reference are locked with SELECT ... FOR UPDATE,
+    so two replay workers don't process the same reference at once. A live
+    webhook retry inserts a new log row and never takes that lock; what
+    stops it and a replay from both applying the payment is the unique
+    SettlementPayment.payment_reference (the losing transaction rolls back).
+
+    Returns:
+        One of APPLIED, ALREADY_APPLIED, NO_SETTLEMENT or FAILED
+    """
+    try:
+        with transaction.atomic():
+            logs = list(
+                MonnifyWebhookLog.objects.select_for_update()
+                .filter(transaction_reference=transaction_reference)
+                .order_by('-received_at')
+            )
+            if not logs or all(log.processed for log in logs):
+                return ALREADY_APPLIED
+
+            latest = logs[0]
+            if SettlementPayment.objects.filter(payment_reference=transaction_reference).exists():
+                outcome = ALREADY_APPLIED
+            else:
+                process_successful_payment(latest.raw_payload, latest)
+                outcome = APPLIED if latest.settlement_payment_id else NO_SETTLEMENT
+
+            MonnifyWebhookLog.objects.filter(
+                id__in=[log.id for log in logs]
+            ).update(processed=True, processed_at=timezone.now(), processing_error=None)
+            return outcome
+
+    except Exception as e:
+        logger.error(f"Reprocessing {transaction_reference} failed: {str(e)}", exc_info=True)
+        MonnifyWebhookLog.objects.filter(
+            transaction_reference=transaction_reference
+        ).update(processing_error=str(e))
+        return FAILED
+
+
+def _reprocess_in_worker(transaction_reference):
+    try:
+        return reprocess_reference(transaction_reference)
+    finally:
+        # Worker threads own their connection; don't leave it open
+        connection.close()
+
+
+def reprocess_webhook_logs(queryset=None, workers=1, chunk_size=500, progress=None):
+    """
+    Reprocess webhook logs in bulk
+
+    References are streamed from the database with iterator(), so memory
+    stays flat however many logs are pending. With workers > 1 they are
+    processed by a thread pool with a bounded number of in-flight tasks.
+
+    Args:
+        queryset: Logs to reprocess (defaults to replayable_webhook_logs())
+        workers: Number of parallel workers
+        chunk_size: Rows fetched per round trip while streaming references
+        progress: Optional callable(counts) invoked after every chunk_size references
+
+    Returns:
+        Counter of outcomes
+    """
+    if queryset is None:
+        queryset = replayable_webhook_logs()
+
+    references = (
+        queryset.order_by('transaction_reference')
+        .values_list('transaction_reference', flat=True)
+        .distinct()
+        .iterator(chunk_size=chunk_size)
+    )
+    counts = Counter()
+
+    def record(outcome):
+        counts[outcome] += 1
+        if progress and sum(counts.values()) % chunk_size == 0:
+            progress(counts)
+
+    if workers <= 1:
+        for reference in references:
+            record(reprocess_reference(reference))
+        return counts
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        in_flight = set()
+        for reference in references:
+            in_flight.add(executor.submit(_reprocess_in_worker, reference))
+            if len(in_flight) >= workers * 4:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(future.result())
+        for future in in_flight:
+            record(future.result())
+
+    return counts
+
+
+def plan_webhook_logs(queryset=None, chunk_size=500):
+    """
+    Yield a dry-run plan for every reference reprocess_webhook_logs would touch
+
+    Each plan is computed against the current database state, independently
+    of the other references in the run.
+    """
+    if queryset is None:
+        queryset = replayable_webhook_logs()
+
+    references = (
+        queryset.order_by('transaction_reference')
+        .values_list('transaction_reference', flat=True)
+        .distinct()
+        .iterator(chunk_size=chunk_size)
+    )
+    for reference in references:
+        yield plan_reference(reference)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class PlatformConfig(AppConfig):
+    name = 'apps.platform'
+
+    def ready(self):
+        # Signal receivers
+        from . import token_service  # noqa: F401
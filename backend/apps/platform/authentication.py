@@ -0,0 +1,180 @@
+"""
+JWT Authentication
+Resolves access tokens to users without a database query per request
+
+CachedJWTAuthentication replaces simplejwt's JWTAuthentication. It keeps a
+snapshot of each user's row and agent profile in a TwoLevelCache for the
+access token lifetime, and rebuilds request.user (with agent_profile
+already attached) from it. User and Agent saves drop the snapshot once
+they commit; other processes may serve it for up to AUTH_USER_LOCAL_TTL
+seconds more.
+
+Tokens issued through AgentRefreshToken also carry 'role' and 'agent_id'
+claims, so code that only needs the agent's id (read routing, rate
+limits) reads it from the token: see token_agent_id(). Their blacklist
+checks go through the cache (apps.platform.token_service), and the
+refresh endpoint uses CachedTokenRefreshSerializer.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .cache_service import TwoLevelCache
+from .models import Agent, User
+from .token_service import is_blacklisted
+
+# Agent fields kept in the snapshot; others (Monnify credentials, KYC
+# numbers) stay out of the cache and load from the database on access
+AGENT_SNAPSHOT_FIELDS = (
+    'id', 'user_id', 'business_name', 'status', 'risk_score',
+    'credit_limit', 'credit_used', 'created_at', 'updated_at'
+)
+
+
+# Model.from_db() takes values in concrete field order
+def _user_fields():
+    # The password hash stays out of the cache
+    return tuple(
+        field.attname for field in User._meta.concrete_fields if field.attname != 'password'
+    )
+
+
+def _agent_fields():
+    return tuple(
+        field.attname for field in Agent._meta.concrete_fields
+        if field.attname in AGENT_SNAPSHOT_FIELDS
+    )
+
+
+def _access_token_seconds(value):
+    return int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+
+
+users = TwoLevelCache(
+    'auth:user',
+    ttl=_access_token_seconds,
+    local_ttl=settings.AUTH_USER_LOCAL_TTL,
+    local_size=settings.AUTH_USER_LOCAL_SIZE
+)
+
+
+def _load_snapshot(user_id):
+    user = User.objects.select_related('agent_profile').filter(pk=user_id).first()
+    if user is None:
+        return None
+    agent = getattr(user, 'agent_profile', None)
+    return (
+        tuple(getattr(user, name) for name in _user_fields()),
+        tuple(getattr(agent, name) for name in _agent_fields()) if agent else None
+    )
+
+
+def _from_snapshot(snapshot):
+    user_values, agent_values = snapshot
+    user = User.from_db(DEFAULT_DB_ALIAS, _user_fields(), user_values)
+    agent = None
+    if agent_values is not None:
+        agent = Agent.from_db(DEFAULT_DB_ALIAS, _agent_fields(), agent_values)
+        agent._state.fields_cache['user'] = user
+    # user.agent_profile resolves without a query (None raises DoesNotExist)
+    user._state.fields_cache['agent_profile'] = agent
+    return user
+
+
+def cached_user(user_id):
+    """
+    User (with agent_profile attached) from the auth snapshot cache
+
+    Returns:
+        A fresh User instance, or None if no user has this id
+    """
+    snapshot = users.get_or_set(str(user_id), lambda: _load_snapshot(user_id))
+    return _from_snapshot(snapshot) if snapshot else None
+
+
+def invalidate_user(user_id):
+    """Drop a user's auth snapshot once the current transaction commits"""
+    if user_id is not None:
+        transaction.on_commit(lambda: users.delete_many([str(user_id)]))
+
+
+class AgentRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry the user's role and agent id"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token['role'] = user.role
+        agent = getattr(user, 'agent_profile', None)
+        token['agent_id'] = agent.id if agent else None
+        return token
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM], self.payload['exp']):
+            raise TokenError(_("Token is blacklisted"))
+
+
+class CachedTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    TokenRefreshSerializer with cached blacklist checks and user lookups
+
+    Rotation and blacklisting work as in simplejwt; only the blacklist
+    check and the active-user check are answered from the caches.
+    """
+    token_class = AgentRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        user_id = refresh.payload.get(api_settings.USER_ID_CLAIM)
+        if user_id:
+            user = cached_user(user_id)
+            if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+                raise AuthenticationFailed(
+                    self.error_messages['no_active_account'],
+                    'no_active_account',
+                )
+
+        data = {'access': str(refresh.access_token)}
+
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            if api_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data['refresh'] = str(refresh)
+
+        return data
+
+
+def token_agent_id(request):
+    """Agent id claim of the request's access token (None if absent)"""
+    auth = getattr(request, 'auth', None)
+    return auth.get('agent_id') if hasattr(auth, 'get') else None
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that resolves users from the auth snapshot cache"""
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares the password hash, which isn't cached
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        user = cached_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
@@ -0,0 +1,83 @@
+"""
+Agent Billing Service
+Builds the billing settlement state shown on devices
+
+Cached as a per-agent, per-week snapshot alongside the weekly settlement
+snapshot (see apps.payments.settlement_service).
+"""
+from apps.payments.settlement_service import agent_snapshot, aagent_snapshot
+from .models import AgentBilling
+
+
+def billing_settlement_status(agent_id, today):
+    """
+    Settlement status of the agent's billing record covering today
+
+    Returns:
+        Dict matching the mobile WeeklySettlementResponse
+    """
+    return _billing_payload(_current_billings(agent_id, today).first(), today)
+
+
+async def abilling_settlement_status(agent_id, today):
+    """Async version of billing_settlement_status"""
+    return _billing_payload(await _current_billings(agent_id, today).afirst(), today)
+
+
+def _current_billings(agent_id, today):
+    return AgentBilling.objects.filter(
+        agent_id=agent_id,
+        billing_period_start__lte=today,
+        billing_period_end__gte=today
+    ).order_by('-created_at')
+
+
+def _billing_payload(billing, today):
+    if not billing:
+        return {
+            'has_settlement': False,
+            'is_due': False,
+            'is_overdue': False,
+            'message': 'No settlement due'
+        }
+
+    is_overdue = (
+        billing.status in ['overdue', 'pending'] and
+        billing.billing_period_end < today
+    )
+    is_due = (
+        billing.status in ['pending', 'overdue'] and
+        billing.amount_paid < billing.total_amount_due
+    )
+    amount_due = billing.total_amount_due - billing.amount_paid
+
+    return {
+        'has_settlement': True,
+        'is_due': is_due,
+        'is_overdue': is_overdue,
+        'settlement_id': str(billing.id),
+        'amount_due': float(amount_due),
+        'total_amount': float(billing.total_amount_due),
+        'amount_paid': float(billing.amount_paid),
+        'due_date': billing.billing_period_end.isoformat(),
+        'invoice_number': billing.invoice_number,
+        'billing_period': {
+            'start': billing.billing_period_start.isoformat(),
+            'end': billing.billing_period_end.isoformat()
+        }
+    }
+
+
+def billing_settlement_snapshot(agent_id, today=None):
+    """Cached billing_settlement_status for an agent"""
+    return agent_snapshot('billing', agent_id, billing_settlement_status, today)
+
+
+async def abilling_settlement_snapshot(agent_id, today=None):
+    """Async version of billing_settlement_snapshot"""
+    return await aagent_snapshot('billing', agent_id, abilling_settlement_status, today)
+
+
+def rebuild_billing_settlement_snapshot(agent_id, today=None):
+    """Recompute and cache an agent's billing settlement snapshot"""
+    return agent_snapshot('billing', agent_id, billing_settlement_status, today, rebuild=True)
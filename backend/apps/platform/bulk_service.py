@@ -0,0 +1,153 @@
+"""
+Bulk Updates
+One validated change applied to a list of ids with a single UPDATE
+
+A bulk endpoint takes {"ids": [...], "<field>": <value>}. The rows the view's
+queryset can see are read (and locked) once, each id gets an outcome, and
+every eligible row is changed by one UPDATE:
+
+    - updated: the row moved to the new value
+    - unchanged: the row already had the value
+    - invalid_transition: the move from the row's current value is not allowed
+    - not_found: no such row in the queryset (e.g. another agent's)
+
+The batch is recorded as one AgentAuditLog entry summarizing the outcomes,
+written in the same transaction as the UPDATE; bulk_update_response() marks
+the response so AuditLoggingMiddleware does not log the request again.
+"""
+import dataclasses
+from collections import Counter
+from django.db import router, transaction
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from apps.audit.models import AgentAuditLog
+
+MAX_BULK_IDS = 500
+
+UPDATED = 'updated'
+UNCHANGED = 'unchanged'
+INVALID_TRANSITION = 'invalid_transition'
+NOT_FOUND = 'not_found'
+
+
+class BulkUpdateSerializer(serializers.Serializer):
+    """
+    Base for bulk update payloads: ids plus exactly one of the declared fields
+
+    validated_data becomes {'ids': [...], 'field': name, 'value': value}.
+    """
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BULK_IDS
+    )
+
+    def validate(self, attrs):
+        changes = {name: value for name, value in attrs.items() if name != 'ids'}
+        if len(changes) != 1:
+            options = ', '.join(name for name in self.fields if name != 'ids')
+            raise serializers.ValidationError(f'Provide exactly one of: {options}')
+        (name, value), = changes.items()
+        return {'ids': list(dict.fromkeys(attrs['ids'])), 'field': name, 'value': value}
+
+
+@dataclasses.dataclass
+class BulkUpdateResult:
+    """Per-id outcomes of a bulk update, in request order"""
+    field: str
+    value: object
+    results: list = dataclasses.field(default_factory=list)
+
+    @property
+    def updated_ids(self):
+        return [row['id'] for row in self.results if row['outcome'] == UPDATED]
+
+    @property
+    def counts(self):
+        return dict(Counter(row['outcome'] for row in self.results))
+
+    def as_dict(self):
+        return {
+            'field': self.field,
+            'value': self.value,
+            'counts': self.counts,
+            'results': self.results,
+        }
+
+
+def _outcome(pk, current, value, transitions, blocked_ids):
+    if pk not in current:
+        return {'id': pk, 'outcome': NOT_FOUND}
+    if current[pk] == value:
+        return {'id': pk, 'outcome': UNCHANGED}
+    if pk in blocked_ids or (transitions is not None and value not in transitions.get(current[pk], ())):
+        return {'id': pk, 'outcome': INVALID_TRANSITION, 'current': current[pk]}
+    return {'id': pk, 'outcome': UPDATED}
+
+
+def apply_bulk_update(queryset, ids, field_name, value, *, agent, entity_type,
+                      transitions=None, blocked=None, updates=None, actor=None, ip_address=None):
+    """
+    Set field_name to value on the ids the queryset contains, in one UPDATE
+
+    Args:
+        queryset: Rows the caller may change (the agent's)
+        ids: Primary keys to change, without duplicates
+        field_name: Field to set
+        value: New value
+        agent: Agent the audit entry belongs to
+        entity_type: Entity name for the audit entry (e.g. 'phone')
+        transitions: {current value: allowed new values}; None allows any change
+        blocked: Q of rows that may not take the new value from any current
+            value (their outcome is invalid_transition)
+        updates: Other columns to set on the updated rows (e.g. updated_at)
+        actor: AgentStaff making the change, if any
+        ip_address: Client IP for the audit entry
+
+    Returns:
+        BulkUpdateResult
+    """
+    result = BulkUpdateResult(field=field_name, value=value)
+    using = router.db_for_write(queryset.model)
+    with transaction.atomic(using=using):
+        rows = queryset.using(using).select_for_update(of=('self',)).filter(pk__in=ids)
+        current = dict(rows.values_list('pk', field_name))
+        blocked_ids = set(rows.filter(blocked).values_list('pk', flat=True)) if blocked is not None else set()
+        result.results = [_outcome(pk, current, value, transitions, blocked_ids) for pk in ids]
+
+        updated_ids = result.updated_ids
+        if updated_ids:
+            queryset.model._default_manager.using(using).filter(pk__in=updated_ids).update(
+                **{field_name: value}, **(updates or {})
+            )
+
+        AgentAuditLog.objects.create(
+            agent=agent,
+            actor=actor,
+            action=f'bulk_update_{entity_type}',
+            entity_type=entity_type,
+            entity_id=0,  # Many entities; the ids are in the metadata
+            metadata={
+                'field': field_name,
+                'value': value,
+                'requested': len(ids),
+                'counts': result.counts,
+                'updated_ids': updated_ids,
+                'skipped': {
+                    str(row['id']): row['outcome']
+                    for row in result.results if row['outcome'] != UPDATED
+                },
+            },
+            description=f'Set {field_name} to {value!r} on {len(updated_ids)} of {len(ids)} {entity_type}s',
+            ip_address=ip_address
+        )
+    return result
+
+
+def bulk_update_response(result):
+    """200 response with the per-id outcomes, already audited"""
+    response = Response(result.as_dict())
+    # Summarized by apply_bulk_update(); skipped by AuditLoggingMiddleware
+    response.audit_logged = True
+    return response
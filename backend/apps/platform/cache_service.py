@@ -0,0 +1,570 @@
+"""
+Two-Level Cache Service
+Caching helpers for hot lookups (IMEI resolution, settlement snapshots, ...)
+
+A TwoLevelCache keeps a small in-process TTL LRU in front of the shared
+Django cache (Redis in production, locmem in tests):
+
+    - Single-flight: on a miss only one caller rebuilds a key. Threads of
+      this process wait on a per-key lock; other processes see a lock
+      key in the shared cache and serve the stale entry, or wait for the
+      rebuilt one.
+    - Probabilistic early expiry: as an entry nears expiry, readers
+      increasingly volunteer to rebuild it ahead of time (XFetch), so a
+      hot key does not expire for every process at once.
+    - Tags: entries can be tagged (e.g. with agent_tag(agent_id)).
+      invalidate_tags() bumps the tags' versions in the shared cache, so
+      every entry built under an older version is treated as a miss. A
+      value whose tags are only known after the build is not stored if
+      one of them was invalidated while it was being built.
+    - Metrics: per-cache hit, miss, stale and rebuild counts plus lookup
+      and build latency, see cache_metrics().
+
+Entries in other processes' LRUs may be served stale for up to local_ttl
+seconds after an invalidation.
+"""
+import asyncio
+import math
+import random
+import threading
+import time
+import uuid
+import weakref
+import zlib
+from collections import OrderedDict
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache, caches
+
+# Returned by LocalLRUCache.get() on a miss
+MISSING = object()
+
+# All TwoLevelCache instances by name, for metrics and clear_local_caches()
+_registry = {}
+
+# Seconds of clock difference between processes allowed for when comparing
+# a build's start with a tag invalidation
+CLOCK_SKEW = 1.0
+
+# KEYS: lock key; ARGV: owner token
+# Deletes the lock only if it still holds the token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_release_lock = threading.Lock()
+
+# redis.asyncio clients by event loop, see aredis_client()
+_async_clients = weakref.WeakKeyDictionary()
+
+
+class LocalLRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL"""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def delete_where(self, predicate):
+        """Drop every entry whose value matches predicate(value)"""
+        with self._lock:
+            stale = [key for key, (_, value) in self._entries.items() if predicate(value)]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class CacheMetrics:
+    """Counters for one TwoLevelCache in this process"""
+
+    FIELDS = [
+        'local_hits',
+        'hits',
+        'misses',
+        'stale_served',
+        'early_rebuilds',
+        'builds',
+        'lookup_ms',
+        'build_ms',
+    ]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = dict.fromkeys(self.FIELDS, 0)
+            self._counts['lookups'] = 0
+
+    def record(self, outcome, lookup_seconds):
+        with self._lock:
+            self._counts[outcome] += 1
+            self._counts['lookups'] += 1
+            self._counts['lookup_ms'] += lookup_seconds * 1000
+
+    def record_build(self, seconds):
+        with self._lock:
+            self._counts['builds'] += 1
+            self._counts['build_ms'] += seconds * 1000
+
+    def snapshot(self):
+        with self._lock:
+            counts = dict(self._counts)
+        lookups = counts['lookups']
+        hits = counts['local_hits'] + counts['hits'] + counts['stale_served']
+        counts['hit_ratio'] = round(hits / lookups, 4) if lookups else 0
+        counts['lookup_ms_avg'] = round(counts['lookup_ms'] / lookups, 3) if lookups else 0
+        counts['build_ms_avg'] = round(counts['build_ms'] / counts['builds'], 3) if counts['builds'] else 0
+        counts['lookup_ms'] = round(counts['lookup_ms'], 3)
+        counts['build_ms'] = round(counts['build_ms'], 3)
+        return counts
+
+
+def agent_tag(agent_id):
+    """Tag for entries derived from an agent's data"""
+    return f'agent:{agent_id}'
+
+
+def _tag_key(tag):
+    return f'cache:tag:{tag}'
+
+
+def _tag_versions(tags, found):
+    return {tag: found.get(_tag_key(tag)) for tag in tags}
+
+
+def _invalidated_at(version):
+    # Versions are (id, time of the invalidation); None if never invalidated
+    return version[1] if isinstance(version, tuple) else 0
+
+
+def invalidate_tags(tags):
+    """
+    Invalidate every entry, in every TwoLevelCache, built under these tags
+
+    Shared entries become misses everywhere at once; local LRU entries are
+    dropped in this process and expire within local_ttl elsewhere.
+    """
+    tags = set(tags)
+    if not tags:
+        return
+    version = (uuid.uuid4().hex, time.time())
+    cache.set_many({_tag_key(tag): version for tag in tags}, None)
+    for two_level in _registry.values():
+        two_level.drop_local_tags(tags)
+
+
+def invalidate_agent(agent_id):
+    """Invalidate every cached entry tagged with this agent"""
+    invalidate_tags([agent_tag(agent_id)])
+
+
+def cache_metrics():
+    """Metrics of every TwoLevelCache in this process, by cache name"""
+    return {name: two_level.metrics.snapshot() for name, two_level in _registry.items()}
+
+
+def clear_local_caches():
+    """Empty the in-process level of every TwoLevelCache (e.g. between tests)"""
+    for two_level in _registry.values():
+        two_level.local.clear()
+
+
+def _redis_cache():
+    from django.core.cache.backends.redis import RedisCache
+    # `cache` is a proxy, so check the backend instance itself
+    backend = caches['default']
+    return backend if isinstance(backend, RedisCache) else None
+
+
+def redis_client():
+    """Client of the default cache if it is Django's Redis backend, else None"""
+    backend = _redis_cache()
+    return backend._cache.get_client(write=True) if backend is not None else None
+
+
+def aredis_client():
+    """
+    redis.asyncio client for the default cache's (write) server, or None
+
+    Connection pools are bound to an event loop, so there is one client
+    per running loop.
+    """
+    backend = _redis_cache()
+    if backend is None:
+        return None
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        import redis.asyncio
+        client = _async_clients[loop] = redis.asyncio.Redis.from_url(backend._servers[0])
+    return client
+
+
+def acquire_lock(key, timeout):
+    """
+    Take a lock key in the shared cache
+
+    The lock holds a random owner token. It is an int, which Django's Redis
+    backend stores as-is, so RELEASE_LOCK_SCRIPT can compare it.
+
+    Returns:
+        Token to pass to release_lock(), or None if the lock is held
+    """
+    token = uuid.uuid4().int >> 66
+    return token if cache.add(key, token, timeout) else None
+
+
+async def aacquire_lock(key, timeout):
+    """Async version of acquire_lock"""
+    token = uuid.uuid4().int >> 66
+    return token if await cache.aadd(key, token, timeout) else None
+
+
+def release_lock(key, token):
+    """
+    Delete a lock key if it still holds this owner's token
+
+    A holder that overran the lock timeout must not delete a lock another
+    caller has taken since. On Redis the check and the delete are one
+    script; on other backends they run under a process-local lock.
+
+    Returns:
+        True if the lock was released
+    """
+    client = redis_client()
+    if client is not None:
+        return bool(client.eval(RELEASE_LOCK_SCRIPT, 1, cache.make_and_validate_key(key), token))
+    with _release_lock:
+        if cache.get(key) != token:
+            return False
+        cache.delete(key)
+        return True
+
+
+async def arelease_lock(key, token):
+    """Async version of release_lock"""
+    client = aredis_client()
+    if client is not None:
+        return bool(await client.eval(RELEASE_LOCK_SCRIPT, 1, cache.make_and_validate_key(key), token))
+    return await sync_to_async(release_lock, thread_sensitive=False)(key, token)
+
+
+class TwoLevelCache:
+    """
+    In-process LRU in front of the shared cache, with single-flight rebuilds
+
+    Args:
+        name: Key prefix, unique per cache
+        ttl: Seconds an entry is fresh, or callable(value) -> seconds
+        local_ttl: Seconds an entry is kept in the in-process LRU (0 disables it)
+        local_size: Max entries in the in-process LRU
+        stale_ttl: Seconds an expired entry is kept to serve while it is rebuilt
+        lock_timeout: Max seconds a rebuild may hold the single-flight lock
+        beta: Early expiry eagerness (0 disables it; higher rebuilds earlier)
+    """
+
+    LOCK_STRIPES = 64
+    WAIT_INTERVAL = 0.05
+
+    def __init__(self, name, ttl, local_ttl=0, local_size=1000, stale_ttl=30,
+                 lock_timeout=10, beta=1.0):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lock_timeout = lock_timeout
+        self.beta = beta
+        self.local = LocalLRUCache(maxsize=local_size, ttl=local_ttl)
+        self.metrics = CacheMetrics()
+        self._stripes = [threading.Lock() for _ in range(self.LOCK_STRIPES)]
+        _registry[name] = self
+
+    def key(self, key):
+        """Shared cache key of an entry"""
+        return f'{self.name}:{key}'
+
+    def _ttl_for(self, value):
+        return self.ttl(value) if callable(self.ttl) else self.ttl
+
+    def _tags_for(self, tags, value):
+        return list(tags(value) if callable(tags) else tags)
+
+    # Entries are stored in the shared cache as
+    # (value, expires_at, build_seconds, {tag: version}) and in the LRU as
+    # (value, tags).
+
+    def _fresh(self, entry, versions):
+        value, expires_at, build_seconds, entry_versions = entry
+        if entry_versions != versions:
+            return None
+        if self.beta and build_seconds:
+            # XFetch: -log(u) is exponentially distributed, so rebuilds get
+            # likelier as expiry nears and cheap entries rebuild latest
+            expires_at += build_seconds * self.beta * math.log(1.0 - random.random())
+        return time.time() < expires_at
+
+    def _lookup(self, full_key, found):
+        """Classify a shared cache read as ('hit'|'stale'|'miss', entry)"""
+        entry = found.get(full_key)
+        if entry is None:
+            return 'miss', None
+        versions = _tag_versions(entry[3], found)
+        fresh = self._fresh(entry, versions)
+        if fresh is None:
+            return 'miss', None
+        return ('hit' if fresh else 'stale'), entry
+
+    def _entry(self, value, tags, versions, late_versions, build_seconds, started):
+        """
+        Shared cache entry for a built value, or None if it must not be stored
+
+        late_versions are the versions of tags known only after the build.
+        If one was invalidated since the build started, the value may
+        predate the change: stamping it with the new version would serve it
+        as fresh.
+        """
+        if any(_invalidated_at(v) > started - CLOCK_SKEW for v in late_versions.values()):
+            return None
+        versions = {**versions, **late_versions}
+        expires_at = time.time() + self._ttl_for(value)
+        return (value, expires_at, build_seconds, {tag: versions[tag] for tag in tags})
+
+    def _store(self, full_key, value, tags, versions, build_seconds, started):
+        tags = self._tags_for(tags, value)
+        late = [tag for tag in tags if tag not in versions]
+        found = cache.get_many([_tag_key(tag) for tag in late]) if late else {}
+        entry = self._entry(value, tags, versions, _tag_versions(late, found), build_seconds, started)
+        if entry is not None:
+            cache.set(full_key, entry, self._ttl_for(value) + self.stale_ttl)
+            if self.local.ttl:
+                self.local.set(full_key, (value, tags))
+
+    async def _astore(self, full_key, value, tags, versions, build_seconds, started):
+        tags = self._tags_for(tags, value)
+        late = [tag for tag in tags if tag not in versions]
+        found = await cache.aget_many([_tag_key(tag) for tag in late]) if late else {}
+        entry = self._entry(value, tags, versions, _tag_versions(late, found), build_seconds, started)
+        if entry is not None:
+            await cache.aset(full_key, entry, self._ttl_for(value) + self.stale_ttl)
+            if self.local.ttl:
+                self.local.set(full_key, (value, tags))
+
+    def _build(self, full_key, build, tags, versions):
+        started = time.time()
+        start = time.perf_counter()
+        value = build()
+        build_seconds = time.perf_counter() - start
+        self.metrics.record_build(build_seconds)
+        self._store(full_key, value, tags, versions, build_seconds, started)
+        return value
+
+    async def _abuild(self, full_key, build, tags, versions):
+        if not iscoroutinefunction(build):
+            # Synchronous builders (ORM code) run on Django's sync thread
+            return await sync_to_async(self._build)(full_key, build, tags, versions)
+        started = time.time()
+        start = time.perf_counter()
+        value = await build()
+        build_seconds = time.perf_counter() - start
+        self.metrics.record_build(build_seconds)
+        await self._astore(full_key, value, tags, versions, build_seconds, started)
+        return value
+
+    def _read(self, full_key, tags):
+        """
+        Shared entry and tag versions, plus the versions of the caller's tags
+
+        Tags passed as a list are read with the entry in one round trip;
+        tags only the entry knows (callable tags) take a second one.
+        """
+        known = [] if callable(tags) else list(tags)
+        found = cache.get_many([full_key, *[_tag_key(tag) for tag in known]])
+        entry = found.get(full_key)
+        if entry is not None:
+            missing = [tag for tag in entry[3] if tag not in known]
+            if missing:
+                found.update(cache.get_many([_tag_key(tag) for tag in missing]))
+        return found, _tag_versions(known, found)
+
+    async def _aread(self, full_key, tags):
+        known = [] if callable(tags) else list(tags)
+        found = await cache.aget_many([full_key, *[_tag_key(tag) for tag in known]])
+        entry = found.get(full_key)
+        if entry is not None:
+            missing = [tag for tag in entry[3] if tag not in known]
+            if missing:
+                found.update(await cache.aget_many([_tag_key(tag) for tag in missing]))
+        return found, _tag_versions(known, found)
+
+    def get_or_set(self, key, build, tags=()):
+        """
+        Cached value of a key, built with build() on a miss
+
+        Args:
+            key: Entry key (prefixed with the cache name)
+            build: Callable() -> value; may return None
+            tags: Tags of the entry, or callable(value) -> tags
+
+        Returns:
+            The cached or freshly built value
+        """
+        start = time.perf_counter()
+        full_key = self.key(key)
+
+        local = self.local.get(full_key, MISSING)
+        if local is not MISSING:
+            self.metrics.record('local_hits', time.perf_counter() - start)
+            return local[0]
+
+        found, versions = self._read(full_key, tags)
+        state, entry = self._lookup(full_key, found)
+        if state == 'hit':
+            if self.local.ttl:
+                self.local.set(full_key, (entry[0], list(entry[3])))
+            self.metrics.record('hits', time.perf_counter() - start)
+            return entry[0]
+
+        value, outcome = self._rebuild(full_key, build, tags, versions, entry)
+        self.metrics.record(outcome, time.perf_counter() - start)
+        return value
+
+    def _rebuild(self, full_key, build, tags, versions, stale):
+        stripe = self._stripes[zlib.crc32(full_key.encode()) % self.LOCK_STRIPES]
+        with stripe:
+            # Another thread may have rebuilt the entry while we waited
+            local = self.local.get(full_key, MISSING)
+            if local is not MISSING:
+                return local[0], 'local_hits'
+
+            lock_key = f'{full_key}:lock'
+            token = acquire_lock(lock_key, self.lock_timeout)
+            if token is not None:
+                try:
+                    value = self._build(full_key, build, tags, versions)
+                finally:
+                    release_lock(lock_key, token)
+                return value, 'early_rebuilds' if stale is not None else 'misses'
+
+            # Another process is rebuilding
+            if stale is not None:
+                return stale[0], 'stale_served'
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.WAIT_INTERVAL)
+                found, versions = self._read(full_key, tags)
+                state, entry = self._lookup(full_key, found)
+                if state != 'miss':
+                    return entry[0], 'hits'
+
+            return self._build(full_key, build, tags, versions), 'misses'
+
+    async def aget_or_set(self, key, build, tags=()):
+        """
+        Async version of get_or_set
+
+        Cache reads and writes are awaited. build may be a coroutine
+        function, which is awaited on the event loop; a synchronous builder
+        runs on Django's sync thread, so pass async builders (async ORM)
+        from request paths. Single-flight across processes and event loops
+        goes through the shared lock key only.
+        """
+        start = time.perf_counter()
+        full_key = self.key(key)
+
+        local = self.local.get(full_key, MISSING)
+        if local is not MISSING:
+            self.metrics.record('local_hits', time.perf_counter() - start)
+            return local[0]
+
+        found, versions = await self._aread(full_key, tags)
+        state, entry = self._lookup(full_key, found)
+        if state == 'hit':
+            if self.local.ttl:
+                self.local.set(full_key, (entry[0], list(entry[3])))
+            self.metrics.record('hits', time.perf_counter() - start)
+            return entry[0]
+
+        lock_key = f'{full_key}:lock'
+        token = await aacquire_lock(lock_key, self.lock_timeout)
+        if token is not None:
+            try:
+                value = await self._abuild(full_key, build, tags, versions)
+            finally:
+                await arelease_lock(lock_key, token)
+            outcome = 'early_rebuilds' if entry is not None else 'misses'
+        elif entry is not None:
+            value, outcome = entry[0], 'stale_served'
+        else:
+            value, outcome = await self._await_rebuild(full_key, build, tags, versions)
+
+        self.metrics.record(outcome, time.perf_counter() - start)
+        return value
+
+    async def _await_rebuild(self, full_key, build, tags, versions):
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.WAIT_INTERVAL)
+            found, versions = await self._aread(full_key, tags)
+            state, entry = self._lookup(full_key, found)
+            if state != 'miss':
+                return entry[0], 'hits'
+        return await self._abuild(full_key, build, tags, versions), 'misses'
+
+    def refresh(self, key, build, tags=()):
+        """Rebuild and store an entry now, regardless of what is cached"""
+        full_key = self.key(key)
+        known = [] if callable(tags) else list(tags)
+        versions = _tag_versions(known, cache.get_many([_tag_key(tag) for tag in known]))
+        return self._build(full_key, build, tags, versions)
+
+    def get(self, key, default=None):
+        """Cached value of a key without building it (either level)"""
+        full_key = self.key(key)
+        local = self.local.get(full_key, MISSING)
+        if local is not MISSING:
+            return local[0]
+        found, _ = self._read(full_key, ())
+        state, entry = self._lookup(full_key, found)
+        return entry[0] if state == 'hit' else default
+
+    def delete_many(self, keys):
+        """Drop entries from the shared cache and this process's LRU"""
+        full_keys = [self.key(key) for key in keys]
+        self.local.delete_many(full_keys)
+        cache.delete_many(full_keys)
+
+    def drop_local_tags(self, tags):
+        """Drop this process's LRU entries carrying any of these tags"""
+        self.local.delete_where(lambda entry: not tags.isdisjoint(entry[1]))
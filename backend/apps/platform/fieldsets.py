@@ -0,0 +1,223 @@
+"""
+Sparse Fieldsets
+?fields= and ?expand= on read endpoints, with the queryset planned from them
+
+Serializers that mix in SparseFieldsetMixin return only the fields listed
+in ?fields= (all of them by default), and replace the related ids named in
+?expand= with the nested objects declared in Meta.expandable_fields:
+
+    GET /api/sales/?fields=id,balance_remaining,customer.full_name&expand=customer
+
+Dotted names select fields of an expanded object (and expand it), to any
+depth.
+
+Viewsets that mix in PlannedQuerysetMixin derive select_related(),
+prefetch_related() and only() for list and retrieve from the serializer's
+remaining fields (plan_queryset()), so a narrow request runs narrow SQL
+and related data costs one query per relation instead of one per row.
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+class Fieldset:
+    """Requested fields of one serializer level (fields=None: all of them)"""
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand or {}
+
+    def child(self, name):
+        return self.expand.setdefault(name, Fieldset())
+
+    @classmethod
+    def parse(cls, fields='', expand=''):
+        """Build the tree from comma-separated ?fields= and ?expand= values"""
+        root = cls()
+        for path in _names(expand):
+            node = root
+            for name in path.split('.'):
+                node = node.child(name)
+        for path in _names(fields):
+            node = root
+            *parents, name = path.split('.')
+            for parent in parents:
+                node.fields = _with(node.fields, parent)
+                node = node.child(parent)
+            node.fields = _with(node.fields, name)
+        return root
+
+
+def _names(value):
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def _with(fields, name):
+    return (fields or set()) | {name}
+
+
+class SparseFieldsetMixin:
+    """
+    ModelSerializer mixin for ?fields= and ?expand=
+
+    Declare expansions as Meta.expandable_fields = {name: (serializer, kwargs)};
+    the serializer may be a dotted path to avoid circular imports. Writes
+    always use the full field set.
+    """
+
+    def __init__(self, *args, fieldset=None, **kwargs):
+        self._fieldset = fieldset
+        super().__init__(*args, **kwargs)
+
+    def get_fieldset(self):
+        if self._fieldset is None:
+            request = self.context.get('request')
+            if request is None or request.method not in SAFE_METHODS:
+                self._fieldset = Fieldset()
+            else:
+                self._fieldset = Fieldset.parse(
+                    request.query_params.get(FIELDS_PARAM),
+                    request.query_params.get(EXPAND_PARAM)
+                )
+        return self._fieldset
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.get_fieldset()
+        expandable = getattr(self.Meta, 'expandable_fields', {})
+
+        errors = {}
+        unknown = sorted(set(fieldset.expand) - set(expandable))
+        if unknown:
+            errors[EXPAND_PARAM] = [
+                f"Cannot expand {', '.join(unknown)}; "
+                f"expandable: {', '.join(sorted(expandable)) or 'none'}"
+            ]
+        if fieldset.fields is not None:
+            unknown = sorted(fieldset.fields - set(fields) - set(expandable))
+            if unknown:
+                errors[FIELDS_PARAM] = [
+                    f"Unknown fields {', '.join(unknown)}; available: {', '.join(fields)}"
+                ]
+        if errors:
+            raise serializers.ValidationError(errors)
+
+        for name, child in fieldset.expand.items():
+            serializer_class, kwargs = expandable[name]
+            if isinstance(serializer_class, str):
+                serializer_class = import_string(serializer_class)
+            fields[name] = serializer_class(fieldset=child, read_only=True, **kwargs)
+
+        if fieldset.fields is not None:
+            fields = {name: field for name, field in fields.items() if name in fieldset.fields}
+        return fields
+
+
+def _model_field(model, name):
+    try:
+        return model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def _all_columns(model, path):
+    return {path + field.name for field in model._meta.concrete_fields}
+
+
+def _plan(serializer, model, path, only, select_related, prefetch):
+    """Collect the lookups one serializer level (on model, at path) reads"""
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        if field.source == '*':
+            # Method fields and the like may read any column
+            only |= _all_columns(model, path)
+            continue
+
+        if isinstance(field, serializers.ListSerializer):
+            relation = _model_field(model, field.source)
+            if relation is None or not relation.is_relation:
+                only |= _all_columns(model, path)
+                continue
+            required = (relation.field.name,) if relation.one_to_many else ()
+            queryset = plan_queryset(
+                relation.related_model._default_manager.all(), field.child, required
+            )
+            prefetch.append(Prefetch(path + field.source, queryset=queryset))
+            continue
+
+        current, prefix = model, path
+        parts = field.source.split('.')
+        for index, name in enumerate(parts):
+            model_field = _model_field(current, name)
+            if model_field is None or not model_field.concrete:
+                if model_field is not None and (model_field.many_to_many or model_field.one_to_many):
+                    prefetch.append(prefix + name)
+                else:
+                    # A property or method of the model
+                    only |= _all_columns(current, prefix)
+                break
+            only.add(prefix + name)
+            if model_field.many_to_many:
+                prefetch.append(prefix + name)
+                break
+            if not model_field.is_relation:
+                break
+            last = index == len(parts) - 1
+            if last and not isinstance(field, serializers.BaseSerializer):
+                # Related id only
+                break
+            select_related.add(prefix + name)
+            current, prefix = model_field.related_model, f'{prefix}{name}__'
+            if last:
+                _plan(field, current, prefix, only, select_related, prefetch)
+
+
+def plan_queryset(queryset, serializer, required=()):
+    """
+    Add the select_related(), prefetch_related() and only() a serializer needs
+
+    Forward relations read through dotted sources ('customer.full_name') or
+    expanded are joined, expanded many-relations are prefetched with their
+    own planned queryset, and only the columns the fields read are loaded
+    (all columns of a model whose properties or methods are read).
+
+    Args:
+        queryset: Queryset of the serializer's model
+        serializer: Serializer instance bound to the request context
+        required: Extra columns to load (e.g. the key a prefetch joins on)
+
+    Returns:
+        The planned queryset
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    only, select_related, prefetch = set(required), set(), []
+    _plan(serializer, queryset.model, '', only, select_related, prefetch)
+
+    if select_related:
+        queryset = queryset.select_related(*sorted(select_related))
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    return queryset.only(*sorted(only))
+
+
+class PlannedQuerysetMixin:
+    """
+    Viewset mixin planning list and retrieve querysets from the serializer
+
+    Other actions (writes, custom actions) get the queryset unchanged.
+    """
+    planned_actions = ('list', 'retrieve')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action in self.planned_actions:
+            queryset = plan_queryset(queryset, self.get_serializer())
+        return queryset
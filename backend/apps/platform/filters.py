@@ -0,0 +1,232 @@
+"""
+Indexed Filtering
+Query-parameter filters that are only accepted when an index serves them
+
+IndexedFilterBackend (the default filter backend) filters list endpoints by
+the fields a view declares in filterset_fields (?status=active,
+?status=active,defaulted, ?phone=12) and, for views with a
+filter_date_field, by an inclusive date range (?from=2026-01-01&to=2026-01-31).
+
+Before filtering, the combination is checked against the model's b-tree
+indexes: the filtered fields, together with the equality conditions the
+view's queryset already has (e.g. agent=...), must make up the leading
+columns of one index, followed by the date field if a range is requested.
+Any other combination is rejected with a 400 naming the combinations that
+are served, so no filter can turn into a sequential scan.
+"""
+import datetime
+import functools
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import UniqueConstraint
+from django.db.models.expressions import Col
+from django.db.models.lookups import Exact, In
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+DATE_FROM_PARAM = 'from'
+DATE_TO_PARAM = 'to'
+
+
+@functools.cache
+def index_columns(model):
+    """
+    Field names of each plain b-tree index of a model, in index order
+
+    Covers Meta.indexes and unique constraints without conditions or
+    expressions, unique_together, and single-column indexes (primary key,
+    unique and db_index fields, foreign keys).
+    """
+    opts = model._meta
+    indexes = []
+    for index in opts.indexes:
+        if index.fields and index.condition is None and not index.opclasses and not index.include:
+            indexes.append(tuple(name.lstrip('-') for name in index.fields))
+    for constraint in opts.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.fields and constraint.condition is None:
+            indexes.append(tuple(constraint.fields))
+    indexes.extend(tuple(fields) for fields in opts.unique_together)
+    for field in opts.concrete_fields:
+        if field.primary_key or field.unique or field.db_index:
+            indexes.append((field.name,))
+    return indexes
+
+
+def _served_by(columns, equal, scope, range_field):
+    prefix = 0
+    while prefix < len(columns) and columns[prefix] in equal | scope:
+        prefix += 1
+    if not equal <= set(columns[:prefix]):
+        return False
+    return range_field is None or (prefix < len(columns) and columns[prefix] == range_field)
+
+
+def index_serves(model, equal, range_field=None, scope=frozenset()):
+    """
+    Whether one index of the model serves the filter
+
+    Args:
+        model: Model being filtered
+        equal: Field names compared by equality (or IN)
+        range_field: Field compared by range, if any
+        scope: Field names the queryset already compares by equality
+    """
+    return any(
+        _served_by(columns, set(equal), set(scope), range_field)
+        for columns in index_columns(model)
+    )
+
+
+def served_combinations(model, fields, range_field=None, scope=frozenset()):
+    """Filter combinations the model's indexes serve, for error messages"""
+    combinations = set()
+    for columns in index_columns(model):
+        names = []
+        for column in columns:
+            if column in scope:
+                continue
+            if column == range_field:
+                combinations.add(', '.join(names + [f'{DATE_FROM_PARAM}/{DATE_TO_PARAM}']))
+                break
+            if column not in fields:
+                break
+            names.append(column)
+            combinations.add(', '.join(names))
+    return sorted(combinations)
+
+
+def queryset_scope(queryset):
+    """Fields the queryset's top-level conditions compare by equality"""
+    scope = set()
+    for child in queryset.query.where.children:
+        if isinstance(child, (Exact, In)) and isinstance(child.lhs, Col):
+            if child.lhs.target.model is queryset.model:
+                scope.add(child.lhs.target.name)
+    return frozenset(scope)
+
+
+def _date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    date = parse_date(value) if len(value) == 10 else None
+    if date is None:
+        raise ValidationError({name: 'Use the YYYY-MM-DD format'})
+    return date
+
+
+def _start_of_day(date):
+    return timezone.make_aware(datetime.datetime.combine(date, datetime.time.min))
+
+
+def date_range(params):
+    """
+    The ?from= and ?to= dates (inclusive), either of them None
+
+    Raises:
+        ValidationError: If a date is malformed or the range is reversed
+    """
+    start, end = _date_param(params, DATE_FROM_PARAM), _date_param(params, DATE_TO_PARAM)
+    if start and end and start > end:
+        raise ValidationError({DATE_FROM_PARAM: f"Must not be after '{DATE_TO_PARAM}'"})
+    return start, end
+
+
+def filter_date_range(queryset, date_field, start, end):
+    """
+    Keep rows whose date_field falls within [start, end]
+
+    Datetime fields are compared against local day boundaries, so the
+    filter stays a plain range on the indexed column.
+    """
+    if queryset.model._meta.get_field(date_field).get_internal_type() == 'DateTimeField':
+        if start:
+            queryset = queryset.filter(**{f'{date_field}__gte': _start_of_day(start)})
+        if end:
+            queryset = queryset.filter(
+                **{f'{date_field}__lt': _start_of_day(end + datetime.timedelta(days=1))}
+            )
+    else:
+        if start:
+            queryset = queryset.filter(**{f'{date_field}__gte': start})
+        if end:
+            queryset = queryset.filter(**{f'{date_field}__lte': end})
+    return queryset
+
+
+def parse_filter_values(field, value):
+    """
+    Python values of a comma-separated filter parameter
+
+    Raises:
+        ValidationError: If a value is invalid for the field or not one of its choices
+    """
+    target = field.target_field if field.is_relation else field
+    values = []
+    for raw in value.split(','):
+        try:
+            parsed = target.to_python(raw.strip())
+        except DjangoValidationError as e:
+            raise ValidationError({field.name: e.messages})
+        if field.choices and parsed not in {choice for choice, _ in field.flatchoices}:
+            raise ValidationError({field.name: f"'{parsed}' is not a valid choice"})
+        values.append(parsed)
+    return values
+
+
+class IndexedFilterBackend(BaseFilterBackend):
+    """
+    Filters by the view's filterset_fields and filter_date_field
+
+    Only combinations an index serves are accepted (see index_serves()).
+    """
+
+    def get_filter_fields(self, model, view):
+        fields = {}
+        for name in getattr(view, 'filterset_fields', ()):
+            try:
+                fields[name] = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                raise ImproperlyConfigured(
+                    f"{type(view).__name__}.filterset_fields: {model.__name__} has no field '{name}'"
+                )
+        return fields
+
+    def filter_queryset(self, request, queryset, view):
+        model = queryset.model
+        params = request.query_params
+        fields = self.get_filter_fields(model, view)
+        date_field = getattr(view, 'filter_date_field', None)
+
+        conditions = {}
+        for name, field in fields.items():
+            if params.get(name):
+                values = parse_filter_values(field, params[name])
+                if len(values) == 1:
+                    conditions[name] = values[0]
+                else:
+                    conditions[f'{name}__in'] = values
+
+        start, end = date_range(params) if date_field else (None, None)
+        if not conditions and not (start or end):
+            return queryset
+
+        range_field = date_field if start or end else None
+        equal = {name.split('__')[0] for name in conditions}
+        scope = queryset_scope(queryset)
+        if not index_serves(model, equal, range_field, scope):
+            requested = sorted(equal) + ([f'{DATE_FROM_PARAM}/{DATE_TO_PARAM}'] if range_field else [])
+            served = served_combinations(model, fields, date_field, scope)
+            raise ValidationError({
+                'filters': [
+                    f"No index serves filtering on {' + '.join(requested)}; "
+                    f"filter on one of: {'; '.join(served) or 'nothing'}"
+                ]
+            })
+
+        queryset = queryset.filter(**conditions)
+        if range_field:
+            queryset = filter_date_range(queryset, date_field, start, end)
+        return queryset
@@ -0,0 +1,183 @@
+"""
+Django management command to benchmark the orjson renderer and parser.
+
+Builds a page of representative response data for each list endpoint
+(payments, installments, sales, phones, customers, plus the raw Decimal
+payload of the overdue endpoint) with the viewsets' own serializers, from
+in-memory model instances, so no database is needed. Then times DRF's
+stdlib JSONRenderer/JSONParser against ORJSONRenderer/ORJSONParser on
+each payload.
+
+Usage:
+    python manage.py benchmark_json_renderers
+    python manage.py benchmark_json_renderers --page-size 100 --iterations 500
+"""
+
+import io
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from apps.agents.models import AgentStaff, Customer, Phone, Sale
+from apps.agents.serializers import CustomerSerializer, PhoneSerializer, SaleSerializer
+from apps.payments.models import InstallmentSchedule, PaymentRecord
+from apps.payments.serializers import InstallmentScheduleSerializer, PaymentRecordSerializer
+from apps.platform.parsers import ORJSONParser
+from apps.platform.renderers import ORJSONRenderer
+
+
+def _page(results):
+    """Wrap serialized rows the way PageNumberPagination does"""
+    return {
+        'count': len(results) * 10,
+        'next': 'https://api.mederpay.com/api/resource/?page=2',
+        'previous': None,
+        'results': results,
+    }
+
+
+def build_payloads(page_size):
+    """Serialized response data per endpoint, built from unsaved instances"""
+    now = timezone.now()
+    today = now.date()
+
+    customers = [
+        Customer(
+            id=i, full_name=f'Customer {i}', phone_number=f'+23480000{i:05d}',
+            email=f'customer{i}@example.com', address=f'{i} Allen Avenue, Ikeja, Lagos',
+            nin='12345678901', bvn='22345678901', created_at=now
+        )
+        for i in range(page_size)
+    ]
+    phones = [
+        Phone(
+            id=i, imei=f'35{i:013d}', model='Galaxy A14', platform_registry_id=i,
+            locking_app_installed=True, lifecycle_status='sold',
+            created_at=now, updated_at=now
+        )
+        for i in range(page_size)
+    ]
+    staff = AgentStaff(id=1, full_name='Sales Rep')
+    sales = [
+        Sale(
+            id=i, customer=customers[i], phone=phones[i], sold_by=staff,
+            sale_price=Decimal('185000.00'), down_payment=Decimal('35000.00'),
+            total_payable=Decimal('210000.00'), balance_remaining=Decimal('87500.50'),
+            status='active', created_at=now
+        )
+        for i in range(page_size)
+    ]
+    installments = [
+        InstallmentSchedule(
+            id=i, sale=sales[i], amount_due=Decimal('17500.00'),
+            due_date=today + timedelta(weeks=i % 12), paid_amount=Decimal('8750.25'),
+            status='partial'
+        )
+        for i in range(page_size)
+    ]
+    payments = [
+        PaymentRecord(
+            id=i, sale=sales[i], installment=installments[i], amount=Decimal('17500.00'),
+            payment_method='bank_transfer', balance_before=Decimal('105000.50'),
+            balance_after=Decimal('87500.50'), monnify_reference=f'MNFY|{i:012d}',
+            status='confirmed', created_at=now
+        )
+        for i in range(page_size)
+    ]
+    overdue = [
+        {
+            'id': i,
+            'sale_id': i,
+            'customer_name': f'Customer {i}',
+            'amount': Decimal('17500.00') - Decimal('8750.25'),
+            'due_date': today - timedelta(days=i % 30 + 1),
+            'days_overdue': i % 30 + 1,
+        }
+        for i in range(page_size)
+    ]
+
+    return {
+        'payments': _page(PaymentRecordSerializer(payments, many=True).data),
+        'installments': _page(InstallmentScheduleSerializer(installments, many=True).data),
+        'sales': _page(SaleSerializer(sales, many=True).data),
+        'phones': _page(PhoneSerializer(phones, many=True).data),
+        'customers': _page(CustomerSerializer(customers, many=True).data),
+        'overdue (raw Decimal)': overdue,
+    }
+
+
+def _time_per_call(func, iterations):
+    """Median-free best-of-3 average in microseconds"""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        elapsed = (time.perf_counter() - start) / iterations * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+class Command(BaseCommand):
+    help = 'Compare the stdlib and orjson DRF renderers and parsers on API payloads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=30,
+            help='Rows per payload (default: 30, the API page size)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200,
+            help='Calls per measurement (default: 200)',
+        )
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        payloads = build_payloads(options['page_size'])
+        renderers = (JSONRenderer(), ORJSONRenderer())
+        parsers = (JSONParser(), ORJSONParser())
+
+        self.stdout.write(
+            f"\nRendering and parsing {options['page_size']}-row payloads, "
+            f"{iterations} calls per measurement\n"
+        )
+        header = f"  {'payload':<24} {'KB':>6} {'render µs':>22} {'parse µs':>22}"
+        self.stdout.write(header)
+        self.stdout.write(f"  {'':<24} {'':>6} {'json':>7} {'orjson':>7} {'x':>6} {'json':>7} {'orjson':>7} {'x':>6}")
+
+        render_speedups = []
+        parse_speedups = []
+        for name, data in payloads.items():
+            body = renderers[1].render(data)
+            render = [_time_per_call(lambda r=r: r.render(data), iterations) for r in renderers]
+            parse = [
+                _time_per_call(lambda p=p: p.parse(io.BytesIO(body)), iterations)
+                for p in parsers
+            ]
+            render_speedups.append(render[0] / render[1])
+            parse_speedups.append(parse[0] / parse[1])
+            self.stdout.write(
+                f"  {name:<24} {len(body) / 1024:>6.1f} "
+                f"{render[0]:>7.0f} {render[1]:>7.0f} {render_speedups[-1]:>5.1f}x "
+                f"{parse[0]:>7.0f} {parse[1]:>7.0f} {parse_speedups[-1]:>5.1f}x"
+            )
+
+        self.stdout.write('\n' + '=' * 60)
+        self.stdout.write(self.style.SUCCESS('\nSummary:'))
+        self.stdout.write(
+            f"  Rendering: orjson {min(render_speedups):.1f}x - {max(render_speedups):.1f}x faster"
+        )
+        self.stdout.write(
+            f"  Parsing: orjson {min(parse_speedups):.1f}x - {max(parse_speedups):.1f}x faster"
+        )
+        self.stdout.write(
+            '  Serializer output already carries Decimals as strings; raw Decimals\n'
+            '  (e.g. the overdue endpoint) render as strings with orjson, floats with json'
+        )
@@ -0,0 +1,52 @@
+"""
+Django management command to compact the JWT token blacklist.
+
+Deletes outstanding refresh tokens that have expired, together with their
+blacklist entries, in chunks (apps.platform.token_service). Expired tokens
+are rejected on their expiry alone, so their rows are no longer needed.
+
+Usage:
+    python manage.py compact_token_blacklist
+    python manage.py compact_token_blacklist --chunk-size 5000
+    python manage.py compact_token_blacklist --dry-run
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from apps.platform.token_service import compact_expired_tokens
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted JWT refresh tokens'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.TOKEN_COMPACTION_CHUNK_SIZE,
+            help=f'Tokens deleted per transaction (default: {settings.TOKEN_COMPACTION_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count expired tokens without deleting them',
+        )
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('🔍 DRY RUN MODE - No tokens will be deleted'))
+            outstanding = OutstandingToken.objects.filter(expires_at__lt=now).count()
+            blacklisted = BlacklistedToken.objects.filter(token__expires_at__lt=now).count()
+        else:
+            outstanding, blacklisted = compact_expired_tokens(options['chunk_size'], before=now)
+
+        self.stdout.write('\nSummary:')
+        self.stdout.write(f'  Expired outstanding tokens: {outstanding}')
+        self.stdout.write(f'  Expired blacklisted tokens: {blacklisted}')
+        self.stdout.write(f'  Remaining outstanding tokens: {OutstandingToken.objects.count()}')
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'✅ Deleted {outstanding} expired tokens'))
@@ -15,6 +15,7 @@ from django.utils import timezone
 from calendar import monthrange
 from decimal import Decimal
 from apps.platform.models import Agent, AgentBilling, AgentStatus
+from apps.platform.billing_service import rebuild_billing_settlement_snapshot
 from apps.agents.models import Phone
 
 
@@ -117,6 +118,11 @@ class Command(BaseCommand):
                         invoice_number=invoice_number
                     )
                     
+                    # Refresh the snapshot devices poll once the billing is committed
+                    transaction.on_commit(
+                        lambda agent_id=agent.id: rebuild_billing_settlement_snapshot(agent_id)
+                    )
+                    
                     self.stdout.write(
                         self.style.SUCCESS(
                             f'  ✅ {agent.business_name}: Created billing #{billing.id} - '
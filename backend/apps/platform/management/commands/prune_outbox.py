@@ -0,0 +1,59 @@
+"""
+Django management command to prune processed outbox events.
+
+Deletes OutboxEvents that were processed more than OUTBOX_RETENTION_DAYS
+ago, in chunks (apps.platform.outbox_service). Pending and parked (failed)
+events are never deleted.
+
+Usage:
+    python manage.py prune_outbox
+    python manage.py prune_outbox --days 30 --chunk-size 5000
+    python manage.py prune_outbox --dry-run
+"""
+
+from datetime import timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.platform.models import OutboxEvent, OutboxEventStatus
+from apps.platform.outbox_service import prune_processed_events
+
+
+class Command(BaseCommand):
+    help = 'Delete outbox events processed longer ago than the retention period'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.OUTBOX_RETENTION_DAYS,
+            help=f'Keep events processed in the last N days (default: {settings.OUTBOX_RETENTION_DAYS})',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.OUTBOX_PRUNE_CHUNK_SIZE,
+            help=f'Events deleted per transaction (default: {settings.OUTBOX_PRUNE_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Count prunable events without deleting them',
+        )
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('🔍 DRY RUN MODE - No events will be deleted'))
+            pruned = OutboxEvent.objects.filter(
+                status=OutboxEventStatus.PROCESSED, processed_at__lt=before
+            ).count()
+        else:
+            pruned = prune_processed_events(options['chunk_size'], before=before)
+
+        self.stdout.write('\nSummary:')
+        self.stdout.write(f"  Processed events older than {options['days']} days: {pruned}")
+        self.stdout.write(f'  Remaining events: {OutboxEvent.objects.count()}')
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f'✅ Deleted {pruned} processed events'))
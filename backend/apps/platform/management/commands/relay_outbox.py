@@ -0,0 +1,66 @@
+"""
+Django management command to relay outbox events to their consumers.
+
+Dispatches pending OutboxEvents in batches (apps.platform.outbox_service).
+Run it as a long-lived worker (the default) or once per cron tick with
+--once. Several relays may run at the same time; each claims its own
+batch.
+
+Usage:
+    python manage.py relay_outbox
+    python manage.py relay_outbox --interval 5 --batch-size 1000
+    python manage.py relay_outbox --once
+"""
+
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.platform.outbox_service import relay_pending
+
+
+class Command(BaseCommand):
+    help = 'Relay pending outbox events to their consumers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=settings.OUTBOX_RELAY_INTERVAL,
+            help=f'Seconds between polls when idle (default: {settings.OUTBOX_RELAY_INTERVAL})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.OUTBOX_BATCH_SIZE,
+            help=f'Events per batch (default: {settings.OUTBOX_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Relay every due event and exit',
+        )
+
+    def handle(self, *args, **options):
+        if options['once']:
+            result = relay_pending(options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'✅ Relayed {result.total} events'))
+            self.stdout.write('\nSummary:')
+            self.stdout.write(f'  Processed: {result.processed}')
+            self.stdout.write(f'  Retrying: {result.retried}')
+            self.stdout.write(f'  Failed: {result.failed}')
+            return
+
+        self.stdout.write(f"Relaying outbox events every {options['interval']}s (Ctrl+C to stop)")
+        try:
+            while True:
+                close_old_connections()
+                result = relay_pending(options['batch_size'])
+                if result.total:
+                    self.stdout.write(
+                        f'  Relayed {result.total} events '
+                        f'({result.retried} retrying, {result.failed} failed)'
+                    )
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('\n⚠️  Outbox relay stopped'))
@@ -1,4 +1,5 @@
 from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin, BaseUserManager
 from django.utils import timezone
 from cryptography.fernet import Fernet
@@ -19,6 +20,12 @@ class AgentStatus(models.TextChoices):
     DISABLED = "disabled", "Disabled"
 
 
+class OutboxEventStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    PROCESSED = "processed", "Processed"
+    FAILED = "failed", "Failed"
+
+
 # ========================================
 # CUSTOM USER MANAGER
 # ========================================
@@ -81,6 +88,12 @@ class User(AbstractBaseUser, PermissionsMixin):
     
     def __str__(self):
         return self.email
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Authenticated requests read the user from a cached snapshot
+        from .authentication import invalidate_user
+        invalidate_user(self.pk)
 
 
 class Agent(models.Model):
@@ -124,6 +137,17 @@ class Agent(models.Model):
     def __str__(self):
         return self.business_name
     
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        super().save(*args, **kwargs)
+        # The owner's cached auth snapshot carries the agent profile
+        from .authentication import invalidate_user
+        invalidate_user(self.user_id)
+        if not adding:
+            # Cached device resolutions carry the agent's status
+            from apps.agents.imei_service import invalidate_agent_devices
+            invalidate_agent_devices(self.id)
+    
     def encrypt_field(self, value, encryption_key):
         """Encrypt sensitive data"""
         if not encryption_key:
@@ -169,6 +193,12 @@ class PlatformPhoneRegistry(models.Model):
     
     def __str__(self):
         return f"{self.imei} - {'Blacklisted' if self.is_blacklisted else 'Active'}"
+    
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Cached device resolutions carry the blacklist flag
+        from apps.agents.imei_service import invalidate_imeis
+        invalidate_imeis([self.imei])
 
 
 class AgentBilling(models.Model):
@@ -200,3 +230,41 @@ class AgentBilling(models.Model):
     
     def __str__(self):
         return f"{self.agent.business_name} - {self.invoice_number}"
+
+
+class OutboxEvent(models.Model):
+    """Domain event written in the same transaction as the change it describes"""
+    event_type = models.CharField(max_length=50)
+    agent_id = models.BigIntegerField(null=True, blank=True)
+    aggregate_type = models.CharField(max_length=50, blank=True)
+    aggregate_id = models.BigIntegerField(null=True, blank=True)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    
+    status = models.CharField(
+        max_length=20,
+        choices=OutboxEventStatus.choices,
+        default=OutboxEventStatus.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    
+    # Pending events are relayed once this has passed (retries back off)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        db_table = 'outbox_events'
+        indexes = [
+            # The relay's scan: only pending rows, in order
+            models.Index(
+                fields=['available_at', 'id'],
+                name='outbox_pending_idx',
+                condition=models.Q(status='pending')
+            ),
+            models.Index(fields=['event_type', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event_type} #{self.id} - {self.status}"
+
@@ -0,0 +1,47 @@
+"""
+Outbox consumers: event counters
+
+Counts relayed events per type and day in the shared cache, for the ops
+endpoint (/api/ops/outbox/). Counts may run slightly high when a batch is
+retried, as with any at-least-once consumer.
+"""
+from collections import Counter
+from django.core.cache import cache
+from django.utils import timezone
+
+from .outbox_service import ALL_EVENTS, consumer
+
+COUNTER_TTL = 8 * 24 * 3600
+
+
+def _counter_key(event_type, day):
+    return f"outbox:count:{day.isoformat()}:{event_type}"
+
+
+def _known_types_key(day):
+    return f"outbox:count:{day.isoformat()}:types"
+
+
+@consumer(ALL_EVENTS)
+def count_events(events):
+    day = timezone.now().date()
+    counts = Counter(event.event_type for event in events)
+    for event_type, count in counts.items():
+        key = _counter_key(event_type, day)
+        cache.add(key, 0, COUNTER_TTL)
+        cache.incr(key, count)
+
+    known = cache.get(_known_types_key(day), set())
+    if not counts.keys() <= known:
+        cache.set(_known_types_key(day), known | counts.keys(), COUNTER_TTL)
+
+
+def event_counts(day=None):
+    """Events relayed on a day (default: today), by event type"""
+    day = day or timezone.now().date()
+    types = sorted(cache.get(_known_types_key(day), set()))
+    values = cache.get_many([_counter_key(event_type, day) for event_type in types])
+    return {
+        event_type: values.get(_counter_key(event_type, day), 0)
+        for event_type in types
+    }
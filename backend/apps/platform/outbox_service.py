@@ -0,0 +1,267 @@
+"""
+Transactional Outbox
+Domain events recorded in the same transaction as the change they describe
+
+publish() inserts an OutboxEvent inside the caller's transaction, so an
+event exists exactly when its change was committed. The relay
+(relay_outbox management command) reads pending events in batches and
+hands each batch to the in-process consumers registered for the event
+type with @consumer. Consumer modules are listed in OUTBOX_CONSUMERS.
+
+Delivery is at-least-once: an event is marked processed only after every
+consumer handled it, and an event whose consumer failed is retried later
+(with backoff) by all of its consumers. Consumers must be idempotent.
+
+Processed events are kept for OUTBOX_RETENTION_DAYS and then deleted in
+chunks by prune_processed_events() (prune_outbox management command).
+"""
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from importlib import import_module
+from typing import NamedTuple
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEvent, OutboxEventStatus
+
+logger = logging.getLogger(__name__)
+
+# Consumers registered for every event type
+ALL_EVENTS = '*'
+
+_consumers = defaultdict(list)
+_loaded = False
+
+
+class RelayResult(NamedTuple):
+    processed: int
+    retried: int
+    failed: int
+
+    @property
+    def total(self):
+        return self.processed + self.retried + self.failed
+
+
+def consumer(*event_types):
+    """
+    Register a function as a consumer of the given event types
+
+    The function receives a list of OutboxEvents of one type, oldest first.
+    Use ALL_EVENTS ('*') to receive every event type.
+    """
+    def register(func):
+        for event_type in event_types:
+            if func not in _consumers[event_type]:
+                _consumers[event_type].append(func)
+        return func
+    return register
+
+
+def load_consumers():
+    """Import the consumer modules listed in OUTBOX_CONSUMERS (once)"""
+    global _loaded
+    if not _loaded:
+        for module in settings.OUTBOX_CONSUMERS:
+            import_module(module)
+        _loaded = True
+
+
+def consumers_for(event_type):
+    load_consumers()
+    return _consumers[event_type] + _consumers[ALL_EVENTS]
+
+
+def outbox_event(event_type, payload=None, agent_id=None, aggregate=None) -> OutboxEvent:
+    """
+    Build an unsaved domain event, for publish_many()
+
+    Args:
+        event_type: Dotted event name, e.g. 'sale.completed'
+        payload: JSON-serializable details (Decimals are stored as strings)
+        agent_id: Agent the event belongs to
+        aggregate: Model instance the event is about
+    """
+    return OutboxEvent(
+        event_type=event_type,
+        agent_id=agent_id,
+        aggregate_type=type(aggregate).__name__ if aggregate is not None else '',
+        aggregate_id=aggregate.pk if aggregate is not None else None,
+        payload=payload or {}
+    )
+
+
+def publish(event_type, payload=None, agent_id=None, aggregate=None) -> OutboxEvent:
+    """
+    Record a domain event in the current transaction
+
+    Call it inside the transaction that makes the change; if the
+    transaction rolls back, the event is discarded with it. Arguments are
+    those of outbox_event().
+
+    Returns:
+        The created OutboxEvent
+    """
+    event = outbox_event(event_type, payload, agent_id, aggregate)
+    event.save()
+    return event
+
+
+def publish_many(events):
+    """Record several outbox_event()s with a single INSERT"""
+    return OutboxEvent.objects.bulk_create(events)
+
+
+def _dispatch(handler, events):
+    """
+    Run a consumer over a batch, each call in its own savepoint
+
+    If the batch fails, it is replayed event by event so that one bad event
+    doesn't hold back the others. Returns {event id: error} for the events
+    the consumer could not handle.
+    """
+    try:
+        with transaction.atomic():
+            handler(events)
+        return {}
+    except Exception as exc:
+        if len(events) == 1:
+            name = getattr(handler, '__qualname__', type(handler).__name__)
+            logger.exception(f"Outbox consumer {name} failed on event {events[0].id}")
+            return {events[0].id: f"{name}: {exc}"}
+
+    errors = {}
+    for event in events:
+        errors.update(_dispatch(handler, [event]))
+    return errors
+
+
+def retry_delay(attempts):
+    """Backoff before a failed event is relayed again"""
+    return timedelta(seconds=min(2 ** attempts, settings.OUTBOX_RETRY_MAX_DELAY))
+
+
+def relay_batch(batch_size=None) -> RelayResult:
+    """
+    Dispatch one batch of pending events to their consumers
+
+    Events are claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    relays can run side by side. Consumers' database writes commit in the
+    same transaction that marks their events processed.
+
+    Args:
+        batch_size: Events to claim (defaults to OUTBOX_BATCH_SIZE)
+
+    Returns:
+        RelayResult with the number of processed, retried and failed events
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    now = timezone.now()
+
+    with transaction.atomic():
+        events = list(
+            OutboxEvent.objects.select_for_update(skip_locked=True)
+            .filter(status=OutboxEventStatus.PENDING, available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        if not events:
+            return RelayResult(0, 0, 0)
+
+        by_type = defaultdict(list)
+        for event in events:
+            by_type[event.event_type].append(event)
+
+        errors = {}
+        for event_type, batch in by_type.items():
+            for handler in consumers_for(event_type):
+                for event_id, error in _dispatch(handler, batch).items():
+                    errors.setdefault(event_id, error)
+
+        retried = failed = 0
+        for event in events:
+            event.attempts += 1
+            if event.id not in errors:
+                event.status = OutboxEventStatus.PROCESSED
+                event.processed_at = now
+                event.last_error = ''
+            elif event.attempts >= settings.OUTBOX_MAX_ATTEMPTS:
+                event.status = OutboxEventStatus.FAILED
+                event.last_error = errors[event.id]
+                failed += 1
+            else:
+                event.available_at = now + retry_delay(event.attempts)
+                event.last_error = errors[event.id]
+                retried += 1
+
+        OutboxEvent.objects.bulk_update(
+            events,
+            ['status', 'attempts', 'last_error', 'available_at', 'processed_at']
+        )
+
+    if failed:
+        logger.error(f"Outbox: {failed} events failed {settings.OUTBOX_MAX_ATTEMPTS} times and were parked")
+    return RelayResult(len(events) - retried - failed, retried, failed)
+
+
+def relay_pending(batch_size=None) -> RelayResult:
+    """Relay batches until no pending event is due; returns the totals"""
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    processed = retried = failed = 0
+    while True:
+        result = relay_batch(batch_size)
+        processed += result.processed
+        retried += result.retried
+        failed += result.failed
+        if result.total < batch_size:
+            return RelayResult(processed, retried, failed)
+
+
+def outbox_backlog():
+    """Pending and parked event counts, and the age of the oldest pending event"""
+    pending = OutboxEvent.objects.filter(status=OutboxEventStatus.PENDING)
+    oldest = pending.order_by('available_at', 'id').values_list('created_at', flat=True).first()
+    return {
+        'pending': pending.count(),
+        'failed': OutboxEvent.objects.filter(status=OutboxEventStatus.FAILED).count(),
+        'oldest_pending_seconds': (
+            round((timezone.now() - oldest).total_seconds(), 1) if oldest else 0
+        ),
+    }
+
+
+def prune_processed_events(chunk_size=None, before=None):
+    """
+    Delete processed events, chunk_size per transaction
+
+    Events are deleted oldest first. Pending and parked events are kept.
+    Events are processed in roughly id order, so each chunk is found at the
+    start of the primary key index.
+
+    Args:
+        chunk_size: Events per chunk (defaults to OUTBOX_PRUNE_CHUNK_SIZE)
+        before: Delete events processed before this time (defaults to
+            OUTBOX_RETENTION_DAYS ago)
+
+    Returns:
+        Number of events deleted
+    """
+    chunk_size = chunk_size or settings.OUTBOX_PRUNE_CHUNK_SIZE
+    before = before or timezone.now() - timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+    deleted = 0
+
+    while True:
+        with transaction.atomic():
+            ids = list(
+                OutboxEvent.objects.filter(status=OutboxEventStatus.PROCESSED, processed_at__lt=before)
+                .order_by('id')
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            deleted += OutboxEvent.objects.filter(id__in=ids).delete()[0]
+
+    if deleted:
+        logger.info(f"Pruned {deleted} processed outbox events")
+    return deleted
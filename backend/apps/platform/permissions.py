@@ -0,0 +1,14 @@
+"""
+API permissions shared across apps
+"""
+from rest_framework import permissions
+
+from .models import UserRole
+
+
+class IsPlatformAdmin(permissions.BasePermission):
+    """Allows platform admins only (combine with IsAuthenticated)"""
+    message = 'Platform admin access required'
+
+    def has_permission(self, request, view):
+        return getattr(request.user, 'role', None) == UserRole.PLATFORM_ADMIN
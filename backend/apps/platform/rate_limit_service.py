@@ -0,0 +1,321 @@
+"""
+Device Rate Limiting
+Token buckets per IMEI and per client IP for the unauthenticated device endpoints
+
+Every request to a device endpoint takes one token from two buckets in the
+shared cache: one for the IMEI it names and one for the client IP (a
+cloned or looping device changing IMEIs still hits its IP's bucket). A
+bucket holds up to `burst` tokens and refills at `rate` tokens per second.
+The request is served only if both buckets have a token; otherwise it gets
+a 429 with Retry-After and neither bucket is charged.
+
+    - Redis: both buckets are checked and charged by one Lua script
+      (EVALSHA), so the check is atomic across workers and costs a single
+      round trip. Bucket time comes from the Redis server clock. Async
+      views use redis.asyncio.
+    - Other cache backends (locmem in development and tests): the same
+      algorithm under a process-local lock.
+
+Rejections are counted per endpoint, bucket and day in the shared cache,
+for the ops endpoint (/api/ops/rate-limits/).
+"""
+import functools
+import hashlib
+import math
+import re
+import threading
+import time
+from typing import NamedTuple, Optional
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework.throttling import BaseThrottle
+
+from apps.platform.cache_service import aredis_client, redis_client
+
+# Rate-limited endpoints, by the name their views declare
+DEVICE_ENDPOINTS = (
+    'enforcement-status',
+    'device-sync',
+    'health-check',
+    'weekly-settlement',
+    'confirm-settlement',
+    'reserved-account',
+)
+
+SCOPES = ('imei', 'ip')
+
+COUNTER_TTL = 8 * 24 * 3600
+
+# Anything else is not an IMEI the device endpoints could resolve; such
+# requests are limited by IP only
+_IMEI = re.compile(r'^[0-9A-Za-z]{1,20}$')
+
+# KEYS: n bucket keys, then n rejection counter keys
+# ARGV: n, then rate and burst of each bucket, then the counter TTL
+# Returns {1, 0} when allowed, {0, retry after in ms, rejecting bucket}
+TOKEN_BUCKET_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local n = tonumber(ARGV[1])
+local levels = {}
+local wait, rejected = 0, 0
+for i = 1, n do
+    local rate, burst = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or burst
+    local elapsed = math.max(0, now - (tonumber(state[2]) or now))
+    tokens = math.min(burst, tokens + elapsed * rate)
+    levels[i] = tokens
+    if tokens < 1 and (1 - tokens) / rate > wait then
+        wait, rejected = (1 - tokens) / rate, i
+    end
+end
+if rejected > 0 then
+    redis.call('INCR', KEYS[n + rejected])
+    redis.call('EXPIRE', KEYS[n + rejected], ARGV[2 * n + 2])
+    return {0, math.ceil(wait * 1000), rejected}
+end
+for i = 1, n do
+    local rate, burst = tonumber(ARGV[2 * i]), tonumber(ARGV[2 * i + 1])
+    local tokens = levels[i] - 1
+    redis.call('HSET', KEYS[i], 'tokens', tostring(tokens), 'ts', tostring(now))
+    redis.call('PEXPIRE', KEYS[i], math.ceil((burst - tokens) / rate * 1000) + 1000)
+end
+return {1, 0}
+"""
+
+TOKEN_BUCKET_SHA = hashlib.sha1(TOKEN_BUCKET_SCRIPT.encode()).hexdigest()
+
+_local_lock = threading.Lock()
+
+
+class Bucket(NamedTuple):
+    scope: str
+    key: str
+    rate: float
+    burst: int
+
+    def ttl(self, tokens):
+        """Seconds until the bucket is full again, plus a margin"""
+        return math.ceil((self.burst - tokens) / self.rate) + 1
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    retry_after: int = 0  # Seconds
+    scope: Optional[str] = None  # Bucket that rejected the request
+
+
+ALLOWED = RateLimitResult(True)
+
+
+def device_buckets(imei, ip):
+    """The buckets a request for this IMEI from this IP takes a token from"""
+    buckets = []
+    imei_rate = settings.DEVICE_RATE_LIMIT_IMEI_RATE
+    if imei and imei_rate > 0 and _IMEI.match(str(imei)):
+        buckets.append(Bucket('imei', f'ratelimit:imei:{imei}', imei_rate, settings.DEVICE_RATE_LIMIT_IMEI_BURST))
+    ip_rate = settings.DEVICE_RATE_LIMIT_IP_RATE
+    if ip and ip_rate > 0:
+        buckets.append(Bucket('ip', f'ratelimit:ip:{ip}', ip_rate, settings.DEVICE_RATE_LIMIT_IP_BURST))
+    return buckets
+
+
+def _counter_key(endpoint, scope, day):
+    return f'ratelimit:rejected:{day.isoformat()}:{endpoint}:{scope}'
+
+
+def _script_call(buckets, counter_keys):
+    """KEYS and ARGV of TOKEN_BUCKET_SCRIPT, as evalsha()/eval() arguments"""
+    keys = [cache.make_and_validate_key(key) for key in [b.key for b in buckets] + counter_keys]
+    args = [len(buckets)]
+    for bucket in buckets:
+        args += [bucket.rate, bucket.burst]
+    args.append(COUNTER_TTL)
+    return [len(keys), *keys, *args]
+
+
+def _script_result(buckets, reply):
+    if reply[0]:
+        return ALLOWED
+    return RateLimitResult(False, math.ceil(int(reply[1]) / 1000), buckets[int(reply[2]) - 1].scope)
+
+
+def _take_from_redis(client, buckets, counter_keys):
+    from redis.exceptions import NoScriptError
+    call = _script_call(buckets, counter_keys)
+    try:
+        reply = client.evalsha(TOKEN_BUCKET_SHA, *call)
+    except NoScriptError:
+        # First call on this Redis server (or after SCRIPT FLUSH)
+        reply = client.eval(TOKEN_BUCKET_SCRIPT, *call)
+    return _script_result(buckets, reply)
+
+
+async def _atake_from_redis(client, buckets, counter_keys):
+    from redis.exceptions import NoScriptError
+    call = _script_call(buckets, counter_keys)
+    try:
+        reply = await client.evalsha(TOKEN_BUCKET_SHA, *call)
+    except NoScriptError:
+        reply = await client.eval(TOKEN_BUCKET_SCRIPT, *call)
+    return _script_result(buckets, reply)
+
+
+def _take_locally(buckets, counter_keys):
+    now = time.time()
+    with _local_lock:
+        states = cache.get_many([bucket.key for bucket in buckets])
+        levels = []
+        wait, rejected = 0, None
+        for i, bucket in enumerate(buckets):
+            tokens, ts = states.get(bucket.key, (bucket.burst, now))
+            tokens = min(bucket.burst, tokens + max(0.0, now - ts) * bucket.rate)
+            levels.append(tokens)
+            if tokens < 1 and (1 - tokens) / bucket.rate > wait:
+                wait, rejected = (1 - tokens) / bucket.rate, i
+        if rejected is not None:
+            cache.add(counter_keys[rejected], 0, COUNTER_TTL)
+            cache.incr(counter_keys[rejected])
+            return RateLimitResult(False, math.ceil(wait), buckets[rejected].scope)
+        for bucket, tokens in zip(buckets, levels):
+            cache.set(bucket.key, (tokens - 1, now), bucket.ttl(tokens - 1))
+    return ALLOWED
+
+
+def check_rate_limit(endpoint, imei, ip):
+    """
+    Take a token from the IMEI's and the IP's buckets
+
+    Args:
+        endpoint: One of DEVICE_ENDPOINTS, for the rejection counters
+        imei: IMEI the request names, if any
+        ip: Client IP, if known
+
+    Returns:
+        RateLimitResult; when not allowed, retry_after is the number of
+        seconds until the rejecting bucket has a token again
+    """
+    buckets = device_buckets(imei, ip)
+    if not buckets:
+        return ALLOWED
+    day = timezone.now().date()
+    counter_keys = [_counter_key(endpoint, bucket.scope, day) for bucket in buckets]
+    client = redis_client()
+    if client is not None:
+        return _take_from_redis(client, buckets, counter_keys)
+    return _take_locally(buckets, counter_keys)
+
+
+async def acheck_rate_limit(endpoint, imei, ip):
+    """
+    Async version of check_rate_limit
+
+    On Redis the script runs on the redis.asyncio client; otherwise the
+    local check runs in a worker thread of its own (it only touches the
+    cache), so concurrent requests are not serialized.
+    """
+    buckets = device_buckets(imei, ip)
+    if not buckets:
+        return ALLOWED
+    day = timezone.now().date()
+    counter_keys = [_counter_key(endpoint, bucket.scope, day) for bucket in buckets]
+    client = aredis_client()
+    if client is not None:
+        return await _atake_from_redis(client, buckets, counter_keys)
+    return await sync_to_async(_take_locally, thread_sensitive=False)(buckets, counter_keys)
+
+
+def rejected_counts(day=None):
+    """Requests rejected on a day (default: today), by endpoint and bucket"""
+    day = day or timezone.now().date()
+    keys = {
+        (endpoint, scope): _counter_key(endpoint, scope, day)
+        for endpoint in DEVICE_ENDPOINTS for scope in SCOPES
+    }
+    values = cache.get_many(keys.values())
+    return {
+        endpoint: {scope: int(values.get(keys[endpoint, scope], 0)) for scope in SCOPES}
+        for endpoint in DEVICE_ENDPOINTS
+    }
+
+
+def _check_endpoint(endpoint):
+    if endpoint not in DEVICE_ENDPOINTS:
+        raise ImproperlyConfigured(f"'{endpoint}' is not listed in DEVICE_ENDPOINTS")
+
+
+def client_ident(request):
+    """Client IP of a Django or DRF request, honouring NUM_PROXIES like DRF throttles"""
+    return BaseThrottle().get_ident(request)
+
+
+def rate_limited_response(result):
+    """429 for the function-based device views"""
+    response = JsonResponse({
+        'success': False,
+        'message': 'Too many requests',
+        'retry_after': result.retry_after,
+    }, status=429)
+    response['Retry-After'] = str(result.retry_after)
+    return response
+
+
+def device_rate_limit(endpoint):
+    """
+    Rate limit a function-based device view (sync or async) by its imei argument
+
+    A request is checked once, so a view handing over to another limited
+    view is not charged twice.
+    """
+    _check_endpoint(endpoint)
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def wrapper(request, imei, *args, **kwargs):
+                if not getattr(request, 'rate_limit_checked', False):
+                    request.rate_limit_checked = True
+                    result = await acheck_rate_limit(endpoint, imei, client_ident(request))
+                    if not result.allowed:
+                        return rate_limited_response(result)
+                return await view(request, imei, *args, **kwargs)
+        else:
+            @functools.wraps(view)
+            def wrapper(request, imei, *args, **kwargs):
+                if not getattr(request, 'rate_limit_checked', False):
+                    request.rate_limit_checked = True
+                    result = check_rate_limit(endpoint, imei, client_ident(request))
+                    if not result.allowed:
+                        return rate_limited_response(result)
+                return view(request, imei, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class DeviceRateThrottle(BaseThrottle):
+    """
+    DRF throttle for the device API views
+
+    The view declares rate_limit_endpoint (one of DEVICE_ENDPOINTS). The
+    IMEI is taken from the URL, the query string or the request body.
+    """
+
+    def allow_request(self, request, view):
+        endpoint = getattr(view, 'rate_limit_endpoint', None)
+        _check_endpoint(endpoint)
+        self.result = check_rate_limit(endpoint, self._imei(request, view), self.get_ident(request))
+        return self.result.allowed
+
+    def wait(self):
+        return self.result.retry_after
+
+    def _imei(self, request, view):
+        imei = view.kwargs.get('imei') or request.query_params.get('imei')
+        if imei is None and request.method == 'POST' and hasattr(request.data, 'get'):
+            imei = request.data.get('imei')
+        return imei
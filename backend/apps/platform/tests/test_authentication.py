@@ -0,0 +1,111 @@
+"""
+Tests for cached JWT authentication and agent claims
+"""
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from apps.platform.models import User, Agent
+from apps.platform.authentication import AgentRefreshToken, CachedJWTAuthentication, token_agent_id
+
+
+@pytest.fixture
+def agent_user(db):
+    user = User.objects.create_user(email='auth@example.com', password='pass1234', role='agent_owner')
+    Agent.objects.create(user=user, business_name='Auth Phones', nin='12345678901')
+    return user
+
+
+def authenticate(token):
+    request = APIRequestFactory().get('/api/phones/', HTTP_AUTHORIZATION=f'Bearer {token}')
+    return CachedJWTAuthentication().authenticate(request)
+
+
+@pytest.mark.django_db
+class TestAgentClaims:
+    """Access tokens carry the role and agent id"""
+
+    def test_access_token_claims(self, agent_user):
+        access = AgentRefreshToken.for_user(agent_user).access_token
+
+        assert access['role'] == 'agent_owner'
+        assert access['agent_id'] == agent_user.agent_profile.id
+
+    def test_claims_survive_refresh(self, agent_user):
+        refresh = RefreshToken(str(AgentRefreshToken.for_user(agent_user)))
+
+        assert refresh.access_token['agent_id'] == agent_user.agent_profile.id
+
+    def test_admin_has_no_agent_claim(self, db):
+        admin = User.objects.create_user(email='admin@example.com', password='pass1234', role='platform_admin')
+
+        assert AgentRefreshToken.for_user(admin).access_token['agent_id'] is None
+
+    def test_token_agent_id_reads_the_claim(self, agent_user):
+        access = AgentRefreshToken.for_user(agent_user).access_token
+        _, validated = authenticate(access)
+        request = APIRequestFactory().get('/')
+        request.auth = validated
+
+        assert token_agent_id(request) == agent_user.agent_profile.id
+
+
+@pytest.mark.django_db
+class TestCachedAuthentication:
+    """Users and their agents come from the snapshot cache"""
+
+    def test_repeat_requests_need_no_query(self, agent_user):
+        token = AgentRefreshToken.for_user(agent_user).access_token
+        authenticate(token)
+
+        with CaptureQueriesContext(connection) as queries:
+            user, _ = authenticate(token)
+            agent = user.agent_profile
+
+        assert len(queries) == 0
+        assert user.pk == agent_user.pk
+        assert user.role == 'agent_owner'
+        assert agent.business_name == 'Auth Phones'
+
+    def test_uncached_agent_fields_load_on_access(self, agent_user):
+        token = AgentRefreshToken.for_user(agent_user).access_token
+
+        user, _ = authenticate(token)
+
+        assert 'password' in user.get_deferred_fields()
+        assert user.agent_profile.nin == '12345678901'
+
+    def test_deactivated_user_is_refused(self, agent_user, django_capture_on_commit_callbacks):
+        token = AgentRefreshToken.for_user(agent_user).access_token
+        authenticate(token)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            agent_user.is_active = False
+            agent_user.save()
+
+        with pytest.raises(AuthenticationFailed):
+            authenticate(token)
+
+    def test_agent_save_refreshes_the_snapshot(self, agent_user, django_capture_on_commit_callbacks):
+        token = AgentRefreshToken.for_user(agent_user).access_token
+        authenticate(token)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            agent = Agent.objects.get(user=agent_user)
+            agent.status = 'restricted'
+            agent.save()
+
+        user, _ = authenticate(token)
+        assert user.agent_profile.status == 'restricted'
+
+    def test_user_without_agent(self, db):
+        admin = User.objects.create_user(email='admin@example.com', password='pass1234', role='platform_admin')
+
+        user, _ = authenticate(AgentRefreshToken.for_user(admin).access_token)
+
+        with pytest.raises(Agent.DoesNotExist):
+            user.agent_profile
+        assert not hasattr(user, 'agent_profile')
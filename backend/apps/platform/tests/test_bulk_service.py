@@ -0,0 +1,176 @@
+"""
+Tests for the bulk phone and installment updates
+"""
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from apps.agents.models import Customer, Phone, Sale
+from apps.agents.views import PhoneViewSet
+from apps.audit.middleware import AuditLoggingMiddleware
+from apps.audit.models import AgentAuditLog, PlatformAuditLog
+from apps.payments.models import InstallmentSchedule
+from apps.payments.views import PaymentRecordViewSet
+from apps.platform.bulk_service import MAX_BULK_IDS
+
+phone_bulk = PhoneViewSet.as_view({'patch': 'bulk'})
+installment_bulk = PaymentRecordViewSet.as_view({'patch': 'installments_bulk'})
+
+
+@pytest.fixture
+def phones(agent):
+    return [
+        Phone.objects.create(agent=agent, imei=f'35000000000020{i}', model='Galaxy A14', lifecycle_status=status)
+        for i, status in enumerate(['sold', 'sold', 'in_stock', 'returned'])
+    ]
+
+
+@pytest.fixture
+def installments(agent, phones):
+    customer = Customer.objects.create(agent=agent, full_name='Bulk', phone_number='+2348000000009', address='Lagos')
+    sale = Sale.objects.create(
+        agent=agent, customer=customer, phone=phones[0],
+        sale_price=Decimal('100000.00'), total_payable=Decimal('120000.00'),
+        balance_remaining=Decimal('120000.00')
+    )
+    return [
+        InstallmentSchedule.objects.create(
+            sale=sale, amount_due=Decimal('40000.00'), due_date=date(2026, 1, day), status=status
+        )
+        for day, status in [(1, 'pending'), (2, 'partial'), (3, 'paid')]
+    ]
+
+
+def _outcomes(response):
+    return [(row['id'], row['outcome']) for row in response.data['results']]
+
+
+@pytest.mark.django_db
+class TestPhoneBulkUpdate:
+    """PATCH /api/phones/bulk/"""
+
+    def test_lifecycle_move_with_per_id_outcomes(self, user, phones, api_request):
+        ids = [p.id for p in phones] + [999999]
+
+        response = api_request(
+            phone_bulk, user, method='patch', data={'ids': ids, 'lifecycle_status': 'in_stock'}
+        )
+
+        assert response.status_code == 200
+        assert _outcomes(response) == [
+            (phones[0].id, 'invalid_transition'), (phones[1].id, 'invalid_transition'),
+            (phones[2].id, 'unchanged'), (phones[3].id, 'updated'),
+            (999999, 'not_found'),
+        ]
+        assert response.data['results'][0]['current'] == 'sold'
+        assert response.data['counts'] == {'invalid_transition': 2, 'unchanged': 1, 'updated': 1, 'not_found': 1}
+        statuses = dict(Phone.objects.values_list('id', 'lifecycle_status'))
+        assert [statuses[p.id] for p in phones] == ['sold', 'sold', 'in_stock', 'in_stock']
+
+    @pytest.mark.parametrize('status', ['returned', 'repossessed'])
+    def test_sold_phones_are_not_moved_in_bulk(self, user, phones, status, api_request):
+        response = api_request(
+            phone_bulk, user, method='patch', data={'ids': [phones[0].id, phones[2].id], 'lifecycle_status': status}
+        )
+
+        assert _outcomes(response) == [(phones[0].id, 'invalid_transition'), (phones[2].id, 'invalid_transition')]
+        assert Phone.objects.get(id=phones[0].id).lifecycle_status == 'sold'
+
+    def test_one_update_and_one_audit_entry(self, user, agent, phones, api_request):
+        with CaptureQueriesContext(connection) as queries:
+            response = api_request(
+                phone_bulk, user, method='patch', data={'ids': [p.id for p in phones], 'locking_app_installed': True}
+            )
+
+        assert response.data['counts'] == {'updated': 4}
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "phones"')]
+        assert len(updates) == 1
+        assert Phone.objects.filter(locking_app_installed=True).count() == 4
+
+        entry = AgentAuditLog.objects.get(agent=agent)
+        assert entry.action == 'bulk_update_phone'
+        assert entry.metadata['field'] == 'locking_app_installed'
+        assert sorted(entry.metadata['updated_ids']) == sorted(p.id for p in phones)
+
+    def test_repeated_and_current_values_are_unchanged(self, user, phones, api_request):
+        response = api_request(
+            phone_bulk, user, method='patch', data={'ids': [phones[2].id, phones[2].id], 'lifecycle_status': 'in_stock'}
+        )
+
+        assert _outcomes(response) == [(phones[2].id, 'unchanged')]
+
+    def test_other_agents_phones_are_not_found(self, user2, agent2, phones, api_request):
+        response = api_request(
+            phone_bulk, user2, method='patch', data={'ids': [phones[3].id], 'lifecycle_status': 'in_stock'}
+        )
+
+        assert _outcomes(response) == [(phones[3].id, 'not_found')]
+        assert Phone.objects.get(id=phones[3].id).lifecycle_status == 'returned'
+
+    @pytest.mark.parametrize('data', [
+        {'ids': [1]},
+        {'ids': [1], 'lifecycle_status': 'in_stock', 'locking_app_installed': True},
+        {'ids': [], 'lifecycle_status': 'in_stock'},
+        {'ids': [1], 'lifecycle_status': 'lost'},
+        {'ids': [1], 'lifecycle_status': 'sold'},
+        {'ids': list(range(1, MAX_BULK_IDS + 2)), 'lifecycle_status': 'in_stock'},
+    ])
+    @pytest.mark.django_db(transaction=True)
+    def test_invalid_payloads_are_rejected(self, user, phones, data, api_request):
+        # Outside a test transaction: with ATOMIC_REQUESTS the 400 marks the
+        # enclosing atomic block for rollback
+        audit_entries = AgentAuditLog.objects.count()
+
+        assert api_request(phone_bulk, user, method='patch', data=data).status_code == 400
+        assert AgentAuditLog.objects.count() == audit_entries
+
+
+@pytest.mark.django_db
+class TestInstallmentBulkUpdate:
+    """PATCH /api/payments/installments/bulk/"""
+
+    def test_paid_installments_cannot_be_moved(self, user, installments, api_request):
+        response = api_request(
+            installment_bulk, user, method='patch', data={'ids': [i.id for i in installments], 'status': 'overdue'}
+        )
+
+        assert _outcomes(response) == [
+            (installments[0].id, 'updated'), (installments[1].id, 'updated'),
+            (installments[2].id, 'invalid_transition'),
+        ]
+        assert list(InstallmentSchedule.objects.values_list('status', flat=True)) == ['overdue', 'overdue', 'paid']
+
+    def test_only_unpaid_installments_are_rescheduled(self, user, installments, api_request):
+        api_request(
+            installment_bulk, user, method='patch', data={'ids': [i.id for i in installments[:2]], 'status': 'overdue'}
+        )
+        InstallmentSchedule.objects.filter(id=installments[1].id).update(paid_amount=Decimal('10000.00'))
+
+        response = api_request(
+            installment_bulk, user, method='patch', data={'ids': [i.id for i in installments[:2]], 'status': 'pending'}
+        )
+
+        assert _outcomes(response) == [(installments[0].id, 'updated'), (installments[1].id, 'invalid_transition')]
+        assert list(InstallmentSchedule.objects.values_list('status', flat=True)) == ['pending', 'overdue', 'paid']
+
+    def test_payment_statuses_cannot_be_set(self, user, installments, api_request):
+        assert api_request(
+            installment_bulk, user, method='patch', data={'ids': [installments[0].id], 'status': 'paid'}
+        ).status_code == 400
+
+
+@pytest.mark.django_db
+def test_middleware_skips_responses_that_were_audited(user):
+    request = RequestFactory().patch('/api/phones/bulk/', data=b'{}', content_type='application/json')
+    request.user = user
+    response = HttpResponse()
+    response.audit_logged = True
+
+    AuditLoggingMiddleware(lambda r: response).process_response(request, response)
+
+    assert not PlatformAuditLog.objects.exists()
+    assert not AgentAuditLog.objects.exists()
@@ -0,0 +1,267 @@
+"""
+Tests for the two-level cache (locmem shared cache)
+"""
+import asyncio
+import functools
+import threading
+import time
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.platform import cache_service
+from apps.platform.models import User
+from apps.platform.views import CacheStatsView
+from apps.platform.cache_service import (
+    TwoLevelCache,
+    agent_tag,
+    cache_metrics,
+    invalidate_agent
+)
+
+
+class Builder:
+    """Counts calls and returns the next value"""
+
+    def __init__(self, value='value', delay=0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return self.value
+
+
+@pytest.fixture
+def two_level():
+    return TwoLevelCache('test:two-level', ttl=60, local_ttl=30, beta=0)
+
+
+class TestGetOrSet:
+    """Test the two cache levels"""
+
+    def test_builds_once_then_serves_both_levels(self, two_level):
+        build = Builder()
+
+        assert two_level.get_or_set('a', build) == 'value'
+        assert two_level.get_or_set('a', build) == 'value'  # local
+        two_level.local.clear()
+        assert two_level.get_or_set('a', build) == 'value'  # shared
+
+        assert build.calls == 1
+        metrics = cache_metrics()['test:two-level']
+        assert metrics['misses'] == 1
+        assert metrics['local_hits'] == 1
+        assert metrics['hits'] == 1
+        assert metrics['builds'] == 1
+        assert metrics['hit_ratio'] == pytest.approx(2 / 3, abs=1e-3)
+
+    def test_none_is_cached(self, two_level):
+        build = Builder(value=None)
+
+        two_level.get_or_set('a', build)
+        two_level.local.clear()
+        assert two_level.get_or_set('a', build) is None
+
+        assert build.calls == 1
+
+    def test_refresh_replaces_the_entry(self, two_level):
+        two_level.get_or_set('a', Builder('old'))
+
+        two_level.refresh('a', Builder('new'))
+
+        assert two_level.get_or_set('a', Builder('unused')) == 'new'
+
+    def test_delete_many_drops_both_levels(self, two_level):
+        two_level.get_or_set('a', Builder('old'))
+
+        two_level.delete_many(['a'])
+
+        assert two_level.get('a') is None
+        assert two_level.get_or_set('a', Builder('new')) == 'new'
+
+    def test_async_lookup_shares_entries(self, two_level):
+        build = Builder()
+
+        assert async_to_sync(two_level.aget_or_set)('a', build) == 'value'
+        two_level.local.clear()
+        assert two_level.get_or_set('a', build) == 'value'
+
+        assert build.calls == 1
+
+    def test_async_builders_overlap(self, two_level):
+        running = []
+        overlapped = []
+
+        async def build(value):
+            running.append(value)
+            await asyncio.sleep(0.05)
+            overlapped.append(len(running) > 1)
+            running.remove(value)
+            return value
+
+        async def lookups():
+            return await asyncio.gather(*(
+                two_level.aget_or_set(key, functools.partial(build, key)) for key in ('a', 'b', 'c')
+            ))
+
+        assert async_to_sync(lookups)() == ['a', 'b', 'c']
+        assert any(overlapped)
+
+
+class TestSingleFlight:
+    """Only one caller rebuilds a missing or expiring key"""
+
+    def test_concurrent_misses_build_once(self, two_level):
+        build = Builder(delay=0.2)
+        results = []
+
+        def lookup():
+            results.append(two_level.get_or_set('hot', build))
+
+        threads = [threading.Thread(target=lookup) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert results == ['value'] * 8
+        assert build.calls == 1
+
+    def test_stale_entry_served_while_another_process_rebuilds(self):
+        two_level = TwoLevelCache('test:stale', ttl=-1, stale_ttl=60, beta=0)
+        two_level.get_or_set('a', Builder('stale'))  # already expired
+        cache.add(f"{two_level.key('a')}:lock", 1, 60)  # rebuild in progress elsewhere
+        build = Builder('fresh')
+
+        assert two_level.get_or_set('a', build) == 'stale'
+        assert build.calls == 0
+        assert cache_metrics()['test:stale']['stale_served'] == 1
+
+    def test_waits_for_another_process_instead_of_rebuilding(self, two_level):
+        lock_key = f"{two_level.key('a')}:lock"
+        cache.add(lock_key, 1, 60)
+
+        def other_process():
+            time.sleep(0.1)
+            two_level.refresh('a', Builder('rebuilt'))
+            two_level.local.clear()
+            cache.delete(lock_key)
+
+        threading.Thread(target=other_process).start()
+        build = Builder('ours')
+
+        assert two_level.get_or_set('a', build) == 'rebuilt'
+        assert build.calls == 0
+
+    def test_overrunning_rebuild_keeps_a_lock_taken_since(self, two_level):
+        lock_key = f"{two_level.key('a')}:lock"
+
+        def slow_build():
+            cache.delete(lock_key)  # our lock timed out mid-build...
+            cache.add(lock_key, 'other', 60)  # ...and another process took it
+            return 'value'
+
+        assert two_level.get_or_set('a', slow_build) == 'value'
+        assert cache.get(lock_key) == 'other'
+
+        two_level.delete_many(['a'])
+        assert async_to_sync(two_level.aget_or_set)('a', slow_build) == 'value'
+        assert cache.get(lock_key) == 'other'
+
+    def test_lock_is_released_by_its_owner_only(self):
+        token = cache_service.acquire_lock('test:lock', 60)
+
+        assert cache_service.acquire_lock('test:lock', 60) is None
+        assert not cache_service.release_lock('test:lock', token + 1)
+        assert cache_service.release_lock('test:lock', token)
+        assert cache_service.acquire_lock('test:lock', 60) is not None
+
+
+class TestEarlyExpiry:
+    """Entries are rebuilt probabilistically before they expire"""
+
+    def test_unlucky_reader_rebuilds_early(self, monkeypatch):
+        two_level = TwoLevelCache('test:early', ttl=60, beta=1000)
+        two_level.get_or_set('a', Builder('old', delay=0.01))
+
+        monkeypatch.setattr(cache_service.random, 'random', lambda: 0.999999)
+        assert two_level.get_or_set('a', Builder('new')) == 'new'
+        assert cache_metrics()['test:early']['early_rebuilds'] == 1
+
+    def test_lucky_reader_keeps_the_entry(self, monkeypatch):
+        two_level = TwoLevelCache('test:early', ttl=60, beta=1000)
+        two_level.get_or_set('a', Builder('old', delay=0.01))
+
+        monkeypatch.setattr(cache_service.random, 'random', lambda: 0.0)
+        assert two_level.get_or_set('a', Builder('new')) == 'old'
+
+
+class TestTags:
+    """Tag invalidation by agent"""
+
+    def test_invalidating_an_agent_drops_its_entries_only(self, two_level):
+        two_level.get_or_set('a', Builder('agent 1'), tags=[agent_tag(1)])
+        two_level.get_or_set('b', Builder('agent 2'), tags=[agent_tag(2)])
+
+        invalidate_agent(1)
+
+        assert two_level.get_or_set('a', Builder('rebuilt'), tags=[agent_tag(1)]) == 'rebuilt'
+        assert two_level.get_or_set('b', Builder('rebuilt'), tags=[agent_tag(2)]) == 'agent 2'
+
+    def test_invalidation_reaches_other_processes_shared_entries(self, two_level):
+        two_level.get_or_set('a', Builder('old'), tags=[agent_tag(1)])
+        # Another process: its own LRU is empty, it reads the shared entry
+        other = TwoLevelCache('test:two-level', ttl=60, beta=0)
+
+        invalidate_agent(1)
+
+        assert other.get_or_set('a', Builder('rebuilt'), tags=[agent_tag(1)]) == 'rebuilt'
+
+    def test_tags_derived_from_the_value(self, two_level):
+        def tags(value):
+            return [agent_tag(value['agent_id'])]
+
+        two_level.get_or_set('a', Builder({'agent_id': 7}), tags=tags)
+        assert two_level.get_or_set('a', Builder({'agent_id': 0}), tags=tags) == {'agent_id': 7}
+
+        invalidate_agent(7)
+        two_level.local.clear()
+
+        assert two_level.get_or_set('a', Builder({'agent_id': 8}), tags=tags) == {'agent_id': 8}
+
+    def test_value_invalidated_during_its_build_is_not_stored(self, two_level, monkeypatch):
+        def tags(value):
+            return [agent_tag(value['agent_id'])]
+
+        def build():
+            value = {'agent_id': 7, 'status': 'active'}  # Read before...
+            invalidate_agent(7)  # ...the agent is suspended
+            return value
+
+        assert two_level.get_or_set('a', build, tags=tags)['status'] == 'active'
+        assert two_level.get('a') is None
+
+        # Builds started well after the invalidation are stored again
+        now = time.time()
+        monkeypatch.setattr(cache_service.time, 'time', lambda: now + 2 * cache_service.CLOCK_SKEW)
+        two_level.get_or_set('a', Builder({'agent_id': 7, 'status': 'suspended'}), tags=tags)
+        assert two_level.get('a')['status'] == 'suspended'
+
+
+@pytest.mark.django_db
+def test_cache_stats_view_reports_metrics(two_level):
+    two_level.get_or_set('a', Builder())
+    user = User.objects.create_user(email='ops@example.com', password='pass1234', role='platform_admin')
+    request = APIRequestFactory().get('/api/ops/cache/')
+    force_authenticate(request, user=user)
+
+    response = CacheStatsView.as_view()(request)
+
+    assert response.status_code == 200
+    assert response.data['caches']['test:two-level']['misses'] == 1
@@ -0,0 +1,139 @@
+"""
+Tests for pooled database connections (DB_POOL) and pool metrics
+"""
+import threading
+import time
+import pytest
+from django.db import connection, connections
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.platform.models import User
+from apps.platform.views import DatabasePoolStatsView
+from config.db.pool import pool_stats
+
+POOLED_ALIAS = 'pooled'
+APPLICATION_NAME = 'mederpay-pool-test'
+MAX_SIZE = 4
+
+postgres_only = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Connection pooling needs PostgreSQL'
+)
+
+
+@pytest.fixture(scope='module')
+def pooled_database(django_db_setup):
+    """A database alias configured the way DB_POOL configures the default one"""
+    pytest.importorskip('psycopg_pool')
+    default = connections.settings['default']
+    connections.settings[POOLED_ALIAS] = {
+        **default,
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            **default['OPTIONS'],
+            'application_name': APPLICATION_NAME,
+            'pool': {'min_size': 1, 'max_size': MAX_SIZE, 'timeout': 10},
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    yield
+    del connections[POOLED_ALIAS]
+    del connections.settings[POOLED_ALIAS]
+
+
+@pytest.fixture
+def pooled(pooled_database):
+    yield connections[POOLED_ALIAS]
+    connections[POOLED_ALIAS].close()
+    connections[POOLED_ALIAS].close_pool()
+
+
+def server_connections():
+    """Connections the pool holds open on the server"""
+    with connections['default'].cursor() as cursor:
+        cursor.execute(
+            'SELECT count(*) FROM pg_stat_activity WHERE application_name = %s',
+            [APPLICATION_NAME]
+        )
+        return cursor.fetchone()[0]
+
+
+def run_queries(iterations):
+    pooled = connections[POOLED_ALIAS]
+    try:
+        for _ in range(iterations):
+            with pooled.cursor() as cursor:
+                cursor.execute('SELECT pg_sleep(0.01)')
+            # Hands the connection back to the pool, as the end of a request does
+            pooled.close()
+    finally:
+        connections.close_all()
+
+
+@postgres_only
+@pytest.mark.django_db(transaction=True, databases='__all__')
+class TestConnectionPool:
+    """Concurrent requests share a bounded set of connections per worker"""
+
+    def test_connection_count_stays_bounded_under_load(self, pooled):
+        threads = [threading.Thread(target=run_queries, args=(10,)) for _ in range(16)]
+        for thread in threads:
+            thread.start()
+
+        peak = 0
+        while any(thread.is_alive() for thread in threads):
+            peak = max(peak, server_connections())
+            time.sleep(0.005)
+        for thread in threads:
+            thread.join()
+
+        assert 0 < peak <= MAX_SIZE
+
+        stats = pool_stats()['pools'][POOLED_ALIAS]
+        assert stats['max_size'] == MAX_SIZE
+        assert stats['size'] <= MAX_SIZE
+        assert stats['in_use'] == 0
+        assert stats['requests'] == 160
+        # 16 threads sharing 4 connections had to wait for one
+        assert stats['requests_queued'] > 0
+        assert stats['wait_ms_total'] > 0
+        assert stats['timeouts'] == 0
+
+    def test_broken_connection_is_replaced_on_checkout(self, pooled):
+        with pooled.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            broken_pid = cursor.fetchone()[0]
+        pooled.close()
+
+        with connections['default'].cursor() as cursor:
+            cursor.execute('SELECT pg_terminate_backend(%s)', [broken_pid])
+
+        with pooled.cursor() as cursor:
+            cursor.execute('SELECT pg_backend_pid()')
+            assert cursor.fetchone()[0] != broken_pid
+        pooled.close()
+
+
+@pytest.mark.django_db
+class TestPoolStatsView:
+    """Pool metrics endpoint"""
+
+    def get_stats(self, role):
+        user = User.objects.create_user(email=f'{role}@example.com', password='pass1234', role=role)
+        request = APIRequestFactory().get('/api/ops/db-pool/')
+        force_authenticate(request, user=user)
+        return DatabasePoolStatsView.as_view()(request)
+
+    def test_platform_admin_sees_pool_stats(self):
+        response = self.get_stats('platform_admin')
+
+        assert response.status_code == 200
+        assert 'pid' in response.data
+        assert 'pools' in response.data
+
+    def test_agents_are_refused(self):
+        response = self.get_stats('agent_owner')
+
+        assert response.status_code == 403
+        assert response.data['detail'] == 'Platform admin access required'
@@ -0,0 +1,132 @@
+"""
+Tests for the streaming CSV/NDJSON exports
+"""
+import csv
+import io
+import orjson
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import connection
+from django.utils import timezone
+
+from apps.agents.models import Customer, Phone, Sale, SaleStatus
+from apps.agents.views import SaleViewSet
+from apps.payments.models import InstallmentSchedule, PaymentRecord
+from apps.payments.views import PaymentRecordViewSet
+from apps.platform.export_service import _batched
+
+sale_export = SaleViewSet.as_view({'get': 'export'})
+payment_export = PaymentRecordViewSet.as_view({'get': 'export'})
+installment_export = PaymentRecordViewSet.as_view({'get': 'installments_export'})
+
+
+@pytest.fixture
+def sales(agent):
+    """Five sales, one completed, each with a payment and an installment"""
+    result = []
+    for i in range(5):
+        customer = Customer.objects.create(
+            agent=agent, full_name=f'Customer, {i}', phone_number=f'+23480000000{i}', address='Lagos'
+        )
+        phone = Phone.objects.create(
+            agent=agent, imei=f'35000000000000{i}', model='Galaxy A14', lifecycle_status='sold'
+        )
+        sale = Sale.objects.create(
+            agent=agent, customer=customer, phone=phone,
+            sale_price=Decimal('100000.00'), down_payment=Decimal('20000.00'),
+            total_payable=Decimal('120000.00'), balance_remaining=Decimal('100000.50'),
+            status=SaleStatus.COMPLETED if i == 0 else SaleStatus.ACTIVE
+        )
+        installment = InstallmentSchedule.objects.create(
+            sale=sale, amount_due=Decimal('50000.00'),
+            due_date=date(2026, 1, 1) + timedelta(days=i), status='paid' if i == 0 else 'pending'
+        )
+        PaymentRecord.objects.create(
+            agent=agent, sale=sale, installment=installment, amount=Decimal('20000.00'),
+            payment_method='cash', balance_before=Decimal('120000.50'),
+            balance_after=Decimal('100000.50'), status='confirmed'
+        )
+        result.append(sale)
+    return result
+
+
+def _body(response):
+    return b''.join(response.streaming_content)
+
+
+@pytest.mark.django_db
+class TestExports:
+    """Export endpoints"""
+
+    def test_sales_stream_as_csv(self, user, sales, api_request):
+        response = api_request(sale_export, user)
+
+        assert response.streaming
+        assert response['Content-Type'] == 'text/csv; charset=utf-8'
+        assert response['Content-Disposition'].startswith('attachment; filename="sales-')
+        rows = list(csv.DictReader(io.StringIO(_body(response).decode())))
+        assert [int(row['id']) for row in rows] == [sale.id for sale in sales]
+        assert rows[1]['customer_name'] == 'Customer, 1'
+        assert rows[1]['imei'] == '350000000000001'
+        assert rows[1]['balance_remaining'] == '100000.50'
+        assert rows[1]['staff_name'] == ''
+
+    def test_payments_stream_as_ndjson(self, user, sales, api_request):
+        response = api_request(payment_export, user, '?output=ndjson')
+
+        assert response['Content-Type'] == 'application/x-ndjson'
+        lines = _body(response).splitlines()
+        assert len(lines) == 5
+        row = orjson.loads(lines[0])
+        assert row['sale_id'] == sales[0].id
+        assert row['amount'] == '20000.00'
+        assert row['created_at'].endswith('Z')
+
+    def test_status_and_date_filters(self, user, sales, api_request):
+        response = api_request(installment_export, user, '?from=2026-01-02&to=2026-01-03&status=pending,paid')
+
+        rows = list(csv.DictReader(io.StringIO(_body(response).decode())))
+        assert [row['due_date'] for row in rows] == ['2026-01-02', '2026-01-03']
+
+        response = api_request(sale_export, user, f'?status=completed&to={timezone.localdate()}')
+        rows = list(csv.DictReader(io.StringIO(_body(response).decode())))
+        assert [int(row['id']) for row in rows] == [sales[0].id]
+
+    def test_datetime_range_is_inclusive_of_local_days(self, user, sales, api_request):
+        tomorrow = timezone.localdate() + timedelta(days=1)
+
+        response = api_request(sale_export, user, f'?from={tomorrow}')
+
+        assert _body(response).decode().count('\n') == 1  # header only
+
+    @pytest.mark.parametrize('query', ['?from=01-02-2026', '?status=refunded', '?output=xlsx',
+                                       '?from=2026-02-01&to=2026-01-01'])
+    def test_invalid_parameters_are_rejected(self, user, sales, query, api_request):
+        response = api_request(payment_export, user, query)
+
+        assert response.status_code == 400
+
+    def test_other_agents_rows_are_not_exported(self, user, sales, api_request, user2, agent2):
+        response = api_request(sale_export, user2)
+
+        assert _body(response).decode().count('\n') == 1
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rows_are_streamed_inside_a_transaction(user, sales, settings, api_request):
+    settings.EXPORT_CHUNK_SIZE = 2
+    chunks = iter(api_request(sale_export, user).streaming_content)
+
+    next(chunks)  # Header
+    next(chunks)  # First two rows; the cursor is still open
+    assert connection.in_atomic_block
+
+    assert len(list(chunks)) == 2
+    assert not connection.in_atomic_block
+
+
+def test_first_line_is_sent_alone_then_chunks():
+    chunks = list(_batched((f'{i}\n' for i in range(6)), chunk_size=2))
+
+    assert chunks == ['0\n', '1\n2\n', '3\n4\n', '5\n']
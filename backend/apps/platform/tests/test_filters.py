@@ -0,0 +1,107 @@
+"""
+Tests for the index-checked filter backend
+"""
+import pytest
+from decimal import Decimal
+
+from apps.agents.models import Customer, Phone, Sale, SaleStatus
+from apps.agents.views import PhoneViewSet, SaleViewSet
+from apps.audit.views import AgentAuditLogViewSet, PlatformAuditLogViewSet
+from apps.enforcement.views import DeviceCommandViewSet
+from apps.payments.views import PaymentRecordViewSet
+from apps.platform.filters import IndexedFilterBackend, index_serves
+
+sale_list = SaleViewSet.as_view({'get': 'list'})
+
+
+@pytest.fixture
+def sales(agent):
+    """An active and a defaulted sale for one customer, a completed one for another"""
+    first = Customer.objects.create(agent=agent, full_name='First', phone_number='+2348000000001', address='Lagos')
+    second = Customer.objects.create(agent=agent, full_name='Second', phone_number='+2348000000002', address='Lagos')
+    result = []
+    for i, (customer, status) in enumerate([
+        (first, SaleStatus.ACTIVE), (first, SaleStatus.DEFAULTED), (second, SaleStatus.COMPLETED)
+    ]):
+        phone = Phone.objects.create(agent=agent, imei=f'35000000000010{i}', model='Galaxy A14', lifecycle_status='sold')
+        result.append(Sale.objects.create(
+            agent=agent, customer=customer, phone=phone,
+            sale_price=Decimal('100000.00'), total_payable=Decimal('120000.00'),
+            balance_remaining=Decimal('0.00'), status=status
+        ))
+    return result
+
+
+def _ids(response):
+    return sorted(row['id'] for row in response.data['results'])
+
+
+class TestIndexServes:
+    """Filter combinations against the Sale indexes"""
+
+    @pytest.mark.parametrize('equal,range_field,served', [
+        ({'status'}, None, True),
+        ({'status'}, 'created_at', True),
+        (set(), 'created_at', True),
+        ({'customer'}, None, True),
+        ({'customer'}, 'created_at', False),
+        ({'status', 'customer'}, None, False),
+    ])
+    def test_agent_scoped_combinations(self, equal, range_field, served):
+        assert index_serves(Sale, equal, range_field, scope={'agent'}) is served
+
+    def test_scope_counts_as_a_leading_column(self):
+        assert index_serves(Sale, {'status'}, scope={'agent'})
+        assert not index_serves(Sale, {'status'})
+
+    @pytest.mark.parametrize('viewset,scope', [
+        (PhoneViewSet, {'agent'}),
+        (SaleViewSet, {'agent'}),
+        (PaymentRecordViewSet, {'agent'}),
+        (DeviceCommandViewSet, {'agent'}),
+        (AgentAuditLogViewSet, {'agent'}),
+        (PlatformAuditLogViewSet, set()),
+    ])
+    def test_every_declared_filter_is_served_on_its_own(self, viewset, scope):
+        model = viewset.serializer_class.Meta.model
+        fields = IndexedFilterBackend().get_filter_fields(model, viewset())
+
+        assert fields.keys() == set(viewset.filterset_fields)
+        for name in fields:
+            assert index_serves(model, {name}, None, scope), name
+        date_field = getattr(viewset, 'filter_date_field', None)
+        if date_field:
+            assert index_serves(model, set(), date_field, scope)
+
+
+@pytest.mark.django_db
+class TestSaleFilters:
+    """Filters on the sale list"""
+
+    def test_status_filters(self, user, sales, api_request):
+        assert _ids(api_request(sale_list, user, '?status=active')) == [sales[0].id]
+        assert _ids(api_request(sale_list, user, '?status=active,completed')) == [sales[0].id, sales[2].id]
+
+    def test_foreign_key_filter(self, user, sales, api_request):
+        assert _ids(api_request(sale_list, user, f'?customer={sales[0].customer_id}')) == [sales[0].id, sales[1].id]
+
+    def test_status_with_date_range(self, user, sales, api_request):
+        today = sales[0].created_at.date()
+
+        assert _ids(api_request(sale_list, user, f'?status=defaulted&from={today}&to={today}')) == [sales[1].id]
+        assert _ids(api_request(sale_list, user, '?status=defaulted&to=2020-01-01')) == []
+
+    def test_unindexed_combination_is_rejected(self, user, sales, api_request):
+        response = api_request(sale_list, user, f'?customer={sales[0].customer_id}&from=2026-01-01')
+
+        assert response.status_code == 400
+        message = response.data['filters'][0]
+        assert 'customer + from/to' in message
+        assert 'status, from/to' in message
+
+    @pytest.mark.parametrize('query', ['?status=pending', '?customer=first', '?from=yesterday'])
+    def test_invalid_values_are_rejected(self, user, sales, query, api_request):
+        assert api_request(sale_list, user, query).status_code == 400
+
+    def test_undeclared_parameters_are_ignored(self, user, sales, api_request):
+        assert len(api_request(sale_list, user, '?balance_remaining=0').data['results']) == 3
@@ -0,0 +1,145 @@
+"""
+Tests for the gevent worker stack (config.gevent_worker, config.db.postgresql_gevent)
+
+Monkey-patching cannot be undone, so the cooperative scenarios run in a
+subprocess that boots the way a gevent gunicorn worker does.
+"""
+import json
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+
+pytest.importorskip('gevent')
+
+BACKEND_DIR = Path(__file__).resolve().parents[3]
+
+postgres_only = pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Cooperative queries need PostgreSQL'
+)
+
+WORKER_SCRIPT = textwrap.dedent('''
+    from config.gevent_worker import patch
+    patch()
+
+    import json
+    import sys
+    import time
+    import django
+    from django.conf import settings
+
+    database, max_connections, greenlets = json.loads(sys.argv[1])
+    settings.configure(
+        DATABASES={'default': {**database, 'ENGINE': 'config.db.postgresql_gevent'}},
+        GEVENT_DB_MAX_CONNECTIONS=max_connections,
+        GEVENT_DB_CONNECT_TIMEOUT=10,
+        INSTALLED_APPS=[],
+    )
+    django.setup()
+
+    import gevent
+    from django.db import connection
+
+    state = {'in_flight': 0, 'peak': 0}
+
+    def query():
+        try:
+            cursor = connection.cursor()
+            state['in_flight'] += 1
+            state['peak'] = max(state['peak'], state['in_flight'])
+            cursor.execute('SELECT pg_sleep(0.5)')
+            state['in_flight'] -= 1
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    gevent.joinall([gevent.spawn(query) for _ in range(greenlets)], raise_error=True)
+    print(json.dumps({'peak': state['peak'], 'elapsed': time.perf_counter() - start}))
+''')
+
+BLOCKING_SCRIPT = textwrap.dedent('''
+    from config.gevent_worker import patch, watch_blocking
+    patch()
+
+    import gevent
+    from gevent import monkey
+
+    blocked = []
+    watch_blocking(blocked.append, max_blocking_time=0.1)
+
+    def cooperative():
+        gevent.sleep(0.5)
+
+    def blocking():
+        monkey.get_original('time', 'sleep')(0.5)
+
+    gevent.joinall([gevent.spawn(cooperative)])
+    print('cooperative', len(blocked))
+    gevent.joinall([gevent.spawn(blocking)])
+    gevent.sleep(0.5)
+    print('blocking', len(blocked))
+''')
+
+
+def run_script(script, *args):
+    result = subprocess.run(
+        [sys.executable, '-c', script, *args],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    return result
+
+
+def run_worker(max_connections, greenlets):
+    database = {
+        key: connection.settings_dict[key]
+        for key in ['NAME', 'USER', 'PASSWORD', 'HOST', 'PORT']
+    }
+    result = run_script(WORKER_SCRIPT, json.dumps([database, max_connections, greenlets]))
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+@postgres_only
+@pytest.mark.django_db
+class TestCooperativeQueries:
+    """Queries from one worker process overlap instead of queueing on the hub"""
+
+    def test_queries_are_in_flight_concurrently(self):
+        result = run_worker(max_connections=10, greenlets=5)
+
+        assert result['peak'] == 5
+        # Five 0.5s queries overlap instead of taking 2.5s back to back
+        assert result['elapsed'] < 1.5
+
+    def test_connections_are_capped_per_worker(self):
+        result = run_worker(max_connections=2, greenlets=6)
+
+        assert result['peak'] == 2
+        # Three rounds of two concurrent queries
+        assert result['elapsed'] >= 1.5
+
+
+@postgres_only
+def test_backend_refuses_to_connect_without_cooperative_psycopg():
+    from config.db.postgresql_gevent.base import DatabaseWrapper
+
+    wrapper = DatabaseWrapper(
+        {**connection.settings_dict, 'ENGINE': 'config.db.postgresql_gevent'}
+    )
+    with pytest.raises(ImproperlyConfigured):
+        wrapper.connect()
+
+
+def test_blocking_greenlet_is_reported():
+    result = run_script(BLOCKING_SCRIPT)
+
+    assert 'cooperative 0' in result.stdout
+    assert 'blocking 0' not in result.stdout
+    assert 'gevent hub blocked' in result.stderr
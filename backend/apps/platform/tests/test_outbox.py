@@ -0,0 +1,174 @@
+"""
+Tests for the transactional outbox and its relay
+"""
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.db import transaction
+from django.utils import timezone
+
+from apps.platform import outbox_service
+from apps.platform.models import OutboxEvent
+from apps.platform.outbox_consumers import event_counts
+from apps.platform.outbox_service import (
+    consumer, prune_processed_events, publish, relay_batch, relay_pending
+)
+
+
+class Recorder:
+    """Consumer that records the batches it receives and fails on request"""
+
+    def __init__(self, fail_on=()):
+        self.batches = []
+        self.fail_on = set(fail_on)
+
+    def __call__(self, events):
+        self.batches.append([event.payload['n'] for event in events])
+        if self.fail_on & {event.payload['n'] for event in events}:
+            raise RuntimeError('consumer failed')
+
+
+@pytest.fixture
+def register(monkeypatch):
+    """Register consumers for 'test.event' for the duration of a test"""
+    outbox_service.load_consumers()
+    registered = {event_type: list(handlers) for event_type, handlers in outbox_service._consumers.items()}
+    monkeypatch.setattr(outbox_service, '_consumers', outbox_service.defaultdict(list, registered))
+
+    def register(handler):
+        consumer('test.event')(handler)
+        return handler
+    return register
+
+
+def publish_events(count):
+    with transaction.atomic():
+        return [publish('test.event', {'n': n}, agent_id=1) for n in range(count)]
+
+
+@pytest.mark.django_db
+class TestPublish:
+    """Events share the fate of the transaction that published them"""
+
+    def test_event_is_stored_with_its_aggregate(self):
+        user_event = publish('test.event', {'n': 1}, agent_id=7, aggregate=OutboxEvent(pk=3))
+
+        event = OutboxEvent.objects.get(pk=user_event.pk)
+        assert event.status == 'pending'
+        assert (event.agent_id, event.aggregate_type, event.aggregate_id) == (7, 'OutboxEvent', 3)
+
+    def test_rolled_back_transaction_discards_the_event(self):
+        with pytest.raises(RuntimeError):
+            with transaction.atomic():
+                publish('test.event', {'n': 1})
+                raise RuntimeError('change failed')
+
+        assert not OutboxEvent.objects.exists()
+
+
+@pytest.mark.django_db
+class TestRelay:
+    """Batched, at-least-once delivery"""
+
+    def test_consumers_receive_events_in_one_batch(self, register):
+        recorder = register(Recorder())
+        publish_events(5)
+
+        result = relay_batch()
+
+        assert recorder.batches == [[0, 1, 2, 3, 4]]
+        assert result.processed == 5
+        assert not OutboxEvent.objects.exclude(status='processed').exists()
+        assert relay_batch().total == 0
+
+    def test_batch_size_limits_each_relay(self, register):
+        recorder = register(Recorder())
+        publish_events(5)
+
+        result = relay_pending(batch_size=2)
+
+        assert recorder.batches == [[0, 1], [2, 3], [4]]
+        assert result.processed == 5
+
+    def test_failing_event_is_retried_without_holding_back_the_batch(self, register):
+        register(Recorder(fail_on={2}))
+        publish_events(4)
+
+        result = relay_batch()
+
+        assert (result.processed, result.retried) == (3, 1)
+        failed = OutboxEvent.objects.get(status='pending')
+        assert failed.payload['n'] == 2
+        assert failed.attempts == 1
+        assert 'consumer failed' in failed.last_error
+        assert failed.available_at > timezone.now()
+
+    def test_every_consumer_sees_a_retried_event_again(self, register):
+        healthy = register(Recorder())
+        register(Recorder(fail_on={0}))
+        publish_events(1)
+
+        relay_batch()
+        OutboxEvent.objects.update(available_at=timezone.now())
+        relay_batch()
+
+        assert healthy.batches == [[0], [0]]
+
+    def test_event_is_parked_after_max_attempts(self, register, settings):
+        settings.OUTBOX_MAX_ATTEMPTS = 2
+        register(Recorder(fail_on={0}))
+        publish_events(1)
+
+        relay_batch()
+        OutboxEvent.objects.update(available_at=timezone.now())
+        result = relay_batch()
+
+        assert result.failed == 1
+        assert OutboxEvent.objects.get().status == 'failed'
+
+    def test_relayed_events_are_counted(self, register):
+        publish_events(3)
+
+        relay_batch()
+
+        assert event_counts()['test.event'] == 3
+
+    def test_relay_command_once(self, register, capsys):
+        register(Recorder())
+        publish_events(2)
+
+        call_command('relay_outbox', '--once')
+
+        assert 'Relayed 2 events' in capsys.readouterr().out
+
+
+@pytest.mark.django_db
+class TestPrune:
+    """Processed events are deleted after the retention period"""
+
+    @pytest.fixture
+    def events(self, register):
+        events = publish_events(6)
+        relay_batch()
+        old = timezone.now() - timedelta(days=8)
+        OutboxEvent.objects.filter(id__in=[e.id for e in events[:4]]).update(processed_at=old)
+        # Old but never processed: kept whatever their age
+        OutboxEvent.objects.filter(id=events[0].id).update(status='failed')
+        OutboxEvent.objects.filter(id=events[1].id).update(status='pending')
+        return events
+
+    def test_deletes_old_processed_events_only(self, events):
+        assert prune_processed_events(chunk_size=1) == 2
+
+        assert set(OutboxEvent.objects.values_list('id', flat=True)) == {
+            events[0].id, events[1].id, events[4].id, events[5].id
+        }
+
+    def test_prune_command(self, events, capsys):
+        call_command('prune_outbox', '--dry-run')
+        assert OutboxEvent.objects.count() == 6
+
+        call_command('prune_outbox')
+
+        assert 'Deleted 2 processed events' in capsys.readouterr().out
+        assert OutboxEvent.objects.count() == 4
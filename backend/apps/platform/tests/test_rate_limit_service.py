@@ -0,0 +1,210 @@
+"""
+Tests for the per-IMEI and per-IP device rate limits
+"""
+import asyncio
+import os
+import time
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import AsyncRequestFactory, RequestFactory
+from rest_framework.test import APIRequestFactory
+
+from apps.enforcement import async_views
+from apps.enforcement.views import EnforcementStatusView
+from apps.payments.monnify_views import get_weekly_settlement
+from apps.platform import rate_limit_service
+from apps.platform.rate_limit_service import (
+    acheck_rate_limit, check_rate_limit, client_ident, device_buckets, device_rate_limit, rejected_counts
+)
+
+IMEI = '350000000000701'
+
+
+@pytest.fixture(autouse=True)
+def small_buckets(settings):
+    settings.DEVICE_RATE_LIMIT_IMEI_RATE = 1
+    settings.DEVICE_RATE_LIMIT_IMEI_BURST = 3
+    settings.DEVICE_RATE_LIMIT_IP_RATE = 1
+    settings.DEVICE_RATE_LIMIT_IP_BURST = 5
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Frozen time.time() for the locally evaluated buckets"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(rate_limit_service.time, 'time', lambda: now[0])
+    return now
+
+
+def _take(n, imei=IMEI, ip='10.0.0.1', endpoint='enforcement-status'):
+    return [check_rate_limit(endpoint, imei, ip) for _ in range(n)]
+
+
+class TestTokenBuckets:
+    """check_rate_limit() on the local cache"""
+
+    def test_burst_then_rejected_until_refilled(self, clock):
+        results = _take(4)
+
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert results[-1].scope == 'imei'
+        assert results[-1].retry_after == 1
+
+        clock[0] += 1
+        assert _take(1)[0].allowed
+        assert not _take(1)[0].allowed
+
+    def test_rejection_does_not_charge_the_other_bucket(self, clock):
+        _take(10)  # 3 allowed, 7 rejected by the IMEI bucket
+
+        # The IP bucket was only charged for the 3 allowed requests
+        results = _take(3, imei='350000000000702')
+        assert [r.allowed for r in results] == [True, True, False]
+        assert results[-1].scope == 'ip'
+
+    def test_rotating_imeis_hit_the_ip_bucket(self, clock):
+        results = [check_rate_limit('enforcement-status', f'35000000000080{i}', '10.0.0.2') for i in range(6)]
+
+        assert [r.allowed for r in results] == [True] * 5 + [False]
+        assert results[-1].scope == 'ip'
+
+    def test_malformed_imeis_are_limited_by_ip_only(self):
+        assert [b.scope for b in device_buckets('../../etc', '10.0.0.3')] == ['ip']
+        assert [b.scope for b in device_buckets(IMEI, None)] == ['imei']
+
+    def test_rejections_are_counted_by_endpoint_and_bucket(self, clock):
+        _take(5)
+        _take(1, endpoint='device-sync')
+
+        counts = rejected_counts()
+        assert counts['enforcement-status'] == {'imei': 2, 'ip': 0}
+        assert counts['device-sync'] == {'imei': 1, 'ip': 0}
+        assert counts['health-check'] == {'imei': 0, 'ip': 0}
+
+    def test_zero_rate_disables_limiting(self, settings):
+        settings.DEVICE_RATE_LIMIT_IMEI_RATE = settings.DEVICE_RATE_LIMIT_IP_RATE = 0
+
+        assert all(r.allowed for r in _take(20))
+
+    def test_unknown_endpoints_are_rejected(self):
+        with pytest.raises(ImproperlyConfigured):
+            device_rate_limit('unknown')
+
+
+@pytest.mark.django_db
+class TestRateLimitedViews:
+    """429 responses from the device views"""
+
+    def test_drf_view_returns_retry_after(self, clock):
+        view = EnforcementStatusView.as_view()
+        responses = [
+            view(APIRequestFactory().get(f'/api/enforcement/status/{IMEI}/'), imei=IMEI)
+            for _ in range(4)
+        ]
+
+        assert [r.status_code for r in responses] == [404, 404, 404, 429]
+        assert responses[-1]['Retry-After'] == '1'
+
+    def test_function_view_returns_retry_after(self, clock):
+        responses = [
+            get_weekly_settlement(RequestFactory().get(f'/api/settlements/weekly/{IMEI}/'), IMEI)
+            for _ in range(4)
+        ]
+
+        assert [r.status_code for r in responses] == [404, 404, 404, 429]
+        assert responses[-1]['Retry-After'] == '1'
+
+    def test_async_view_is_limited(self, clock):
+        statuses = [
+            async_to_sync(async_views.enforcement_status)(
+                AsyncRequestFactory().get(f'/api/enforcement/status/{IMEI}/'), IMEI
+            ).status_code
+            for _ in range(4)
+        ]
+
+        assert statuses == [404, 404, 404, 429]
+
+    def test_forged_forwarded_for_does_not_reset_the_ip_bucket(self, clock):
+        statuses = [
+            get_weekly_settlement(RequestFactory().get(
+                '/', HTTP_X_FORWARDED_FOR=f'10.9.9.{i}', REMOTE_ADDR='10.0.0.1'
+            ), f'35000000000080{i}').status_code
+            for i in range(6)
+        ]
+
+        assert statuses == [404] * 5 + [429]
+
+    def test_forwarded_for_is_read_behind_a_proxy(self, clock, settings):
+        settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK, 'NUM_PROXIES': 1}
+        request = RequestFactory().get('/', HTTP_X_FORWARDED_FOR='10.9.9.9, 10.1.1.1', REMOTE_ADDR='10.0.0.1')
+
+        assert client_ident(request) == '10.1.1.1'
+
+    def test_concurrent_async_checks_are_not_serialized(self, monkeypatch):
+        running = []
+        overlapped = []
+        take_locally = rate_limit_service._take_locally
+
+        def slow_take(buckets, counter_keys):
+            running.append(1)
+            time.sleep(0.05)
+            overlapped.append(len(running) > 1)
+            running.pop()
+            return take_locally(buckets, counter_keys)
+
+        monkeypatch.setattr(rate_limit_service, '_take_locally', slow_take)
+
+        async def checks():
+            return await asyncio.gather(*(
+                acheck_rate_limit('enforcement-status', f'35000000000090{i}', f'10.0.1.{i}') for i in range(4)
+            ))
+
+        assert all(result.allowed for result in async_to_sync(checks)())
+        assert any(overlapped)
+
+    def test_a_request_is_only_charged_once(self, clock):
+        limited = device_rate_limit('reserved-account')(
+            device_rate_limit('reserved-account')(lambda request, imei: 'ok')
+        )
+        request = RequestFactory().get('/')
+
+        for _ in range(3):
+            request.rate_limit_checked = False
+            assert limited(request, IMEI) == 'ok'
+
+
+@pytest.mark.skipif(
+    not os.environ.get('TEST_REDIS_URL'),
+    reason='Set TEST_REDIS_URL to run the Lua script against Redis'
+)
+class TestRedisScript:
+    """The token bucket script on a real Redis server"""
+
+    @pytest.fixture(autouse=True)
+    def redis_cache(self, settings):
+        pytest.importorskip('redis')
+        settings.CACHES = {'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['TEST_REDIS_URL'],
+            'KEY_PREFIX': 'test-rate-limits',
+        }}
+        cache.clear()
+        yield
+        cache.clear()
+
+    def test_burst_then_rejected(self):
+        results = _take(4)
+
+        assert [r.allowed for r in results] == [True, True, True, False]
+        assert results[-1].scope == 'imei'
+        assert results[-1].retry_after == 1
+        assert rejected_counts()['enforcement-status'] == {'imei': 1, 'ip': 0}
+
+    def test_rejection_does_not_charge_the_other_bucket(self):
+        _take(10)
+
+        results = _take(3, imei='350000000000702')
+        assert [r.allowed for r in results] == [True, True, False]
+        assert results[-1].scope == 'ip'
@@ -0,0 +1,88 @@
+"""
+Tests for the orjson renderer and parser
+"""
+import io
+import json
+import uuid
+import pytest
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from django.core.management import call_command
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from apps.platform.parsers import ORJSONParser
+from apps.platform.renderers import ORJSONRenderer
+from apps.platform.management.commands.benchmark_json_renderers import build_payloads
+
+
+def render(data, **kwargs):
+    return ORJSONRenderer().render(data, **kwargs)
+
+
+class TestORJSONRenderer:
+    """Output matches DRF's JSONRenderer, except Decimals stay strings"""
+
+    @pytest.mark.parametrize('name', [
+        'payments', 'installments', 'sales', 'phones', 'customers'
+    ])
+    def test_serializer_payloads_match_drf(self, name):
+        data = build_payloads(5)[name]
+
+        assert json.loads(render(data)) == json.loads(JSONRenderer().render(data))
+
+    def test_decimals_are_strings(self):
+        assert render({'amount': Decimal('17500.10')}) == b'{"amount":"17500.10"}'
+
+    def test_types_follow_drf(self):
+        data = {
+            'at': datetime(2026, 1, 5, 9, 30, tzinfo=dt_timezone.utc),
+            'on': date(2026, 1, 5),
+            'after': timedelta(minutes=1),
+            'id': uuid.UUID(int=1),
+            'label': gettext_lazy('Pending'),
+            3: 'int key',
+        }
+
+        assert json.loads(render(data)) == {
+            'at': '2026-01-05T09:30:00Z',
+            'on': '2026-01-05',
+            'after': '60.0',
+            'id': '00000000-0000-0000-0000-000000000001',
+            'label': 'Pending',
+            '3': 'int key',
+        }
+
+    def test_none_renders_empty_body(self):
+        assert render(None) == b''
+
+    def test_requested_indent(self):
+        assert render({'a': 1}, accepted_media_type='application/json; indent=4') == b'{\n  "a": 1\n}'
+
+    def test_line_separators_are_escaped(self):
+        assert render({'note': 'a\u2028b'}) == b'{"note":"a\\u2028b"}'
+
+    def test_unknown_types_raise(self):
+        with pytest.raises(TypeError):
+            render({'value': object()})
+
+
+class TestORJSONParser:
+    """Parses what DRF's JSONParser parses"""
+
+    def test_parses_like_drf(self):
+        body = '{"amount": "10.50", "count": 3, "name": "Adé"}'.encode()
+
+        assert ORJSONParser().parse(io.BytesIO(body)) == JSONParser().parse(io.BytesIO(body))
+
+    def test_invalid_json_is_a_parse_error(self):
+        with pytest.raises(ParseError):
+            ORJSONParser().parse(io.BytesIO(b'{"amount": '))
+
+
+def test_benchmark_command_runs(capsys):
+    call_command('benchmark_json_renderers', '--page-size', '2', '--iterations', '1')
+
+    assert 'Summary:' in capsys.readouterr().out
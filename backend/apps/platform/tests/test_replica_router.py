@@ -0,0 +1,188 @@
+"""
+Tests for read-replica routing (config.db.routers)
+
+The replica is a second local SQLite database with the same tables but
+its own rows, so every read shows which database served it.
+"""
+import pytest
+from django.apps import apps
+from django.db import connections, transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.platform.models import User, Agent, PlatformPhoneRegistry
+from apps.audit.models import AgentAuditLog
+from apps.audit.views import AgentAuditLogViewSet
+from apps.agents.models import Phone
+from config.db.routers import REPLICA_DB_ALIAS, replica_reads, set_read_agent, use_replica
+
+IMEI = '356938035643809'
+
+
+@pytest.fixture(scope='module')
+def replica_database(tmp_path_factory, django_db_setup, django_db_blocker):
+    """A 'replica' database alias backed by a separate, empty SQLite file"""
+    connections.settings[REPLICA_DB_ALIAS] = {
+        **connections.settings['default'],
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(tmp_path_factory.mktemp('replica') / 'replica.sqlite3'),
+        'TEST': {'MIRROR': None},
+    }
+    with django_db_blocker.unblock():
+        with connections[REPLICA_DB_ALIAS].schema_editor() as editor:
+            for model in apps.get_models():
+                editor.create_model(model)
+    yield connections[REPLICA_DB_ALIAS]
+
+    connections[REPLICA_DB_ALIAS].close()
+    del connections[REPLICA_DB_ALIAS]
+    del connections.settings[REPLICA_DB_ALIAS]
+
+
+@pytest.fixture
+def replica(replica_database):
+    yield replica_database
+    # The test flush skips the replica (the router keeps it out of migrations)
+    with replica_database.constraint_checks_disabled(), replica_database.cursor() as cursor:
+        for table in replica_database.introspection.table_names(cursor):
+            cursor.execute(f'DELETE FROM "{table}"')
+
+
+def create_agent(email, business_name):
+    """Agent on the primary, replicated to the replica"""
+    user = User.objects.create_user(email=email, password='pass1234')
+    agent = Agent.objects.create(user=user, business_name=business_name)
+    User.objects.using(REPLICA_DB_ALIAS).bulk_create([user])
+    Agent.objects.using(REPLICA_DB_ALIAS).bulk_create([agent])
+    return agent
+
+
+@pytest.fixture
+def agent(replica):
+    return create_agent('replica@example.com', 'Replica Phones')
+
+
+def replica_phone(agent, model):
+    """Phone row present only on the replica"""
+    registry = PlatformPhoneRegistry.objects.using(REPLICA_DB_ALIAS).bulk_create([
+        PlatformPhoneRegistry(imei=IMEI)
+    ])[0]
+    Phone.objects.using(REPLICA_DB_ALIAS).bulk_create([
+        Phone(
+            agent_id=agent.id,
+            imei=IMEI,
+            model=model,
+            lifecycle_status='in_stock',
+            platform_registry_id=registry.id
+        )
+    ])
+
+
+def list_audit_logs(agent):
+    request = APIRequestFactory().get('/api/audit/agent-logs/')
+    force_authenticate(request, user=agent.user)
+    return AgentAuditLogViewSet.as_view({'get': 'list'})(request)
+
+
+def phone_model():
+    return Phone.objects.filter(imei=IMEI).values_list('model', flat=True).first()
+
+
+# Transactional: inside a test transaction every read would stay on the primary
+@pytest.mark.django_db(transaction=True, databases='__all__')
+class TestReplicaRouting:
+    """Reads go to the replica only inside replica scopes"""
+
+    def test_reads_outside_a_scope_use_the_primary(self, replica, agent):
+        replica_phone(agent, 'On Replica')
+
+        assert phone_model() is None
+
+    def test_reads_inside_a_scope_use_the_replica(self, replica, agent):
+        replica_phone(agent, 'On Replica')
+
+        with replica_reads():
+            assert phone_model() == 'On Replica'
+
+    def test_jobs_read_from_the_replica(self, replica, agent):
+        replica_phone(agent, 'On Replica')
+
+        assert use_replica(phone_model)() == 'On Replica'
+
+    def test_scope_reads_from_the_primary_after_writing(self, replica, agent):
+        replica_phone(agent, 'On Replica')
+
+        with replica_reads():
+            assert phone_model() == 'On Replica'
+            Phone.objects.create(agent=agent, imei=IMEI, model='On Primary', lifecycle_status='in_stock')
+            assert phone_model() == 'On Primary'
+
+    def test_reads_in_a_transaction_use_the_primary(self, replica, agent):
+        replica_phone(agent, 'On Replica')
+
+        with replica_reads(), transaction.atomic():
+            assert phone_model() is None
+
+    def test_writes_always_go_to_the_primary(self, replica, agent):
+        with replica_reads():
+            Phone.objects.create(agent=agent, imei=IMEI, model='Written', lifecycle_status='in_stock')
+
+        assert Phone.objects.using('default').filter(imei=IMEI).exists()
+        assert not Phone.objects.using(REPLICA_DB_ALIAS).filter(imei=IMEI).exists()
+
+
+# Transactional: inside a test transaction every read would stay on the primary
+@pytest.mark.django_db(transaction=True, databases='__all__')
+class TestAgentPinning:
+    """An agent's writes pin their reads to the primary"""
+
+    def test_write_pins_the_agent_in_later_scopes(self, replica, agent):
+        replica_phone(agent, 'Stale')
+        Phone.objects.create(agent=agent, imei=IMEI, model='Fresh', lifecycle_status='in_stock')
+
+        with replica_reads(agent_id=agent.id):
+            assert phone_model() == 'Fresh'
+
+    def test_other_agents_still_read_from_the_replica(self, replica, agent):
+        other = create_agent('other@example.com', 'Other Phones')
+        replica_phone(agent, 'Stale')
+        Phone.objects.create(agent=other, imei='490154203237518', model='Fresh', lifecycle_status='in_stock')
+
+        with replica_reads():
+            set_read_agent(agent.id)
+            assert phone_model() == 'Stale'
+
+    def test_pin_expires(self, replica, agent, settings):
+        settings.DB_REPLICA_PIN_SECONDS = 0
+        replica_phone(agent, 'On Replica')
+        Phone.objects.create(agent=agent, imei='490154203237518', model='Other', lifecycle_status='in_stock')
+
+        with replica_reads(agent_id=agent.id):
+            assert phone_model() == 'On Replica'
+
+    def test_audit_log_listing_shows_the_agents_own_write(self, replica, agent, settings):
+        AgentAuditLog.objects.create(
+            agent=agent, action='sale_created', entity_type='Sale', entity_id=1
+        )
+
+        response = list_audit_logs(agent)
+
+        assert response.status_code == 200
+        assert response.data['count'] == 1
+
+    def test_audit_log_listing_reads_the_replica_once_unpinned(self, replica, agent, settings):
+        settings.DB_REPLICA_PIN_SECONDS = 0
+        AgentAuditLog.objects.create(
+            agent=agent, action='sale_created', entity_type='Sale', entity_id=1
+        )
+
+        response = list_audit_logs(agent)
+
+        assert response.status_code == 200
+        assert response.data['count'] == 0
+
+
+def test_router_is_inactive_without_a_replica(db, monkeypatch):
+    monkeypatch.delitem(connections.settings, REPLICA_DB_ALIAS, raising=False)
+
+    with replica_reads():
+        assert Phone.objects.all().db == 'default'
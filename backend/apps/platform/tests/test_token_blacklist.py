@@ -0,0 +1,131 @@
+"""
+Tests for cached refresh-token blacklist checks and blacklist compaction
+"""
+import pytest
+from datetime import timedelta
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.views import TokenRefreshView
+
+from apps.platform.models import User
+from apps.platform.authentication import AgentRefreshToken
+from apps.platform.token_service import compact_expired_tokens
+from apps.platform.views import LogoutView
+
+
+@pytest.fixture
+def user(db):
+    return User.objects.create_user(email='tokens@example.com', password='pass1234', role='agent_owner')
+
+
+def refresh(token):
+    request = APIRequestFactory().post('/api/auth/refresh/', {'refresh': str(token)}, format='json')
+    return TokenRefreshView.as_view()(request)
+
+
+def blacklist_queries(queries):
+    return [q for q in queries.captured_queries if 'blacklistedtoken' in q['sql']]
+
+
+@pytest.mark.django_db
+class TestRefreshRotation:
+    """Refresh rotates and blacklists tokens, checked through the cache"""
+
+    def test_rotated_token_cannot_be_reused(self, user, django_capture_on_commit_callbacks):
+        token = AgentRefreshToken.for_user(user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = refresh(token)
+        assert response.status_code == 200
+        assert response.data['refresh'] != str(token)
+        assert BlacklistedToken.objects.filter(token__jti=token['jti']).exists()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = refresh(token)
+
+        assert response.status_code == 401
+        assert blacklist_queries(queries) == []
+
+    def test_rotated_access_token_keeps_agent_claims(self, user):
+        response = refresh(AgentRefreshToken.for_user(user))
+
+        assert AgentRefreshToken(response.data['refresh'])['role'] == 'agent_owner'
+
+    def test_membership_is_cached_until_blacklisted(self, user, django_capture_on_commit_callbacks):
+        token = AgentRefreshToken.for_user(user)
+        token.check_blacklist()
+
+        with CaptureQueriesContext(connection) as queries:
+            token.check_blacklist()
+        assert blacklist_queries(queries) == []
+
+        with django_capture_on_commit_callbacks(execute=True):
+            token.blacklist()
+        with pytest.raises(TokenError):
+            AgentRefreshToken(str(token))
+
+    def test_blacklisting_outside_the_token_class_is_seen(self, user, django_capture_on_commit_callbacks):
+        token = AgentRefreshToken.for_user(user)
+        token.check_blacklist()  # Caches "not blacklisted"
+
+        # As the simplejwt admin or a shell would
+        with django_capture_on_commit_callbacks(execute=True):
+            BlacklistedToken.objects.create(token=OutstandingToken.objects.get(jti=token['jti']))
+
+        with pytest.raises(TokenError):
+            token.check_blacklist()
+
+    def test_logout_blacklists_the_token(self, user, django_capture_on_commit_callbacks):
+        token = AgentRefreshToken.for_user(user)
+        request = APIRequestFactory().post('/api/auth/logout/', {'refresh_token': str(token)}, format='json')
+        force_authenticate(request, user=user)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert LogoutView.as_view()(request).status_code == 200
+
+        assert refresh(token).status_code == 401
+
+
+def outstanding(user, jti, expires_in, blacklisted=False):
+    now = timezone.now()
+    token = OutstandingToken.objects.create(
+        user=user, jti=jti, token=jti, created_at=now, expires_at=now + expires_in
+    )
+    if blacklisted:
+        BlacklistedToken.objects.create(token=token)
+    return token
+
+
+@pytest.mark.django_db
+class TestCompaction:
+    """Expired tokens are deleted in chunks"""
+
+    @pytest.fixture
+    def tokens(self, user):
+        for i in range(5):
+            outstanding(user, f'expired-{i}', timedelta(days=-1), blacklisted=i % 2 == 0)
+        outstanding(user, 'live-blacklisted', timedelta(days=1), blacklisted=True)
+        outstanding(user, 'live', timedelta(days=1))
+
+    def test_deletes_expired_tokens_only(self, tokens):
+        assert compact_expired_tokens(chunk_size=2) == (5, 3)
+
+        assert set(OutstandingToken.objects.values_list('jti', flat=True)) == {'live', 'live-blacklisted'}
+        assert BlacklistedToken.objects.count() == 1
+
+    def test_dry_run_deletes_nothing(self, tokens, capsys):
+        call_command('compact_token_blacklist', '--dry-run')
+
+        assert 'Expired outstanding tokens: 5' in capsys.readouterr().out
+        assert OutstandingToken.objects.count() == 7
+
+    def test_command_compacts(self, tokens, capsys):
+        call_command('compact_token_blacklist', '--chunk-size', '2')
+
+        assert 'Deleted 5 expired tokens' in capsys.readouterr().out
+        assert OutstandingToken.objects.count() == 2
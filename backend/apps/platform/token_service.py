@@ -0,0 +1,104 @@
+"""
+Refresh Token Service
+Fast blacklist checks and compaction of the simplejwt token tables
+
+With ROTATE_REFRESH_TOKENS and BLACKLIST_AFTER_ROTATION every refresh adds
+an OutstandingToken and a BlacklistedToken row. Blacklist membership is
+answered from the shared cache (one key per jti, kept until the token
+expires). Every saved BlacklistedToken (refresh rotation, logout, the
+admin, a shell) updates its key through a post_save receiver, and compact_expired_tokens() deletes rows of expired tokens in
+chunks; schedule it with the compact_token_blacklist command.
+"""
+import logging
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+logger = logging.getLogger(__name__)
+
+
+def _blacklist_key(jti):
+    return f"jwt:blacklisted:{jti}"
+
+
+def _seconds_until(exp):
+    return max(1, int(exp - time.time()))
+
+
+def is_blacklisted(jti, exp):
+    """
+    Whether the refresh token with this jti is blacklisted
+
+    The answer is cached until the token expires. A cached "no" is only
+    added if no "yes" was stored meanwhile, so a concurrent blacklisting
+    is never overwritten.
+
+    Args:
+        jti: Token id (jti claim)
+        exp: Token expiry (exp claim, epoch seconds)
+    """
+    key = _blacklist_key(jti)
+    blacklisted = cache.get(key)
+    if blacklisted is None:
+        blacklisted = BlacklistedToken.objects.filter(token__jti=jti).exists()
+        cache.add(key, blacklisted, _seconds_until(exp))
+    return blacklisted
+
+
+def mark_blacklisted(jti, exp):
+    """Record a blacklisted jti in the cache once the current transaction commits"""
+    transaction.on_commit(lambda: cache.set(_blacklist_key(jti), True, _seconds_until(exp)))
+
+
+@receiver(post_save, sender=BlacklistedToken, dispatch_uid='token_service.blacklisted_token_saved')
+def blacklisted_token_saved(sender, instance, **kwargs):
+    """Replace a cached "not blacklisted" for the token, however it was blacklisted"""
+    token = instance.token
+    mark_blacklisted(token.jti, token.expires_at.timestamp())
+
+
+def compact_expired_tokens(chunk_size=None, before=None):
+    """
+    Delete outstanding and blacklisted tokens that have expired
+
+    Rows are deleted oldest first, chunk_size tokens per transaction, so
+    the job never holds long locks on the tables refreshes write to.
+    Tokens expire in roughly id order, so each chunk is found at the
+    start of the primary key index.
+
+    Args:
+        chunk_size: Tokens per chunk (defaults to TOKEN_COMPACTION_CHUNK_SIZE)
+        before: Delete tokens that expired before this time (defaults to now)
+
+    Returns:
+        Tuple of (outstanding tokens deleted, blacklisted tokens deleted)
+    """
+    chunk_size = chunk_size or settings.TOKEN_COMPACTION_CHUNK_SIZE
+    before = before or timezone.now()
+    outstanding_deleted = blacklisted_deleted = 0
+
+    while True:
+        with transaction.atomic():
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lt=before)
+                .order_by('id')
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                break
+            # Blacklist entries go with their token (one DELETE per table)
+            _, deleted = OutstandingToken.objects.filter(id__in=ids).delete()
+            outstanding_deleted += deleted.get(OutstandingToken._meta.label, 0)
+            blacklisted_deleted += deleted.get(BlacklistedToken._meta.label, 0)
+
+    if outstanding_deleted:
+        logger.info(
+            f"Compacted {outstanding_deleted} expired tokens "
+            f"({blacklisted_deleted} blacklisted)"
+        )
+    return outstanding_deleted, blacklisted_deleted
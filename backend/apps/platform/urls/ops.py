@@ -0,0 +1,15 @@
+from django.urls import path
+from ..views import DatabasePoolStatsView, CacheStatsView, OutboxStatsView, RateLimitStatsView
+
+app_name = 'ops'
+
+urlpatterns = [
+    # GET /api/ops/db-pool/
+    path('db-pool/', DatabasePoolStatsView.as_view(), name='db-pool'),
+    # GET /api/ops/cache/
+    path('cache/', CacheStatsView.as_view(), name='cache'),
+    # GET /api/ops/outbox/
+    path('outbox/', OutboxStatsView.as_view(), name='outbox'),
+    # GET /api/ops/rate-limits/
+    path('rate-limits/', RateLimitStatsView.as_view(), name='rate-limits'),
+]
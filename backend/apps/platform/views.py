@@ -1,9 +1,13 @@
+import os
 from rest_framework import status, generics, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from .authentication import AgentRefreshToken
 from .serializers import RegisterSerializer, LoginSerializer, UserSerializer, AgentSerializer
 from .models import Agent
+from .permissions import IsPlatformAdmin
+from .rate_limit_service import DeviceRateThrottle
+from config.db.routers import ReplicaReadMixin, set_read_agent
 
 
 class RegisterView(generics.CreateAPIView):
@@ -17,7 +21,7 @@ class RegisterView(generics.CreateAPIView):
         user = serializer.save()
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = AgentRefreshToken.for_user(user)
         
         return Response({
             'user': UserSerializer(user).data,
@@ -38,7 +42,7 @@ class LoginView(APIView):
         user = serializer.validated_data['user']
         
         # Generate JWT tokens
-        refresh = RefreshToken.for_user(user)
+        refresh = AgentRefreshToken.for_user(user)
         
         return Response({
             'user': UserSerializer(user).data,
@@ -56,7 +60,7 @@ class LogoutView(APIView):
     def post(self, request):
         try:
             refresh_token = request.data.get('refresh_token')
-            token = RefreshToken(refresh_token)
+            token = AgentRefreshToken(refresh_token)
             token.blacklist()
             return Response({'message': 'Logout successful'}, status=status.HTTP_200_OK)
         except Exception:
@@ -72,12 +76,12 @@ class AgentProfileView(generics.RetrieveUpdateAPIView):
         return Agent.objects.get(user=self.request.user)
 
 
-class AgentDashboardView(APIView):
+class AgentDashboardView(ReplicaReadMixin, APIView):
     """Dashboard statistics"""
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        agent = Agent.objects.get(user=request.user)
+        agent = request.user.agent_profile
         
         from apps.agents.models import Phone, Sale
         from apps.payments.models import PaymentRecord, InstallmentSchedule
@@ -113,85 +117,31 @@ class AgentDashboardView(APIView):
         })
 
 
-class WeeklySettlementView(APIView):
+class WeeklySettlementView(ReplicaReadMixin, APIView):
     """
     Get weekly settlement status for an agent/device.
     Used by Android App A to check if settlement is due.
     """
     permission_classes = [permissions.AllowAny]  # Device auth via IMEI
+    throttle_classes = [DeviceRateThrottle]
+    rate_limit_endpoint = 'weekly-settlement'
     
     def get(self, request, imei):
         """Get settlement status for device"""
-        from apps.agents.models import Phone
-        from .models import AgentBilling, PlatformPhoneRegistry
-        from django.utils import timezone
-        from datetime import timedelta
+        from apps.agents.imei_service import resolve_imei
+        from .billing_service import billing_settlement_snapshot
         
         try:
-            # Find phone and agent
-            phone = Phone.objects.select_related('agent', 'platform_registry').get(imei=imei)
-            agent = phone.agent
-            
-            # Get current week's billing record
-            today = timezone.now().date()
-            current_week_start = today - timedelta(days=today.weekday())
-            current_week_end = current_week_start + timedelta(days=6)
-            
-            # Try to find current week's billing
-            try:
-                billing = AgentBilling.objects.filter(
-                    agent=agent,
-                    billing_period_start__lte=today,
-                    billing_period_end__gte=today
-                ).order_by('-created_at').first()
-                
-                if not billing:
-                    return Response({
-                        'has_settlement': False,
-                        'is_due': False,
-                        'is_overdue': False,
-                        'message': 'No settlement due'
-                    })
-                
-                is_overdue = (
-                    billing.status in ['overdue', 'pending'] and 
-                    billing.billing_period_end < today
-                )
-                is_due = (
-                    billing.status in ['pending', 'overdue'] and
-                    billing.amount_paid < billing.total_amount_due
+            device = resolve_imei(imei)
+            if device is None:
+                return Response(
+                    {'error': 'Phone not found'},
+                    status=status.HTTP_404_NOT_FOUND
                 )
-                amount_due = billing.total_amount_due - billing.amount_paid
-                
-                return Response({
-                    'has_settlement': True,
-                    'is_due': is_due,
-                    'is_overdue': is_overdue,
-                    'settlement_id': str(billing.id),
-                    'amount_due': float(amount_due),
-                    'total_amount': float(billing.total_amount_due),
-                    'amount_paid': float(billing.amount_paid),
-                    'due_date': billing.billing_period_end.isoformat(),
-                    'invoice_number': billing.invoice_number,
-                    'billing_period': {
-                        'start': billing.billing_period_start.isoformat(),
-                        'end': billing.billing_period_end.isoformat()
-                    }
-                })
-                
-            except AgentBilling.DoesNotExist:
-                return Response({
-                    'has_settlement': False,
-                    'is_due': False,
-                    'is_overdue': False,
-                    'message': 'No billing record found'
-                })
+            set_read_agent(device.agent_id)
+            
+            return Response(billing_settlement_snapshot(device.agent_id))
                 
-        except Phone.DoesNotExist:
-            return Response(
-                {'error': 'Phone not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -205,12 +155,15 @@ class ConfirmSettlementPaymentView(APIView):
     Called by Android App A after successful Monnify payment.
     """
     permission_classes = [permissions.AllowAny]  # Device auth via IMEI
+    throttle_classes = [DeviceRateThrottle]
+    rate_limit_endpoint = 'confirm-settlement'
     
     def post(self, request, settlement_id):
         """Confirm payment for a settlement"""
         from .models import AgentBilling
+        from .billing_service import rebuild_billing_settlement_snapshot
         from apps.payments.models import PaymentRecord, PaymentMethod, PaymentStatus
-        from apps.agents.models import Phone
+        from apps.agents.imei_service import resolve_imei
         from django.utils import timezone
         
         payment_reference = request.data.get('payment_reference')
@@ -226,10 +179,15 @@ class ConfirmSettlementPaymentView(APIView):
         try:
             # Get billing record
             billing = AgentBilling.objects.select_related('agent').get(id=settlement_id)
-            phone = Phone.objects.get(imei=imei)
+            device = resolve_imei(imei)
+            if device is None:
+                return Response(
+                    {'error': 'Phone not found'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
             
             # Verify phone belongs to agent
-            if phone.agent != billing.agent:
+            if device.agent_id != billing.agent_id:
                 return Response(
                     {'error': 'Phone does not belong to agent'},
                     status=status.HTTP_403_FORBIDDEN
@@ -257,6 +215,7 @@ class ConfirmSettlementPaymentView(APIView):
                 billing.status = 'paid'
                 billing.paid_at = timezone.now()
             billing.save()
+            rebuild_billing_settlement_snapshot(billing.agent_id)
             
             # Log audit event
             from apps.audit.models import AuditLog
@@ -285,14 +244,49 @@ class ConfirmSettlementPaymentView(APIView):
                 {'error': 'Settlement not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
-        except Phone.DoesNotExist:
-            return Response(
-                {'error': 'Phone not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+
+class DatabasePoolStatsView(APIView):
+    """Database connection pool metrics of the worker serving the request"""
+    permission_classes = [permissions.IsAuthenticated, IsPlatformAdmin]
+    
+    def get(self, request):
+        from config.db.pool import pool_stats
+        
+        return Response(pool_stats())
+
+
+class CacheStatsView(APIView):
+    """Hit/miss and latency metrics of the two-level caches in this worker"""
+    permission_classes = [permissions.IsAuthenticated, IsPlatformAdmin]
+    
+    def get(self, request):
+        from .cache_service import cache_metrics
+        
+        return Response({'pid': os.getpid(), 'caches': cache_metrics()})
+
+
+class OutboxStatsView(APIView):
+    """Outbox backlog and today's relayed events by type"""
+    permission_classes = [permissions.IsAuthenticated, IsPlatformAdmin]
+    
+    def get(self, request):
+        from .outbox_service import outbox_backlog
+        from .outbox_consumers import event_counts
+        
+        return Response({**outbox_backlog(), 'relayed_today': event_counts()})
+
+
+class RateLimitStatsView(APIView):
+    """Today's rate-limited device requests by endpoint and bucket (IMEI or IP)"""
+    permission_classes = [permissions.IsAuthenticated, IsPlatformAdmin]
+    
+    def get(self, request):
+        from .rate_limit_service import rejected_counts
+        
+        return Response({'rejected_today': rejected_counts()})
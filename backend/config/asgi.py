@@ -1,9 +1,16 @@
 """
 ASGI config for MederPay project.
+
+Serves the same API as the WSGI app, with the device polling endpoints
+handled by async views (see config/urls_asgi.py). Run it next to the
+WSGI app and route device traffic to it, e.g.:
+
+    gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker
 """
 import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.development')
+os.environ.setdefault('ROOT_URLCONF', 'config.urls_asgi')
 
 application = get_asgi_application()
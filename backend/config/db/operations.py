@@ -0,0 +1,47 @@
+"""
+Concurrent index migrations
+
+CREATE/DROP INDEX CONCURRENTLY build and drop indexes without blocking
+writes, but are PostgreSQL syntax. These operations use them on PostgreSQL
+and fall back to a plain AddIndex/RemoveIndex on other databases, so test
+and development databases still migrate. Migrations using them must set
+atomic = False.
+"""
+from django.contrib.postgres import operations as postgres
+from django.db.migrations.operations import AddIndex, RemoveIndex
+
+
+def _is_postgresql(schema_editor):
+    return schema_editor.connection.vendor == 'postgresql'
+
+
+class AddIndexConcurrently(postgres.AddIndexConcurrently):
+    """AddIndex built with CREATE INDEX CONCURRENTLY on PostgreSQL"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if _is_postgresql(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if _is_postgresql(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class RemoveIndexConcurrently(postgres.RemoveIndexConcurrently):
+    """RemoveIndex dropped with DROP INDEX CONCURRENTLY on PostgreSQL"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if _is_postgresql(schema_editor):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            RemoveIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if _is_postgresql(schema_editor):
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            RemoveIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
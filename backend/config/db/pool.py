@@ -0,0 +1,52 @@
+"""
+Connection pool metrics
+
+With DB_POOL enabled each worker process keeps a psycopg connection pool
+per database (Django's native pooling). pool_stats() reports the pools of
+the current process; the platform exposes it at /api/ops/db-pool/ so each
+worker can be scraped.
+"""
+import os
+from django.db import connections
+
+
+def _stats(pool):
+    stats = pool.get_stats()
+    size = stats.get('pool_size', 0)
+    idle = stats.get('pool_available', 0)
+    requests = stats.get('requests_num', 0)
+    wait_ms = stats.get('requests_wait_ms', 0)
+    return {
+        'min_size': pool.min_size,
+        'max_size': pool.max_size,
+        'size': size,
+        'in_use': size - idle,
+        'idle': idle,
+        'waiting': stats.get('requests_waiting', 0),
+        'requests': requests,
+        'requests_queued': stats.get('requests_queued', 0),
+        'wait_ms_total': wait_ms,
+        'wait_ms_avg': round(wait_ms / requests, 3) if requests else 0,
+        'timeouts': stats.get('requests_errors', 0),
+        'connections_opened': stats.get('connections_num', 0),
+        'connections_failed': stats.get('connections_errors', 0),
+        'connections_lost': stats.get('connections_lost', 0),
+        'bad_returns': stats.get('returns_bad', 0),
+    }
+
+
+def pool_stats():
+    """
+    Pool metrics of this process
+
+    Returns:
+        Dict with the process id and, per pooled database alias, its pool
+        size, in-use and idle connections, waiting requests and wait times.
+        Aliases without pooling are omitted.
+    """
+    pools = {}
+    for alias in connections:
+        pool = getattr(connections[alias], 'pool', None)
+        if pool is not None:
+            pools[alias] = _stats(pool)
+    return {'pid': os.getpid(), 'pools': pools}
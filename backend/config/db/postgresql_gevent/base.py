@@ -0,0 +1,60 @@
+"""
+PostgreSQL backend for gevent workers
+
+Under gevent every greenlet gets its own Django connection, so a worker
+serving worker_connections requests at once could open as many database
+connections. This backend caps the connections open at once in a worker
+at GEVENT_DB_MAX_CONNECTIONS: greenlets beyond the cap wait up to
+GEVENT_DB_CONNECT_TIMEOUT seconds for a slot, then fail.
+
+It also refuses to connect unless the driver was made cooperative
+(config.gevent_worker.patch()), so a misconfigured worker fails on its
+first query instead of silently serializing every request.
+"""
+import threading
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import OperationalError
+from django.db.backends.postgresql import base
+
+from config.gevent_worker import is_psycopg_green
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+def connection_slots():
+    """Per-process semaphore bounding open connections"""
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(settings.GEVENT_DB_MAX_CONNECTIONS)
+        return _slots
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        if not is_psycopg_green():
+            raise ImproperlyConfigured(
+                'config.db.postgresql_gevent needs a cooperative database driver; '
+                'call config.gevent_worker.patch() before Django is loaded '
+                '(see config/gunicorn_gevent.py)'
+            )
+
+        slots = connection_slots()
+        if not slots.acquire(timeout=settings.GEVENT_DB_CONNECT_TIMEOUT):
+            raise OperationalError(
+                f'All {settings.GEVENT_DB_MAX_CONNECTIONS} database connections '
+                f'of this worker are busy'
+            )
+        try:
+            return super().get_new_connection(conn_params)
+        except BaseException:
+            slots.release()
+            raise
+
+    def _close(self):
+        try:
+            super()._close()
+        finally:
+            connection_slots().release()
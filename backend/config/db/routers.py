@@ -0,0 +1,181 @@
+"""
+Read-replica routing
+
+Reads go to the 'replica' database only inside a replica_reads() scope,
+which designated views (ReplicaReadMixin, use_replica) and jobs open;
+everything else keeps using the primary. Without a 'replica' entry in
+DATABASES the router does nothing.
+
+Read-your-writes:
+    - Once a scope writes, the rest of it reads from the primary.
+    - A write to a row belonging to an agent pins that agent to the
+      primary for DB_REPLICA_PIN_SECONDS (kept in the shared cache, so
+      it holds across processes). Scopes reading for a pinned agent use
+      the primary, so agents see their own payments and sales even while
+      the replica lags.
+    - Reads inside a transaction on the primary stay on the primary.
+"""
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+REPLICA_DB_ALIAS = 'replica'
+
+_scope = ContextVar('replica_scope', default=None)
+
+
+class ReplicaScope:
+    """Routing state of one request or job"""
+
+    def __init__(self, agent_id=None):
+        self.agent_id = agent_id
+        self.pinned = False
+        self.agent_checked = False
+        self.pinned_agents = set()
+
+
+def _pin_key(agent_id):
+    return f'db:pin:agent:{agent_id}'
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in connections.settings
+
+
+def pin_agent(agent_id):
+    """Route reads for this agent to the primary for DB_REPLICA_PIN_SECONDS"""
+    cache.set(_pin_key(agent_id), 1, settings.DB_REPLICA_PIN_SECONDS)
+
+
+def agent_pinned(agent_id):
+    return cache.get(_pin_key(agent_id)) is not None
+
+
+@contextmanager
+def replica_reads(agent_id=None):
+    """
+    Send reads inside this block to the replica
+
+    Args:
+        agent_id: Agent whose data is being read, if known (see set_read_agent)
+    """
+    token = _scope.set(ReplicaScope(agent_id))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def set_read_agent(agent_id):
+    """Name the agent the current replica scope reads for"""
+    scope = _scope.get()
+    if scope is not None and scope.agent_id != agent_id:
+        scope.agent_id = agent_id
+        scope.agent_checked = False
+
+
+def use_replica(view):
+    """Decorator running a function view or job inside replica_reads()"""
+    if iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(*args, **kwargs):
+            with replica_reads():
+                return await view(*args, **kwargs)
+    else:
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with replica_reads():
+                return view(*args, **kwargs)
+    return wrapper
+
+
+class ReplicaReadMixin:
+    """
+    DRF view mixin serving safe-method requests from the replica
+
+    Requests by an agent's user read for that agent, so the agent's recent
+    writes pin them to the primary. Views that know the agent otherwise
+    (e.g. from a device IMEI) call set_read_agent() themselves.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return super().dispatch(request, *args, **kwargs)
+        with replica_reads():
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.user.is_authenticated:
+            set_read_agent(_agent_of_request(request))
+
+
+def _agent_of_request(request):
+    from apps.platform.authentication import token_agent_id
+    agent_id = token_agent_id(request)
+    if agent_id is None:
+        # Older tokens: the auth snapshot already carries the agent profile
+        agent = getattr(request.user, 'agent_profile', None)
+        agent_id = agent.pk if agent else None
+    return agent_id
+
+
+def _agent_of(instance):
+    from apps.platform.models import Agent
+    if isinstance(instance, Agent):
+        return instance.pk
+    return getattr(instance, 'agent_id', None)
+
+
+class ReplicaRouter:
+    """Routes reads in replica scopes to the replica; all writes to the primary"""
+
+    def db_for_read(self, model, **hints):
+        scope = _scope.get()
+        if scope is None or scope.pinned or not replica_configured():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+
+        if scope.agent_id is not None and not scope.agent_checked:
+            scope.agent_checked = True
+            scope.pinned = agent_pinned(scope.agent_id)
+            if scope.pinned:
+                return None
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        if not replica_configured():
+            return None
+
+        agents = set()
+        if 'instance' in hints:
+            agents.add(_agent_of(hints['instance']))
+
+        scope = _scope.get()
+        if scope is not None:
+            scope.pinned = True
+            agents.add(scope.agent_id)
+            agents -= scope.pinned_agents
+            scope.pinned_agents |= agents
+
+        for agent_id in agents - {None}:
+            pin_agent(agent_id)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both databases
+        databases = {DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_DB_ALIAS:
+            return False
+        return None
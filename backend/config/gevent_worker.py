@@ -0,0 +1,121 @@
+"""
+gevent support for the gunicorn workers
+
+Running Django under gunicorn's gevent worker only pays off if nothing
+blocks the hub: psycopg2 talks to Postgres through libpq, which gevent's
+monkey-patching cannot reach, and the Monnify client's requests session
+only yields if socket and ssl were patched before they were imported.
+psycopg 3 (used by Django when installed, e.g. for DB_POOL) waits on its
+sockets through the patched select modules and needs no callback.
+
+patch() makes the process cooperative and must run before anything else
+is imported (config/gunicorn_gevent.py calls it first thing):
+
+    - gevent.monkey.patch_all() for sockets, ssl, threading and time
+    - with psycopg2, a wait callback (as in psycogreen) so queries yield
+      to other greenlets while waiting on the server
+
+watch_blocking() starts gevent's monitor thread in a worker and reports
+any greenlet that holds the hub for longer than GEVENT_MAX_BLOCKING_TIME.
+The database engine config.db.postgresql_gevent refuses to connect if
+the database driver was not made cooperative, and caps the connections each worker
+opens at GEVENT_DB_MAX_CONNECTIONS.
+"""
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+def gevent_wait_callback(conn, timeout=None):
+    """psycopg2 wait callback that parks the greenlet until libpq can proceed"""
+    import psycopg2
+    from psycopg2 import extensions
+    from gevent.socket import wait_read, wait_write
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f'Bad result from poll: {state!r}')
+
+
+def make_psycopg_green():
+    """Install gevent_wait_callback as psycopg2's wait callback"""
+    from psycopg2 import extensions
+    extensions.set_wait_callback(gevent_wait_callback)
+
+
+def uses_psycopg3():
+    """Whether Django's PostgreSQL backend runs on psycopg 3 (preferred when installed)"""
+    try:
+        import psycopg  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def is_psycopg_green():
+    """Whether database queries yield to other greenlets"""
+    if uses_psycopg3():
+        from gevent import monkey
+        return monkey.is_module_patched('select')
+
+    from psycopg2 import extensions
+    return extensions.get_wait_callback() is gevent_wait_callback
+
+
+def patch():
+    """
+    Make this process cooperative under gevent
+
+    Safe to call more than once. gevent warns if ssl was imported before
+    patching; connections made through it would still block.
+    """
+    from gevent import monkey
+
+    if not monkey.is_module_patched('socket'):
+        monkey.patch_all()
+    if not uses_psycopg3() and not is_psycopg_green():
+        make_psycopg_green()
+
+
+def watch_blocking(on_blocked=None, max_blocking_time=None):
+    """
+    Report greenlets that block the event loop
+
+    Starts gevent's periodic monitor thread for this process. Every time
+    the hub is blocked for longer than max_blocking_time, the blocking
+    stack is logged at ERROR and on_blocked(event) is called.
+
+    Args:
+        on_blocked: Optional callback taking the gevent EventLoopBlocked event
+        max_blocking_time: Seconds (defaults to GEVENT_MAX_BLOCKING_TIME or 0.5)
+    """
+    import gevent
+    from gevent import events
+
+    if max_blocking_time is None:
+        max_blocking_time = float(os.environ.get('GEVENT_MAX_BLOCKING_TIME', 0.5))
+    gevent.config.max_blocking_time = max_blocking_time
+    gevent.config.monitor_thread = True
+
+    def report(event):
+        if not isinstance(event, events.EventLoopBlocked):
+            return
+        stack = '\n'.join(event.info)
+        logger.error(
+            f"gevent hub blocked for more than {event.blocking_time}s; "
+            f"a blocking call is running in a greenlet:\n{stack}"
+        )
+        if on_blocked is not None:
+            on_blocked(event)
+
+    events.subscribers.append(report)
+    gevent.get_hub().start_periodic_monitoring_thread()
+    return report
@@ -0,0 +1,45 @@
+"""
+Gunicorn configuration for gevent workers
+
+Usage:
+    gunicorn config.wsgi:application -c python:config.gunicorn_gevent
+
+Patches the master as soon as this file is read, before the application
+and its dependencies (requests, psycopg2, Django) are imported, and sets
+DB_GEVENT so settings switch to the connection-capped gevent database
+backend. Each worker then watches for greenlets that block the hub; a
+worker that blocks is logged loudly and, with GEVENT_BLOCKING_FATAL
+(default on), retired so the arbiter replaces it.
+
+Keep workers * GEVENT_DB_MAX_CONNECTIONS below Postgres max_connections.
+"""
+from config.gevent_worker import patch, watch_blocking
+
+patch()
+
+import multiprocessing
+import os
+
+os.environ.setdefault('DB_GEVENT', 'True')
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'gevent'
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 1000))
+max_requests = 1000
+max_requests_jitter = 50
+timeout = 30
+keepalive = 2
+
+
+def post_fork(server, worker):
+    fatal = os.environ.get('GEVENT_BLOCKING_FATAL', 'True').lower() in ('true', '1', 'yes')
+
+    def on_blocked(event):
+        if fatal and worker.alive:
+            worker.log.critical(
+                f'Worker {worker.pid} blocked the gevent hub; shutting it down'
+            )
+            worker.alive = False
+
+    watch_blocking(on_blocked)
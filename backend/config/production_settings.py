@@ -26,11 +26,13 @@ SECURE_HSTS_INCLUDE_SUBDOMAINS = True
 SECURE_HSTS_PRELOAD = True
 
 # Database connection pooling
-DATABASES['default']['CONN_MAX_AGE'] = 600  # 10 minutes
-DATABASES['default']['OPTIONS'] = {
-    'connect_timeout': 10,
-    'options': '-c statement_timeout=30000'  # 30 second query timeout
-}
+for database in DATABASES.values():  # primary and read replica
+    if not (DB_GEVENT or DB_POOL):  # otherwise connections are per request or pooled
+        database['CONN_MAX_AGE'] = 600  # 10 minutes
+    database.setdefault('OPTIONS', {}).update({
+        'connect_timeout': 10,
+        'options': '-c statement_timeout=30000'  # 30 second query timeout
+    })
 
 # Caching with Redis
 CACHES = {
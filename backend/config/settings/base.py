@@ -25,10 +25,12 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     # Third party
     'rest_framework',
     'rest_framework_simplejwt',
+    'rest_framework_simplejwt.token_blacklist',
     'corsheaders',
     'drf_spectacular',
     
@@ -52,7 +54,8 @@ MIDDLEWARE = [
     'apps.audit.middleware.AuditLoggingMiddleware',  # Auto-audit all API changes
 ]
 
-ROOT_URLCONF = 'config.urls'
+# The ASGI entry point serves config.urls_asgi (async device views)
+ROOT_URLCONF = config('ROOT_URLCONF', default='config.urls')
 
 TEMPLATES = [
     {
@@ -84,6 +87,49 @@ DATABASES = {
     }
 }
 
+# gevent workers (config/gunicorn_gevent.py): connections are per greenlet,
+# so they are closed at the end of each request and capped per worker
+DB_GEVENT = config('DB_GEVENT', default=False, cast=bool)
+GEVENT_DB_MAX_CONNECTIONS = config('GEVENT_DB_MAX_CONNECTIONS', default=20, cast=int)
+GEVENT_DB_CONNECT_TIMEOUT = config('GEVENT_DB_CONNECT_TIMEOUT', default=10, cast=float)
+if DB_GEVENT:
+    DATABASES['default']['ENGINE'] = 'config.db.postgresql_gevent'
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+
+# Optional read replica (see config/db/routers.py): designated read-heavy
+# views and jobs read from it; agents are pinned to the primary for
+# DB_REPLICA_PIN_SECONDS after a write, which should exceed replica lag
+DB_REPLICA_HOST = config('DB_REPLICA_HOST', default='')
+if DB_REPLICA_HOST:
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': DB_REPLICA_HOST,
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['config.db.routers.ReplicaRouter']
+DB_REPLICA_PIN_SECONDS = config('DB_REPLICA_PIN_SECONDS', default=10, cast=int)
+
+# Connection pooling (psycopg 3 with psycopg[pool], see config/db/pool.py):
+# each worker process keeps DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE connections
+# per database, checked for health on checkout. Size the max to the
+# worker's threads; workers * DB_POOL_MAX_SIZE must fit max_connections.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=2, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=float)
+DB_POOL_MAX_IDLE = config('DB_POOL_MAX_IDLE', default=300, cast=float)
+if DB_POOL:
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 0
+        database['CONN_HEALTH_CHECKS'] = True
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+            'max_idle': DB_POOL_MAX_IDLE,
+        }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -111,14 +157,35 @@ AUTH_USER_MODEL = 'platform.User'
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'apps.platform.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # orjson renderer/parser (Decimals as strings); the stdlib ones are
+    # rest_framework.renderers.JSONRenderer and rest_framework.parsers.JSONParser
+    'DEFAULT_RENDERER_CLASSES': (
+        'apps.platform.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'apps.platform.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    # filterset_fields / filter_date_field filters, accepted only where an
+    # index serves them (apps/platform/filters.py)
+    'DEFAULT_FILTER_BACKENDS': (
+        'apps.platform.filters.IndexedFilterBackend',
+    ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 30,
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    # Reverse proxies in front of the app: the client IP used by throttles
+    # and the device rate limits is taken this many hops from the right of
+    # X-Forwarded-For. 0 uses REMOTE_ADDR and ignores the header, which a
+    # client could otherwise forge
+    'NUM_PROXIES': config('NUM_PROXIES', default=0, cast=int),
 }
 
 # JWT Settings
@@ -127,8 +194,20 @@ SIMPLE_JWT = {
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'ROTATE_REFRESH_TOKENS': True,
     'BLACKLIST_AFTER_ROTATION': True,
+    'TOKEN_REFRESH_SERIALIZER': 'apps.platform.authentication.CachedTokenRefreshSerializer',
 }
 
+# Expired refresh tokens deleted per transaction by compact_token_blacklist
+TOKEN_COMPACTION_CHUNK_SIZE = config('TOKEN_COMPACTION_CHUNK_SIZE', default=1000, cast=int)
+
+# Rows per server-side cursor fetch (and per streamed chunk) in exports
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Seconds other processes may keep authenticating a user from their
+# in-process snapshot after the user or agent was saved
+AUTH_USER_LOCAL_TTL = config('AUTH_USER_LOCAL_TTL', default=5, cast=int)
+AUTH_USER_LOCAL_SIZE = config('AUTH_USER_LOCAL_SIZE', default=10000, cast=int)
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = config(
     'CORS_ALLOWED_ORIGINS',
@@ -148,6 +227,47 @@ SPECTACULAR_SETTINGS = {
 # Encryption key for Monnify credentials
 ENCRYPTION_KEY = config('ENCRYPTION_KEY', default=None)
 
+# Device polling caches (seconds)
+DEVICE_IMEI_CACHE_TTL = config('DEVICE_IMEI_CACHE_TTL', default=3600, cast=int)
+DEVICE_IMEI_LOCAL_TTL = config('DEVICE_IMEI_LOCAL_TTL', default=30, cast=int)
+DEVICE_IMEI_LOCAL_SIZE = config('DEVICE_IMEI_LOCAL_SIZE', default=10000, cast=int)
+SETTLEMENT_SNAPSHOT_TTL = config('SETTLEMENT_SNAPSHOT_TTL', default=300, cast=int)
+# Seconds other processes may serve a snapshot after it was rebuilt
+SETTLEMENT_SNAPSHOT_LOCAL_TTL = config('SETTLEMENT_SNAPSHOT_LOCAL_TTL', default=5, cast=int)
+
+# Device heartbeats: how long the latest state is kept in cache, and how
+# often it is flushed to Phone.last_enforcement_check (seconds)
+HEARTBEAT_STATE_TTL = config('HEARTBEAT_STATE_TTL', default=86400, cast=int)
+HEARTBEAT_FLUSH_INTERVAL = config('HEARTBEAT_FLUSH_INTERVAL', default=30, cast=int)
+# Queue slots read per flush; a flusher that fell behind catches up over
+# several runs instead of in one huge read and UPDATE
+HEARTBEAT_FLUSH_MAX_SLOTS = config('HEARTBEAT_FLUSH_MAX_SLOTS', default=10000, cast=int)
+PRESENCE_COUNTS_TTL = config('PRESENCE_COUNTS_TTL', default=60, cast=int)
+
+# Device endpoint rate limits: token buckets per IMEI and per client IP
+# (refill rate in requests per second, burst size); a rate of 0 disables
+# the bucket. The IP buckets are larger because carrier NAT shares IPs.
+DEVICE_RATE_LIMIT_IMEI_RATE = config('DEVICE_RATE_LIMIT_IMEI_RATE', default=0.5, cast=float)
+DEVICE_RATE_LIMIT_IMEI_BURST = config('DEVICE_RATE_LIMIT_IMEI_BURST', default=20, cast=int)
+DEVICE_RATE_LIMIT_IP_RATE = config('DEVICE_RATE_LIMIT_IP_RATE', default=20, cast=float)
+DEVICE_RATE_LIMIT_IP_BURST = config('DEVICE_RATE_LIMIT_IP_BURST', default=300, cast=int)
+
+# Transactional outbox: consumer modules, relay batch size and polling
+# interval (seconds), and retries before a failing event is parked
+OUTBOX_CONSUMERS = [
+    'apps.platform.outbox_consumers',
+    'apps.payments.outbox_consumers',
+    'apps.enforcement.outbox_consumers',
+]
+OUTBOX_BATCH_SIZE = config('OUTBOX_BATCH_SIZE', default=500, cast=int)
+OUTBOX_RELAY_INTERVAL = config('OUTBOX_RELAY_INTERVAL', default=1, cast=float)
+OUTBOX_MAX_ATTEMPTS = config('OUTBOX_MAX_ATTEMPTS', default=10, cast=int)
+OUTBOX_RETRY_MAX_DELAY = config('OUTBOX_RETRY_MAX_DELAY', default=300, cast=int)
+# Days processed events are kept before prune_outbox deletes them, and
+# events deleted per transaction
+OUTBOX_RETENTION_DAYS = config('OUTBOX_RETENTION_DAYS', default=7, cast=int)
+OUTBOX_PRUNE_CHUNK_SIZE = config('OUTBOX_PRUNE_CHUNK_SIZE', default=1000, cast=int)
+
 # ========================================
 # MONNIFY PAYMENT GATEWAY SETTINGS
 # ========================================
@@ -161,6 +281,9 @@ MONNIFY_BASE_URL = config('MONNIFY_BASE_URL', default='https://sandbox.monnify.c
 # Monnify Webhook Secret (for signature verification)
 MONNIFY_WEBHOOK_SECRET = config('MONNIFY_WEBHOOK_SECRET', default='')
 
+# Max pooled HTTP connections to Monnify per process
+MONNIFY_HTTP_POOL_SIZE = config('MONNIFY_HTTP_POOL_SIZE', default=10, cast=int)
+
 # Logging configuration for Monnify integration
 LOGGING = {
     'version': 1,
@@ -11,4 +11,6 @@ SECURE_CONTENT_TYPE_NOSNIFF = True
 X_FRAME_OPTIONS = 'DENY'
 
 # Production-specific settings
-DATABASES['default']['CONN_MAX_AGE'] = 600
+if not (DB_GEVENT or DB_POOL):
+    for database in DATABASES.values():
+        database['CONN_MAX_AGE'] = 600
@@ -10,6 +10,7 @@ urlpatterns = [
     path('api/auth/', include('apps.platform.urls.auth')),
     path('api/agents/', include('apps.platform.urls.agents')),
     path('api/settlements/', include('apps.platform.urls.settlements')),
+    path('api/ops/', include('apps.platform.urls.ops')),
     path('api/staff/', include('apps.agents.urls.staff')),
     path('api/phones/', include('apps.agents.urls.phones')),
     path('api/sales/', include('apps.agents.urls.sales')),
@@ -17,6 +18,7 @@ urlpatterns = [
     path('api/payments/', include('apps.payments.urls')),
     path('api/device-commands/', include('apps.enforcement.urls.commands')),
     path('api/enforcement/', include('apps.enforcement.urls.enforcement')),
+    path('api/devices/', include('apps.enforcement.urls.devices')),
     path('api/audit/', include('apps.audit.urls')),
     path('api/webhooks/', include('apps.payments.urls_webhooks')),
     
@@ -0,0 +1,16 @@
+"""MederPay Backend URL Configuration for the ASGI entry point
+
+Routes the IMEI-keyed device polling endpoints to their async views and
+everything else to the regular URLconf.
+"""
+from django.urls import path
+from apps.enforcement import async_views
+from .urls import urlpatterns as wsgi_urlpatterns
+
+urlpatterns = [
+    path('api/enforcement/status/<str:imei>/', async_views.enforcement_status),
+    path('api/device-commands/pending/', async_views.pending_commands),
+    path('api/settlements/weekly/<str:imei>/', async_views.weekly_settlement),
+    path('api/monnify/reserved-account/<str:imei>/', async_views.reserved_account),
+    path('api/devices/<str:imei>/sync/', async_views.device_sync),
+] + wsgi_urlpatterns
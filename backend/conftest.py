@@ -4,32 +4,45 @@ Test fixtures for MederPay backend tests
 import pytest
 from datetime import datetime, timedelta
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
 
-from apps.platform.models import Agent, PlatformPhoneRegistry
+from apps.platform.models import Agent, PlatformPhoneRegistry, UserRole
 from apps.agents.models import Phone, Customer, Sale, AgentStaff
+from apps.platform.cache_service import clear_local_caches
 from apps.payments.monnify_models import WeeklySettlement
 
 User = get_user_model()
 
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with empty caches (device lookups and snapshots are cached)"""
+    cache.clear()
+    clear_local_caches()
+    yield
+    cache.clear()
+    clear_local_caches()
+
+
 @pytest.fixture
 def user(db):
-    """Create a test user"""
+    """Create a test user (an agent owner)"""
     return User.objects.create_user(
-        username='testagent',
         email='agent@test.com',
-        password='testpass123'
+        password='testpass123',
+        role=UserRole.AGENT_OWNER
     )
 
 
 @pytest.fixture
 def user2(db):
-    """Create a second test user"""
+    """Create a second test user (an agent owner)"""
     return User.objects.create_user(
-        username='testagent2',
         email='agent2@test.com',
-        password='testpass123'
+        password='testpass123',
+        role=UserRole.AGENT_OWNER
     )
 
 
@@ -39,9 +52,7 @@ def agent(db, user):
     return Agent.objects.create(
         user=user,
         business_name='Test Agent Business',
-        phone_number='+2348012345678',
-        nin='12345678901',
-        is_active=True
+        nin='12345678901'
     )
 
 
@@ -51,12 +62,30 @@ def agent2(db, user2):
     return Agent.objects.create(
         user=user2,
         business_name='Test Agent Business 2',
-        phone_number='+2348087654321',
-        nin='98765432109',
-        is_active=True
+        nin='98765432109'
     )
 
 
+@pytest.fixture
+def api_request():
+    """
+    Call a DRF view as an authenticated user
+
+    api_request(view, user, path, data=None, method='get', **view_kwargs):
+    GET data is sent as the query string, other methods send it as JSON.
+    """
+    factory = APIRequestFactory()
+
+    def call(view, user, path='/', data=None, method='get', **kwargs):
+        if method == 'get':
+            request = factory.get(path, data)
+        else:
+            request = getattr(factory, method)(path, data, format='json')
+        force_authenticate(request, user=user)
+        return view(request, **kwargs)
+    return call
+
+
 @pytest.fixture
 def platform_phone_registry(db, agent):
     """Create a platform phone registry entry"""